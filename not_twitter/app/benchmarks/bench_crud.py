@@ -0,0 +1,140 @@
+"""Микробенчмарки функций crud_operations на разных объемах данных.
+
+Для каждого размера БД из переменной окружения POSTGRES_URL заполняется
+синтетическим социальным графом, после замеров граф удаляется. Операции
+записи замеряются парами, чтобы не менять объем данных между замерами.
+
+Запуск: python -m not_twitter.app.benchmarks.bench_crud --sizes small medium
+"""
+import argparse
+import asyncio
+from typing import Dict, List
+
+from not_twitter.app.benchmarks import social_graph
+from not_twitter.app.benchmarks.utils import dump_results, measure_async
+from not_twitter.app.database import crud_operations, database
+
+SIZES = {
+    "small": social_graph.GraphScale(
+        users=100, tweets=1000, likes=5000, medias=50, follows_per_user=10,
+    ),
+    "medium": social_graph.GraphScale(
+        users=1000, tweets=10000, likes=50000, medias=200,
+    ),
+    "large": social_graph.GraphScale(
+        users=5000, tweets=50000, likes=250000, medias=500,
+    ),
+}
+# Количество вызовов в одном повторе для каждого размера
+CALLS = {"small": 20, "medium": 5, "large": 2}  # noqa: WPS432
+REPEAT = 3
+
+
+async def bench_size(graph: social_graph.SeededGraph, number: int) -> Dict:
+    """Замеры всех CRUD операций на загруженном графе.
+
+    Самые популярные пользователь, твит и медиа графа идут первыми.
+
+    Args:
+        graph (SeededGraph): ID загруженных сущностей.
+        number (int): Количество вызовов в одном повторе.
+
+    Returns:
+        Dict: Результаты замеров по функциям.
+    """
+    api_key = graph.api_keys[0]
+    user = await crud_operations.get_user_by_api_key(api_key)
+    following_ids = {followed.id for followed in user.following}
+    followed = await crud_operations.get_user_by_id(next(
+        user_id
+        for user_id in reversed(graph.user_ids)
+        if user_id not in following_ids and user_id != user.id
+    ))
+    tweet = await crud_operations.get_tweet_by_id(graph.tweet_ids[0])
+    liked_tweet = await crud_operations.get_tweet_by_id(
+        await crud_operations.create_tweet(followed, "bench", []),
+    )
+
+    async def create_and_delete_tweet():
+        tweet_id = await crud_operations.create_tweet(user, "bench", [])
+        await crud_operations.delete_tweet_by_id(tweet_id)
+
+    async def like_and_unlike():
+        await crud_operations.add_like_by_user_to_tweet(user, liked_tweet)
+        await crud_operations.delete_like_by_user_from_tweet(user, liked_tweet)
+
+    async def follow_and_unfollow():
+        await crud_operations.add_following(followed, user)
+        await crud_operations.remove_following(followed, user)
+
+    operations = {
+        "get_user_by_api_key": lambda: crud_operations.get_user_by_api_key(
+            api_key,
+        ),
+        "get_auth_user_by_api_key": (
+            lambda: crud_operations.get_auth_user_by_api_key(api_key)
+        ),
+        "get_user_by_id": lambda: crud_operations.get_user_by_id(user.id),
+        "get_tweets_by_author_id": (
+            lambda: crud_operations.get_tweets_by_author_id(user.id)
+        ),
+        "get_tweet_by_id": lambda: crud_operations.get_tweet_by_id(tweet.id),
+        "get_all_tweets": crud_operations.get_all_tweets,
+        "get_feed": crud_operations.get_feed,
+        "get_media_by_id": lambda: crud_operations.get_media_by_id(
+            graph.media_ids[0],
+        ),
+        "add_media": lambda: crud_operations.add_media(b"bench"),
+        "create_and_delete_tweet": create_and_delete_tweet,
+        "like_and_unlike": like_and_unlike,
+        "follow_and_unfollow": follow_and_unfollow,
+    }
+    return {
+        name: await measure_async(func, number=number, repeat=REPEAT)
+        for name, func in operations.items()
+    }
+
+
+async def run(sizes: List[str]) -> None:
+    """Запуск бенчмарка.
+
+    Args:
+        sizes (List[str]): Имена размеров из SIZES.
+    """
+    database.engine.sync_engine.echo = False
+    await database.init_db()
+    results = {}
+    try:
+        for size in sizes:
+            scale = SIZES[size]
+            graph = await social_graph.seed_graph(database.engine, scale)
+            try:
+                results[size] = {
+                    "scale": vars(scale),
+                    "operations": await bench_size(graph, CALLS[size]),
+                }
+            finally:
+                await social_graph.cleanup_graph(database.engine)
+    finally:
+        await database.shutdown_db()
+    dump_results("crud", results)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Создание парсера аргументов командной строки.
+
+    Returns:
+        argparse.ArgumentParser: Парсер аргументов.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(SIZES),
+        default=list(SIZES),
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    asyncio.run(run(get_parser().parse_args().sizes))
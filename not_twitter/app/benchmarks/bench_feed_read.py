@@ -0,0 +1,113 @@
+"""Сравнение чтения ленты через ORM и через проекцию строк.
+
+Бенчмарк заполняет БД из переменной окружения POSTGRES_URL синтетическими
+твитами и лайками, а по завершении удаляет их.
+
+Запуск: python -m not_twitter.app.benchmarks.bench_feed_read
+"""
+import asyncio
+import random
+from typing import List
+
+from sqlalchemy import delete, insert
+
+from not_twitter.app.benchmarks.utils import dump_results, measure_async
+from not_twitter.app.database import crud_operations, database
+from not_twitter.app.database.models import Like, Tweet, User
+from not_twitter.app.utils import schemas
+
+USERS_COUNT = 50
+TWEETS_COUNT = 500
+MAX_LIKES_PER_TWEET = 10
+
+
+async def seed() -> List[int]:
+    """Заполнение БД синтетическими пользователями, твитами и лайками.
+
+    Returns:
+        List[int]: ID созданных пользователей.
+    """
+    async with database.async_session() as session:
+        async with session.begin():
+            query = await session.execute(
+                insert(User).returning(User.id),
+                [
+                    {"name": "bench_{idx}".format(idx=idx)}
+                    for idx in range(USERS_COUNT)
+                ],
+            )
+            user_ids = list(query.scalars())
+            query = await session.execute(
+                insert(Tweet).returning(Tweet.id),
+                [
+                    {
+                        "content": "bench tweet {idx}".format(idx=idx),
+                        "author_id": random.choice(user_ids),
+                        "attachments": [],
+                    }
+                    for idx in range(TWEETS_COUNT)
+                ],
+            )
+            likes = [
+                {"tweet_id": tweet_id, "user_id": user_id, "name": "bench"}
+                for tweet_id in query.scalars()
+                for user_id in random.sample(
+                    user_ids,
+                    random.randint(0, MAX_LIKES_PER_TWEET),
+                )
+            ]
+            if likes:
+                await session.execute(insert(Like), likes)
+    return user_ids
+
+
+async def cleanup(user_ids: List[int]) -> None:
+    """Удаление синтетических данных.
+
+    Args:
+        user_ids (List[int]): ID созданных пользователей.
+    """
+    async with database.async_session() as session:
+        async with session.begin():
+            await session.execute(delete(User).where(User.id.in_(user_ids)))
+
+
+async def read_orm_feed() -> None:
+    """Чтение и сериализация ленты через ORM объекты."""
+    tweets = await crud_operations.get_all_tweets()
+    schemas.TweetsResponse(result=True, tweets=tweets).model_dump(mode="json")
+
+
+async def read_projected_feed() -> None:
+    """Чтение и сериализация ленты через проекцию строк."""
+    tweets = await crud_operations.get_feed()
+    schemas.TweetsResponse(result=True, tweets=tweets).model_dump(mode="json")
+
+
+async def run() -> None:
+    """Запуск бенчмарка."""
+    database.engine.sync_engine.echo = False
+    await database.init_db()
+    user_ids = await seed()
+    try:
+        results = {
+            "orm_feed": await measure_async(read_orm_feed),
+            "projected_feed": await measure_async(read_projected_feed),
+        }
+    finally:
+        await cleanup(user_ids)
+        await database.shutdown_db()
+
+    results["speedup"] = (
+        results["projected_feed"]["ops_per_sec"]
+        / results["orm_feed"]["ops_per_sec"]
+    )
+    results["peak_memory_ratio"] = (
+        results["projected_feed"]["peak_bytes"]
+        / results["orm_feed"]["peak_bytes"]
+    )
+    dump_results("feed_read", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
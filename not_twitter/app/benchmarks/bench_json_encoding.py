@@ -0,0 +1,71 @@
+"""Сравнение скорости кодирования JSON ответов.
+
+Запуск: python -m not_twitter.app.benchmarks.bench_json_encoding
+"""
+from typing import Any, Dict
+
+from fastapi.responses import JSONResponse
+
+from not_twitter.app.benchmarks.utils import dump_results, measure
+from not_twitter.app.utils import schemas, standard_responses
+from not_twitter.app.utils.json_responses import FastJSONResponse
+
+FEED_SIZE = 500
+LIKES_PER_TWEET = 10
+
+
+def make_feed(size: int = FEED_SIZE) -> Dict[str, Any]:
+    """Создание ленты из синтетических твитов.
+
+    Args:
+        size (int): Количество твитов в ленте.
+
+    Returns:
+        Dict[str, Any]: Содержимое ответа со списком твитов.
+    """
+    tweets = [
+        {
+            "id": tweet_id,
+            "content": "Synthetic tweet number {id}".format(id=tweet_id),
+            "attachments": ["api/medias/{id}".format(id=tweet_id)],
+            "author": {
+                "id": tweet_id % 50,
+                "name": "user_{id}".format(id=tweet_id % 50),
+            },
+            "likes": [
+                {"user_id": user_id, "name": "user_{id}".format(id=user_id)}
+                for user_id in range(LIKES_PER_TWEET)
+            ],
+        }
+        for tweet_id in range(size, 0, -1)
+    ]
+    return {"result": True, "tweets": tweets}
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+    feed = make_feed()
+    serialized = schemas.TweetsResponse.model_validate(feed).model_dump(
+        mode="json",
+    )
+    results = {
+        "feed_json_response": measure(lambda: JSONResponse(serialized)),
+        "feed_fast_json_response": measure(lambda: FastJSONResponse(serialized)),
+        "success_json_response": measure(
+            lambda: JSONResponse({"result": True}),
+            number=10000,
+        ),
+        "success_precomputed_response": measure(
+            standard_responses.get_success_response,
+            number=10000,
+        ),
+    }
+    results["feed_speedup"] = (
+        results["feed_fast_json_response"]["ops_per_sec"]
+        / results["feed_json_response"]["ops_per_sec"]
+    )
+    dump_results("json_encoding", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Сравнение валидации схем ответов из ORM объектов и из словарей.
+
+Бенчмарк не обращается к БД: ORM объекты создаются в памяти и не привязаны
+к сессии. Переменная окружения POSTGRES_URL нужна только для импорта моделей.
+
+Запуск: python -m not_twitter.app.benchmarks.bench_schemas
+"""
+from typing import Any, Dict, List
+
+from not_twitter.app.benchmarks.utils import dump_results, measure
+from not_twitter.app.database.models import Like, Tweet, User
+from not_twitter.app.utils import schemas
+
+# Количество твитов ленты и подписчиков профиля для каждого размера
+SIZES = {"small": 10, "medium": 100, "large": 1000}
+LIKES_PER_TWEET = 10
+USERS_COUNT = 50
+
+
+def make_users(count: int) -> List[User]:
+    """Создание ORM объектов пользователей.
+
+    Args:
+        count (int): Количество пользователей.
+
+    Returns:
+        List[User]: Пользователи без подписок.
+    """
+    return [
+        User(id=user_id, name="user_{id}".format(id=user_id))
+        for user_id in range(1, count + 1)
+    ]
+
+
+def make_orm_tweets(size: int, users: List[User]) -> List[Tweet]:
+    """Создание ORM объектов твитов с авторами и лайками.
+
+    Args:
+        size (int): Количество твитов.
+        users (List[User]): Авторы и лайкнувшие пользователи.
+
+    Returns:
+        List[Tweet]: Твиты в порядке убывания ID.
+    """
+    return [
+        Tweet(
+            id=tweet_id,
+            content="Synthetic tweet number {id}".format(id=tweet_id),
+            attachments=["api/medias/{id}".format(id=tweet_id)],
+            author=users[tweet_id % len(users)],
+            likes=[
+                Like(tweet_id=tweet_id, user_id=user.id, name=user.name)
+                for user in users[:LIKES_PER_TWEET]
+            ],
+        )
+        for tweet_id in range(size, 0, -1)
+    ]
+
+
+def tweet_to_dict(tweet: Tweet) -> Dict[str, Any]:
+    """Преобразование ORM объекта твита в словарь.
+
+    Args:
+        tweet (Tweet): Объект твита.
+
+    Returns:
+        Dict[str, Any]: Поля твита.
+    """
+    return {
+        "id": tweet.id,
+        "content": tweet.content,
+        "attachments": tweet.attachments,
+        "author": {"id": tweet.author.id, "name": tweet.author.name},
+        "likes": [
+            {"user_id": like.user_id, "name": like.name} for like in tweet.likes
+        ],
+    }
+
+
+def make_profile(size: int) -> User:
+    """Создание ORM объекта пользователя с подписками и подписчиками.
+
+    Args:
+        size (int): Количество подписок и подписчиков.
+
+    Returns:
+        User: Объект пользователя.
+    """
+    user = User(id=0, name="profile_user")
+    user.following = make_users(size)
+    user.followers = make_users(size)
+    return user
+
+
+def profile_to_dict(user: User) -> Dict[str, Any]:
+    """Преобразование ORM объекта пользователя в словарь профиля.
+
+    Args:
+        user (User): Объект пользователя.
+
+    Returns:
+        Dict[str, Any]: Поля профиля.
+    """
+    return {
+        "id": user.id,
+        "name": user.name,
+        "followers": [
+            {"id": follower.id, "name": follower.name}
+            for follower in user.followers
+        ],
+        "following": [
+            {"id": followed.id, "name": followed.name}
+            for followed in user.following
+        ],
+    }
+
+
+def bench_size(size: int) -> Dict[str, Any]:
+    """Замеры валидации ответов одного размера.
+
+    Args:
+        size (int): Количество твитов ленты и подписчиков профиля.
+
+    Returns:
+        Dict[str, Any]: Результаты замеров.
+    """
+    number = max(10000 // size, 10)
+    orm_tweets = make_orm_tweets(size, make_users(USERS_COUNT))
+    dict_tweets = [tweet_to_dict(tweet) for tweet in orm_tweets]
+    orm_profile = make_profile(size)
+    dict_profile = profile_to_dict(orm_profile)
+
+    results = {
+        "tweets_from_orm": measure(
+            lambda: schemas.TweetsResponse(result=True, tweets=orm_tweets),
+            number=number,
+        ),
+        "tweets_from_dict": measure(
+            lambda: schemas.TweetsResponse(result=True, tweets=dict_tweets),
+            number=number,
+        ),
+        "profile_from_orm": measure(
+            lambda: schemas.ProfileResponse(result=True, user=orm_profile),
+            number=number,
+        ),
+        "profile_from_dict": measure(
+            lambda: schemas.ProfileResponse(result=True, user=dict_profile),
+            number=number,
+        ),
+    }
+    results["tweets_dict_speedup"] = (
+        results["tweets_from_dict"]["ops_per_sec"]
+        / results["tweets_from_orm"]["ops_per_sec"]
+    )
+    results["profile_dict_speedup"] = (
+        results["profile_from_dict"]["ops_per_sec"]
+        / results["profile_from_orm"]["ops_per_sec"]
+    )
+    return results
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+    dump_results(
+        "schemas",
+        {name: bench_size(size) for name, size in SIZES.items()},
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Нагрузочный тест приложения смешанной нагрузкой.
+
+Команды:
+    seed     заполнение БД синтетическим социальным графом;
+    run      запуск нагрузки и сохранение результатов в JSON;
+    cleanup  удаление синтетического графа.
+
+Без параметра --url нагрузка подается на ASGI приложение в том же
+процессе, поэтому запускать нужно из каталога not_twitter/app:
+    PYTHONPATH=../.. python -m not_twitter.app.benchmarks.load_test seed
+    PYTHONPATH=../.. python -m not_twitter.app.benchmarks.load_test run
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess  # noqa: S404
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from not_twitter.app.benchmarks import social_graph
+from not_twitter.app.database import database
+
+DEFAULT_MIX = "feed=60,post=10,like=20,media=10"
+RESULTS_DIR = "bench_results"
+PERCENTILES = (50, 95, 99)
+
+
+class Workload:
+    """Генератор операций смешанной нагрузки по синтетическому графу."""
+
+    def __init__(self, graph: social_graph.SeededGraph, mix: Dict[str, int]):
+        """Создание генератора нагрузки.
+
+        Args:
+            graph (SeededGraph): ID загруженного графа.
+            mix (Dict[str, int]): Веса операций.
+        """
+        self.graph = graph
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random()
+        self.tweets = social_graph.ZipfSampler(
+            graph.tweet_ids[::-1],
+            exponent=1.1,
+            rng=self.rng,
+        )
+
+    async def execute(
+        self,
+        client: httpx.AsyncClient,
+    ) -> Tuple[str, httpx.Response]:
+        """Выполнение одной случайной операции.
+
+        Args:
+            client (httpx.AsyncClient): HTTP клиент.
+
+        Returns:
+            Tuple[str, httpx.Response]: Имя операции и ответ.
+        """
+        operation = self.rng.choices(self.operations, self.weights)[0]
+        headers = {"api-key": self.rng.choice(self.graph.api_keys)}
+        if operation == "feed":
+            response = await client.get("/api/tweets", headers=headers)
+        elif operation == "post":
+            response = await client.post(
+                "/api/tweets",
+                headers=headers,
+                json={"tweet_data": "load test tweet", "tweet_media_ids": []},
+            )
+        elif operation == "like":
+            url = "/api/tweets/{id}/likes".format(id=self.tweets.sample())
+            method = self.rng.choice(("POST", "DELETE"))
+            response = await client.request(method, url, headers=headers)
+        else:
+            media_id = self.rng.choice(self.graph.media_ids)
+            response = await client.get("/api/medias/{id}".format(id=media_id))
+        return operation, response
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Вычисление перцентиля методом ближайшего ранга.
+
+    Args:
+        sorted_values (List[float]): Отсортированные значения.
+        percent (float): Перцентиль от 0 до 100.
+
+    Returns:
+        float: Значение перцентиля.
+    """
+    if not sorted_values:
+        return 0
+    rank = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    """Сводка по задержкам операции.
+
+    Args:
+        latencies (List[float]): Задержки в секундах.
+        errors (int): Количество ответов с ошибкой.
+        elapsed (float): Длительность теста в секундах.
+
+    Returns:
+        Dict: Количество запросов, пропускная способность и перцентили.
+    """
+    latencies = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+    }
+    for percent in PERCENTILES:
+        summary["p{p}_ms".format(p=percent)] = percentile(latencies, percent) * 1000
+    return summary
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    workload: Workload,
+    duration: float,
+    concurrency: int,
+) -> Dict:
+    """Подача нагрузки параллельными виртуальными пользователями.
+
+    Args:
+        client (httpx.AsyncClient): HTTP клиент.
+        workload (Workload): Генератор операций.
+        duration (float): Длительность теста в секундах.
+        concurrency (int): Количество параллельных пользователей.
+
+    Returns:
+        Dict: Сводка по операциям и общая сводка.
+    """
+    latencies: Dict[str, List[float]] = {name: [] for name in workload.operations}
+    errors = dict.fromkeys(workload.operations, 0)
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            operation, response = await workload.execute(client)
+            latencies[operation].append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors[operation] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    endpoints = {
+        name: summarize(latencies[name], errors[name], elapsed)
+        for name in workload.operations
+    }
+    total = summarize(
+        [latency for values in latencies.values() for latency in values],
+        sum(errors.values()),
+        elapsed,
+    )
+    return {"elapsed_sec": elapsed, "endpoints": endpoints, "total": total}
+
+
+def get_commit() -> str:
+    """Получение хэша текущего коммита.
+
+    Returns:
+        str: Хэш коммита или 'unknown'.
+    """
+    try:
+        return subprocess.check_output(  # noqa: S603, S607
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Разбор весов операций вида 'feed=60,post=10'.
+
+    Args:
+        mix (str): Строка с весами.
+
+    Returns:
+        Dict[str, int]: Веса операций.
+    """
+    weights = {}
+    for item in mix.split(","):
+        name, weight = item.split("=")
+        weights[name.strip()] = int(weight)
+    return weights
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Запуск нагрузки и сохранение результатов.
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки.
+    """
+    graph = await social_graph.load_graph(database.engine)
+    if not graph.api_keys:
+        raise SystemExit("No synthetic graph found, run the 'seed' command first")
+    workload = Workload(graph, parse_mix(args.mix))
+
+    if args.url:
+        transport = None
+        base_url = args.url
+        app = None
+    else:
+        from not_twitter.app.main import app  # noqa: WPS433
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+        await app.router.startup()
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url=base_url,
+        limits=limits,
+        timeout=60,
+    ) as client:
+        results = await drive(client, workload, args.duration, args.concurrency)
+    if app is not None:
+        await app.router.shutdown()
+
+    results.update({
+        "commit": get_commit(),
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "duration_sec": args.duration,
+        "concurrency": args.concurrency,
+        "mix": parse_mix(args.mix),
+        "target": args.url or "asgi",
+    })
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        "load-{commit}-{ts}.json".format(
+            commit=results["commit"],
+            ts=int(time.time()),
+        ),
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    print(json.dumps(results["total"], indent=2))  # noqa: WPS421
+    print("Results saved to", output)  # noqa: WPS421
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Выполнение выбранной команды.
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки.
+    """
+    database.engine.sync_engine.echo = False
+    try:
+        if args.command == "seed":
+            await database.init_db()
+            scale = social_graph.GraphScale(
+                users=args.users,
+                tweets=args.tweets,
+                likes=args.likes,
+                medias=args.medias,
+                follows_per_user=args.follows,
+            )
+            start = time.perf_counter()
+            await social_graph.seed_graph(database.engine, scale)
+            print(  # noqa: WPS421
+                "Seeded in {sec:.1f} s".format(sec=time.perf_counter() - start),
+            )
+        elif args.command == "cleanup":
+            await social_graph.cleanup_graph(database.engine)
+        else:
+            await run(args)
+    finally:
+        await database.shutdown_db()
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Создание парсера аргументов командной строки.
+
+    Returns:
+        argparse.ArgumentParser: Парсер аргументов.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="Seed the synthetic social graph")
+    default_scale = social_graph.GraphScale()
+    seed.add_argument("--users", type=int, default=default_scale.users)
+    seed.add_argument("--tweets", type=int, default=default_scale.tweets)
+    seed.add_argument("--likes", type=int, default=default_scale.likes)
+    seed.add_argument("--medias", type=int, default=default_scale.medias)
+    seed.add_argument("--follows", type=int, default=default_scale.follows_per_user)
+
+    run_parser = commands.add_parser("run", help="Run the mixed workload")
+    run_parser.add_argument("--duration", type=float, default=30)
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--mix", default=DEFAULT_MIX)
+    run_parser.add_argument("--url", help="Base URL of a running server")
+    run_parser.add_argument("--output", help="Path of the results JSON file")
+
+    commands.add_parser("cleanup", help="Delete the synthetic social graph")
+    return parser
+
+
+if __name__ == "__main__":
+    asyncio.run(main(get_parser().parse_args()))
@@ -0,0 +1,293 @@
+"""Генератор синтетического социального графа для нагрузочных тестов.
+
+Популярность пользователей и твитов распределена по закону Ципфа:
+несколько авторов собирают большую часть подписчиков, а несколько
+твитов большую часть лайков. Данные загружаются в БД через COPY.
+"""
+import itertools
+import random
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from not_twitter.app.database import snowflake
+
+API_KEY_PREFIX = "bench-"
+MEDIA_SIZE = 1024
+
+
+@dataclass
+class GraphScale:
+    """Масштаб синтетического графа."""
+
+    users: int = 1000
+    tweets: int = 10000
+    likes: int = 50000
+    medias: int = 500
+    follows_per_user: int = 20
+    zipf_exponent: float = 1.1
+    seed: int = 42
+
+
+@dataclass
+class SeededGraph:
+    """ID загруженных сущностей графа."""
+
+    user_ids: List[int]
+    api_keys: List[str]
+    tweet_ids: List[int]
+    media_ids: List[int]
+
+
+class ZipfSampler:
+    """Выбор элементов последовательности с вероятностью ~ 1 / ранг^s."""
+
+    def __init__(self, items: Sequence, exponent: float, rng: random.Random):
+        """Создание выборщика.
+
+        Args:
+            items (Sequence): Элементы в порядке убывания популярности.
+            exponent (float): Показатель распределения.
+            rng (random.Random): Генератор случайных чисел.
+        """
+        self.items = items
+        self.rng = rng
+        weights = (1 / (rank ** exponent) for rank in range(1, len(items) + 1))
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def sample(self):
+        """Выбор одного элемента.
+
+        Returns:
+            Выбранный элемент.
+        """
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.items[bisect_left(self.cum_weights, point)]
+
+    def sample_unique(self, count: int) -> List:
+        """Выбор нескольких различных элементов.
+
+        Args:
+            count (int): Желаемое количество элементов.
+
+        Returns:
+            List: Различные элементы, не больше count.
+        """
+        chosen = set()
+        for _ in range(count * 3):
+            chosen.add(self.sample())
+            if len(chosen) >= count:
+                break
+        return list(chosen)
+
+
+async def _reserve_ids(conn, sequence: str, count: int) -> List[int]:
+    """Резервирование непрерывного блока ID последовательности.
+
+    Args:
+        conn: Соединение SQLAlchemy.
+        sequence (str): Имя последовательности.
+        count (int): Количество ID.
+
+    Returns:
+        List[int]: Зарезервированные ID.
+    """
+    start = (await conn.execute(
+        text("SELECT nextval(:seq)"), {"seq": sequence},
+    )).scalar()
+    if count > 1:
+        await conn.execute(
+            text("SELECT setval(:seq, :value)"),
+            {"seq": sequence, "value": start + count - 1},
+        )
+    return list(range(start, start + count))
+
+
+def generate_follows(
+    user_ids: List[int],
+    scale: GraphScale,
+    rng: random.Random,
+) -> Iterator[Tuple[int, int]]:
+    """Генерация подписок со степенным распределением подписчиков.
+
+    Args:
+        user_ids (List[int]): ID пользователей.
+        scale (GraphScale): Масштаб графа.
+        rng (random.Random): Генератор случайных чисел.
+
+    Yields:
+        Tuple[int, int]: Пара (на кого подписаны, подписчик).
+    """
+    popularity = ZipfSampler(user_ids, scale.zipf_exponent, rng)
+    for follower_id in user_ids:
+        count = min(
+            int(rng.paretovariate(1.5) * scale.follows_per_user / 3),
+            len(user_ids) - 1,
+        )
+        for followed_id in popularity.sample_unique(count):
+            if followed_id != follower_id:
+                yield followed_id, follower_id
+
+
+def generate_likes(
+    tweets: List[Tuple[int, int]],
+    users: Dict[int, str],
+    scale: GraphScale,
+    rng: random.Random,
+) -> Dict[Tuple[int, int], str]:
+    """Генерация лайков с распределением Ципфа по твитам.
+
+    Args:
+        tweets (List[Tuple[int, int]]): Пары (ID твита, ID автора).
+        users (Dict[int, str]): Имена пользователей по ID.
+        scale (GraphScale): Масштаб графа.
+        rng (random.Random): Генератор случайных чисел.
+
+    Returns:
+        Dict[Tuple[int, int], str]: Имя лайкнувшего по паре (твит, пользователь).
+    """
+    popularity = ZipfSampler(tweets, scale.zipf_exponent, rng)
+    user_ids = list(users)
+    likes = {}
+    for _ in range(scale.likes):
+        tweet_id, author_id = popularity.sample()
+        user_id = rng.choice(user_ids)
+        if user_id != author_id:
+            likes[(tweet_id, user_id)] = users[user_id]
+    return likes
+
+
+async def seed_graph(engine: AsyncEngine, scale: GraphScale) -> SeededGraph:
+    """Заполнение БД синтетическим графом через COPY.
+
+    Args:
+        engine (AsyncEngine): Движок БД.
+        scale (GraphScale): Масштаб графа.
+
+    Returns:
+        SeededGraph: ID загруженных сущностей.
+    """
+    rng = random.Random(scale.seed)
+    async with engine.begin() as conn:
+        user_ids = await _reserve_ids(conn, "user_id_seq", scale.users)
+        tweet_ids = snowflake.generator.next_ids(scale.tweets)
+        media_ids = snowflake.generator.next_ids(scale.medias)
+        raw_connection = await conn.get_raw_connection()
+        driver = raw_connection.driver_connection
+
+        users = {
+            user_id: "bench_user_{id}".format(id=user_id) for user_id in user_ids
+        }
+        api_keys = [
+            "{prefix}{id}".format(prefix=API_KEY_PREFIX, id=user_id)
+            for user_id in user_ids
+        ]
+        await driver.copy_records_to_table(
+            "users", records=users.items(), columns=("id", "name"),
+        )
+        await driver.copy_records_to_table(
+            "users_by_keys",
+            records=zip(api_keys, user_ids),
+            columns=("api_key", "user_id"),
+        )
+        await driver.copy_records_to_table(
+            "followings",
+            records=set(generate_follows(user_ids, scale, rng)),
+            columns=("followed_id", "follower_id"),
+        )
+
+        authors = ZipfSampler(user_ids, scale.zipf_exponent, rng)
+        tweets = [(tweet_id, authors.sample()) for tweet_id in tweet_ids]
+        media_tweets = [rng.choice(tweet_ids) for _ in media_ids]
+        attachments: Dict[int, List[str]] = {}
+        for media_id, tweet_id in zip(media_ids, media_tweets):
+            attachments.setdefault(tweet_id, []).append(
+                "api/medias/{id}".format(id=media_id),
+            )
+        await driver.copy_records_to_table(
+            "tweets",
+            records=(
+                (
+                    tweet_id,
+                    "Synthetic tweet {id}".format(id=tweet_id),
+                    author_id,
+                    attachments.get(tweet_id, []),
+                )
+                for tweet_id, author_id in tweets
+            ),
+            columns=("id", "content", "author_id", "attachments"),
+        )
+        await driver.copy_records_to_table(
+            "medias",
+            records=(
+                (media_id, rng.randbytes(MEDIA_SIZE), tweet_id)
+                for media_id, tweet_id in zip(media_ids, media_tweets)
+            ),
+            columns=("id", "media_data", "tweet_id"),
+        )
+        likes = generate_likes(tweets, users, scale, rng)
+        await driver.copy_records_to_table(
+            "likes",
+            records=(
+                (tweet_id, user_id, name)
+                for (tweet_id, user_id), name in likes.items()
+            ),
+            columns=("tweet_id", "user_id", "name"),
+        )
+
+    return SeededGraph(user_ids, api_keys, tweet_ids, media_ids)
+
+
+async def load_graph(engine: AsyncEngine) -> SeededGraph:
+    """Получение ID ранее загруженного синтетического графа.
+
+    Args:
+        engine (AsyncEngine): Движок БД.
+
+    Returns:
+        SeededGraph: ID загруженных сущностей.
+    """
+    async with engine.connect() as conn:
+        keys = (await conn.execute(
+            text(
+                "SELECT user_id, api_key FROM users_by_keys "
+                + "WHERE api_key LIKE :prefix ORDER BY user_id",
+            ),
+            {"prefix": API_KEY_PREFIX + "%"},
+        )).all()
+        user_ids = [user_id for user_id, _ in keys]
+        tweet_ids = (await conn.execute(
+            text("SELECT id FROM tweets WHERE author_id = ANY(:ids) ORDER BY id"),
+            {"ids": user_ids},
+        )).scalars().all()
+        media_ids = (await conn.execute(
+            text("SELECT id FROM medias WHERE tweet_id = ANY(:ids) ORDER BY id"),
+            {"ids": tweet_ids},
+        )).scalars().all()
+    return SeededGraph(
+        user_ids,
+        [api_key for _, api_key in keys],
+        list(tweet_ids),
+        list(media_ids),
+    )
+
+
+async def cleanup_graph(engine: AsyncEngine) -> None:
+    """Удаление синтетического графа из БД.
+
+    Твиты, лайки, подписки и медиа удаляются каскадно вместе с пользователями.
+
+    Args:
+        engine (AsyncEngine): Движок БД.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "DELETE FROM users WHERE id IN "
+                + "(SELECT user_id FROM users_by_keys WHERE api_key LIKE :prefix)",
+            ),
+            {"prefix": API_KEY_PREFIX + "%"},
+        )
@@ -0,0 +1,79 @@
+"""Общие инструменты для бенчмарков."""
+import json
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict
+
+
+def measure(
+    func: Callable[[], Any],
+    number: int = 100,
+    repeat: int = 5,
+) -> Dict[str, float]:
+    """Замер времени выполнения функции.
+
+    Args:
+        func (Callable[[], Any]): Замеряемая функция без аргументов.
+        number (int): Количество вызовов в одном повторе.
+        repeat (int): Количество повторов.
+
+    Returns:
+        Dict[str, float]: Лучшее и среднее время вызова и число вызовов в секунду.
+    """
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    best = min(timings) / number
+    return {
+        "best_sec": best,
+        "mean_sec": sum(timings) / (number * repeat),
+        "ops_per_sec": 1 / best if best else float("inf"),
+    }
+
+
+async def measure_async(
+    func: Callable[[], Awaitable[Any]],
+    number: int = 20,
+    repeat: int = 5,
+) -> Dict[str, float]:
+    """Замер времени выполнения и пикового потребления памяти корутины.
+
+    Args:
+        func (Callable[[], Awaitable[Any]]): Фабрика замеряемой корутины.
+        number (int): Количество вызовов в одном повторе.
+        repeat (int): Количество повторов.
+
+    Returns:
+        Dict[str, float]: Лучшее и среднее время вызова, число вызовов
+            в секунду и пиковая память одного вызова в байтах.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    await func()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings) / number
+    return {
+        "best_sec": best,
+        "mean_sec": sum(timings) / (number * repeat),
+        "ops_per_sec": 1 / best if best else float("inf"),
+        "peak_bytes": peak_bytes,
+    }
+
+
+def dump_results(name: str, results: Dict[str, Any]) -> None:
+    """Вывод результатов бенчмарка в stdout в формате JSON.
+
+    Args:
+        name (str): Название бенчмарка.
+        results (Dict[str, Any]): Результаты замеров.
+    """
+    json.dump({"benchmark": name, "results": results}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -0,0 +1,39 @@
+"""Однократная подготовка БД перед запуском процессов приложения.
+
+Создает таблицы по ORM моделям на всех шардах и обновляет схему
+таблиц, созданных предыдущими версиями, затем создает первые секции
+секционированных таблиц и пользователей из конфигурационного файла,
+пользователи копируются на все шарды. Процессы приложения при
+старте только прогревают пул соединений.
+
+Запуск: python -m not_twitter.app.database.bootstrap
+"""
+import asyncio
+
+from not_twitter.app.config_data.users_config import users_data
+from not_twitter.app.database import (
+    crud_operations,
+    database,
+    partitions,
+    schema_upgrade,
+    shards,
+)
+
+
+async def main() -> None:
+    """Создание таблиц, секций и пользователей."""
+    try:
+        await database.init_db()
+        await shards.init_shards()
+        await schema_upgrade.upgrade_shards()
+        await partitions.manager.run_once()
+        added_count = await crud_operations.fill_db(users_data)
+        await shards.copy_users()
+    finally:
+        await shards.shutdown_shards()
+        await database.shutdown_db()
+    print("Database is ready, users added:", added_count)  # noqa: WPS421
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,456 @@
+"""Массовый импорт пользователей, твитов, лайков и подписок через COPY.
+
+Файлы JSONL или CSV читаются потоково и загружаются командой COPY во
+временные таблицы, затем одной транзакцией переносятся в основные
+таблицы. Уже существующие строки, строки пользователей и твитов без ID
+и строки со ссылками на отсутствующих пользователей или твиты
+пропускаются. ID сохраняются из источника,
+последовательность ID пользователей сдвигается за максимальный
+импортированный ID. Новые твиты получают ID по времени, которые больше
+последовательных ID твитов источника.
+Время создания твитов задается в формате ISO 8601, без него твит
+считается созданным в момент импорта.
+С --defer-indexes вторичные индексы удаляются на время переноса и
+строятся заново одним проходом. При PARTITION_SIZE больше нуля команда
+не импортирует твиты и лайки: небольшие ID источника попали бы в первые
+секции, и обслуживание секций отсоединило бы их как самые старые
+независимо от времени создания. import_files для секционированных
+таблиц создает секции диапазонов ID твитов и подходит только для
+твитов с ID, выданными по времени, например из выгрузки. После импорта
+твитов процессы приложения получают событие import и заново читают
+ленту из БД.
+
+Запуск: python -m not_twitter.app.database.bulk_import \
+    --users users.jsonl --tweets tweets.csv --likes likes.jsonl
+"""
+import argparse
+import asyncio
+import csv
+import json
+import time
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import asyncpg
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from not_twitter.app.database import database, partitions, shards
+from not_twitter.app.database.models import (
+    ApiKeyToUser,
+    Following,
+    Like,
+    Tweet,
+)
+from not_twitter.app.utils import stream_hub
+
+ATTACHMENTS_SEPARATOR = " "
+INDEXED_TABLES = (
+    Tweet.__table__,
+    Like.__table__,
+    Following.__table__,
+    ApiKeyToUser.__table__,
+)
+SEQUENCES = (("user_id_seq", "users"),)
+SET_SEQUENCE_QUERY = """
+    SELECT setval(
+        '{sequence}',
+        GREATEST(
+            (SELECT max(id) FROM {table}),
+            (SELECT last_value FROM {sequence})
+        )
+    )
+"""
+
+
+# Пустые значения ячеек CSV считаются отсутствующими
+def _parse_int(value: Any) -> Optional[int]:
+    return None if value in {None, ""} else int(value)
+
+
+def _parse_text(value: Any) -> Optional[str]:
+    return None if value in {None, ""} else str(value)
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _parse_list(value: Any) -> Optional[List[str]]:
+    if value is None or isinstance(value, list):
+        return value
+    return value.split(ATTACHMENTS_SEPARATOR) if value else []
+
+
+class ImportSource(NamedTuple):
+    """Вид импортируемых данных."""
+
+    staging_table: str
+    columns: Tuple[Tuple[str, str, Callable[[Any], Any]], ...]
+    merge_queries: Tuple[str, ...]
+    target_tables: Tuple[str, ...]
+    id_column: Optional[str] = None
+
+
+SOURCES = {
+    "users": ImportSource(
+        "import_users",
+        (
+            ("id", "integer", _parse_int),
+            ("name", "text", _parse_text),
+            ("api_key", "text", _parse_text),
+        ),
+        (
+            """
+            INSERT INTO users (id, name)
+            SELECT id, name FROM import_users
+            WHERE id IS NOT NULL
+            ON CONFLICT (id) DO NOTHING
+            """,
+            """
+            INSERT INTO users_by_keys (api_key, user_id)
+            SELECT staged.api_key, staged.id
+            FROM import_users AS staged
+            JOIN users ON users.id = staged.id
+            WHERE staged.api_key IS NOT NULL
+            ON CONFLICT (api_key) DO NOTHING
+            """,
+        ),
+        ("users", "users_by_keys"),
+        "id",
+    ),
+    "tweets": ImportSource(
+        "import_tweets",
+        (
+            ("id", "bigint", _parse_int),
+            ("author_id", "integer", _parse_int),
+            ("content", "text", _parse_text),
+            ("attachments", "text[]", _parse_list),
+            ("created_at", "timestamptz", _parse_datetime),
+        ),
+        (
+            """
+            INSERT INTO tweets (id, content, author_id, attachments, created_at)
+            SELECT staged.id, COALESCE(staged.content, ''),
+                staged.author_id, staged.attachments,
+                COALESCE(staged.created_at, now())
+            FROM import_tweets AS staged
+            JOIN users ON users.id = staged.author_id
+            WHERE staged.id IS NOT NULL
+            ON CONFLICT (id) DO NOTHING
+            """,
+        ),
+        ("tweets",),
+        "id",
+    ),
+    "likes": ImportSource(
+        "import_likes",
+        (
+            ("tweet_id", "bigint", _parse_int),
+            ("user_id", "integer", _parse_int),
+        ),
+        (
+            """
+            INSERT INTO likes (tweet_id, user_id, name)
+            SELECT staged.tweet_id, staged.user_id, users.name
+            FROM import_likes AS staged
+            JOIN users ON users.id = staged.user_id
+            JOIN tweets ON tweets.id = staged.tweet_id
+            ON CONFLICT DO NOTHING
+            """,
+        ),
+        ("likes",),
+    ),
+    "follows": ImportSource(
+        "import_follows",
+        (
+            ("followed_id", "integer", _parse_int),
+            ("follower_id", "integer", _parse_int),
+        ),
+        (
+            """
+            INSERT INTO followings (followed_id, follower_id)
+            SELECT staged.followed_id, staged.follower_id
+            FROM import_follows AS staged
+            JOIN users AS followed ON followed.id = staged.followed_id
+            JOIN users AS follower ON follower.id = staged.follower_id
+            ON CONFLICT DO NOTHING
+            """,
+        ),
+        ("followings",),
+    ),
+}
+
+
+class ImportStats(NamedTuple):
+    """Результат импорта одного вида данных."""
+
+    staged: int
+    merged: int
+    staging_seconds: float
+    without_id: int = 0
+
+
+async def read_records(
+    path: str,
+    source: ImportSource,
+) -> AsyncIterator[Tuple[Any, ...]]:
+    """Потоковое чтение записей файла JSONL или CSV.
+
+    Формат определяется по расширению, CSV должен содержать заголовок.
+
+    Args:
+        path (str): Путь к файлу.
+        source (ImportSource): Вид импортируемых данных.
+
+    Yields:
+        Tuple[Any, ...]: Значения колонок временной таблицы.
+    """
+    with open(path, newline="", encoding="utf-8") as source_file:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(source_file)
+        else:
+            rows = (json.loads(line) for line in source_file if line.strip())
+        for row in rows:
+            yield tuple(
+                parse(row.get(name)) for name, _, parse in source.columns
+            )
+
+
+def _get_index_ddl() -> Tuple[List[str], List[str]]:
+    dialect = postgresql.dialect()
+    drop, create = [], []
+    for table in INDEXED_TABLES:
+        for index in table.indexes:
+            drop.append(str(DropIndex(index).compile(dialect=dialect)))
+            create.append(str(CreateIndex(index).compile(dialect=dialect)))
+    return drop, create
+
+
+async def stage(
+    connection: asyncpg.Connection,
+    name: str,
+    path: str,
+) -> Tuple[int, float]:
+    """Загрузка файла во временную таблицу командой COPY.
+
+    Args:
+        connection (asyncpg.Connection): Соединение с БД.
+        name (str): Вид импортируемых данных.
+        path (str): Путь к файлу.
+
+    Returns:
+        Tuple[int, float]: Количество загруженных строк и время загрузки.
+    """
+    source = SOURCES[name]
+    start = time.perf_counter()
+    await connection.execute(
+        "CREATE TEMP TABLE {table} ({columns})".format(
+            table=source.staging_table,
+            columns=", ".join(
+                "{name} {kind}".format(name=column, kind=kind)
+                for column, kind, _ in source.columns
+            ),
+        ),
+    )
+    status = await connection.copy_records_to_table(
+        source.staging_table,
+        records=read_records(path, source),
+        columns=[column for column, _, _ in source.columns],
+    )
+    # У временных таблиц нет статистики, без нее планировщик выбирает
+    # вложенные циклы для соединений при переносе
+    await connection.execute(
+        "ANALYZE {table}".format(table=source.staging_table),
+    )
+    return int(status.split()[-1]), time.perf_counter() - start
+
+
+async def create_partitions(connection: asyncpg.Connection) -> None:
+    """Создание секций для диапазонов ID импортируемых твитов.
+
+    Args:
+        connection (asyncpg.Connection): Соединение с БД.
+    """
+    indexes = await connection.fetch(
+        """
+        SELECT DISTINCT id / $1 FROM {table} WHERE id IS NOT NULL
+        """.format(table=SOURCES["tweets"].staging_table),
+        partitions.PARTITION_SIZE,
+    )
+    for query in partitions.get_create_queries(row[0] for row in indexes):
+        await connection.execute(query)
+
+
+async def count_without_id(
+    connection: asyncpg.Connection,
+    source: ImportSource,
+) -> int:
+    """Подсчет пропущенных строк без ID во временной таблице.
+
+    Args:
+        connection (asyncpg.Connection): Соединение с БД.
+        source (ImportSource): Вид импортируемых данных.
+
+    Returns:
+        int: Количество строк без ID.
+    """
+    if source.id_column is None:
+        return 0
+    return await connection.fetchval(
+        "SELECT count(*) FROM {table} WHERE {column} IS NULL".format(
+            table=source.staging_table,
+            column=source.id_column,
+        ),
+    )
+
+
+async def import_files(
+    connection: asyncpg.Connection,
+    paths: Dict[str, str],
+    defer_indexes: bool = False,
+) -> Dict[str, ImportStats]:
+    """Импорт файлов в основные таблицы.
+
+    Args:
+        connection (asyncpg.Connection): Соединение с БД.
+        paths (Dict[str, str]): Пути к файлам по видам данных.
+        defer_indexes (bool): Строить вторичные индексы после переноса.
+
+    Returns:
+        Dict[str, ImportStats]: Результаты по видам данных.
+    """
+    staged = {}
+    for name in SOURCES:
+        if name in paths:
+            staged[name] = await stage(connection, name, paths[name])
+
+    stats = {}
+    drop_indexes, create_indexes = _get_index_ddl()
+    async with connection.transaction():
+        if defer_indexes:
+            for query in drop_indexes:
+                await connection.execute(query)
+        if partitions.PARTITION_SIZE and "tweets" in staged:
+            await create_partitions(connection)
+        for name, (staged_count, seconds) in staged.items():
+            merged = 0
+            for query in SOURCES[name].merge_queries:
+                status = await connection.execute(query)
+                merged += int(status.split()[-1])
+            # Следующие виды данных соединяются с только что заполненными
+            # таблицами, их статистика должна учитывать новые строки
+            await connection.execute(
+                "ANALYZE {tables}".format(
+                    tables=", ".join(SOURCES[name].target_tables),
+                ),
+            )
+            stats[name] = ImportStats(
+                staged_count,
+                merged,
+                seconds,
+                await count_without_id(connection, SOURCES[name]),
+            )
+        if defer_indexes:
+            for query in create_indexes:
+                await connection.execute(query)
+        for sequence, table in SEQUENCES:
+            await connection.execute(
+                SET_SEQUENCE_QUERY.format(sequence=sequence, table=table),
+            )
+        if "tweets" in staged:
+            await connection.execute(
+                "SELECT pg_notify($1, $2)",
+                stream_hub.CHANNEL,
+                stream_hub.get_notify_payload({"type": stream_hub.EVENT_IMPORT}),
+            )
+    for name in staged:
+        await connection.execute(
+            "DROP TABLE {table}".format(table=SOURCES[name].staging_table),
+        )
+    return stats
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Создание парсера аргументов командной строки.
+
+    Returns:
+        argparse.ArgumentParser: Парсер аргументов.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for name in SOURCES:
+        parser.add_argument(
+            "--{name}".format(name=name),
+            help="Файл JSONL или CSV",
+        )
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="Удалить вторичные индексы на время переноса",
+    )
+    return parser
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Импорт файлов из аргументов командной строки.
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки.
+    """
+    if shards.SHARD_URLS:
+        raise SystemExit("Bulk import into sharded storage is not supported")
+    if partitions.PARTITION_SIZE and (args.tweets or args.likes):
+        raise SystemExit(
+            "Bulk import of tweets and likes into partitioned storage "
+            "is not supported",
+        )
+    paths = {
+        name: getattr(args, name)
+        for name in SOURCES
+        if getattr(args, name)
+    }
+    start = time.perf_counter()
+    connection = await asyncpg.connect(database.get_driver_dsn())
+    try:
+        stats = await import_files(connection, paths, args.defer_indexes)
+    finally:
+        await connection.close()
+    elapsed = time.perf_counter() - start
+
+    for name, result in stats.items():
+        print(  # noqa: WPS421
+            "{name}: {staged} staged ({rate:.0f} rows/s), {merged} merged".format(
+                name=name,
+                staged=result.staged,
+                rate=result.staged / max(result.staging_seconds, 1e-9),
+                merged=result.merged,
+            ),
+        )
+        if result.without_id:
+            print(  # noqa: WPS421
+                "{name}: {count} rows without id skipped".format(
+                    name=name,
+                    count=result.without_id,
+                ),
+            )
+    total = sum(result.staged for result in stats.values())
+    print(  # noqa: WPS421
+        "Total: {total} rows in {elapsed:.1f}s ({rate:.0f} rows/s)".format(
+            total=total,
+            elapsed=elapsed,
+            rate=total / max(elapsed, 1e-9),
+        ),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(get_parser().parse_args()))
@@ -1,10 +1,12 @@
 """CRUD операции с базой данных."""
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
 
-from sqlalchemy import delete, desc
+from sqlalchemy import Row, and_, delete, desc, func, text, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
+from not_twitter.app.database import like_buffer, shards, task_queue
 from not_twitter.app.database.database import async_session
 from not_twitter.app.database.models import (
     ApiKeyToUser,
@@ -14,37 +16,98 @@ from not_twitter.app.database.models import (
     Tweet,
     User,
 )
+from not_twitter.app.database.projections import FeedAuthor, FeedLike, FeedTweet
+from not_twitter.app.utils import stream_hub
 
 MEDIA_URL = "api/medias/"
+LINK_MEDIAS_TASK = "link_medias"
+EXPORT_BATCH_SIZE = 1000
+FILL_DB_LOCK_ID = 7301
+# Токены корзины пополняются по времени сервера БД, общему для процессов.
+# Если токенов не хватает, строка не обновляется и не возвращается.
+# Из корзины берется до :count целых токенов за раз. Одновременное
+# создание корзины может один раз выдать лишние токены, что для
+# ограничителя допустимо.
+TAKE_TOKENS_QUERY = text(
+    """
+    WITH clock AS (
+        SELECT extract(epoch FROM clock_timestamp()) AS now
+    ), available AS (
+        SELECT COALESCE(
+            (
+                SELECT LEAST(
+                    :burst,
+                    bucket.tokens + (clock.now - bucket.updated_at) * :rate
+                )
+                FROM rate_limit_buckets AS bucket, clock
+                WHERE bucket.key = :key
+                FOR UPDATE OF bucket
+            ),
+            :burst
+        ) AS tokens
+    ), taken AS (
+        SELECT tokens, LEAST(:count, floor(tokens)) AS count FROM available
+    )
+    INSERT INTO rate_limit_buckets AS bucket (key, tokens, updated_at)
+    SELECT :key, taken.tokens - taken.count, clock.now
+    FROM taken, clock
+    WHERE taken.count >= 1
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = excluded.tokens,
+        updated_at = excluded.updated_at
+    RETURNING (SELECT count FROM taken)
+    """,
+)
+# Новые api-key получают ID пользователя из последовательности, а
+# пользователи и связи с ключами вставляются одним запросом.
+FILL_USERS_QUERY = text(
+    """
+    WITH new_keys AS (
+        SELECT data.api_key, data.name, nextval('user_id_seq') AS user_id
+        FROM unnest(
+            CAST(:api_keys AS VARCHAR[]),
+            CAST(:names AS VARCHAR[])
+        ) AS data (api_key, name)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM users_by_keys WHERE api_key = data.api_key
+        )
+    ), new_users AS (
+        INSERT INTO users (id, name) SELECT user_id, name FROM new_keys
+    )
+    INSERT INTO users_by_keys (api_key, user_id)
+    SELECT api_key, user_id FROM new_keys
+    ON CONFLICT (api_key) DO NOTHING
+    """,
+)
 
 
-async def fill_db(users_data: Dict[str, str]) -> None:
+async def fill_db(users_data: Dict[str, str]) -> int:
     """Создание пользователей и Api-key в базе данных.
 
+    Пользователи создаются одним запросом в одной транзакции, уже
+    существующие api-key пропускаются, поэтому удаленные из БД
+    пользователи и api-key создаются заново при каждом запуске.
+
     Args:
         users_data (Dict[str, str]): Словарь 'api_key': 'имя_пользователя'.
+
+    Returns:
+        int: Количество созданных пользователей.
     """
     async with async_session() as session:
-        query = await session.execute(select(ApiKeyToUser.api_key))
-        api_keys = query.scalars()
-        users_to_add = []
-        keys_to_add = []
-        for key in users_data.keys():
-            if key not in api_keys:
-                users_to_add.append(User(name=users_data[key]))
-                keys_to_add.append(ApiKeyToUser(api_key=key))
-
-        if not users_to_add:
-            return
-
-        session.add_all(users_to_add)
-        await session.commit()
-
-        for idx in range(len(users_to_add)):
-            keys_to_add[idx].user_id = users_to_add[idx].id
-        session.add_all(keys_to_add)
-        await session.commit()
-        await session.close()
+        async with session.begin():
+            await session.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                {"lock_id": FILL_DB_LOCK_ID},
+            )
+            query = await session.execute(
+                FILL_USERS_QUERY,
+                {
+                    "api_keys": list(users_data.keys()),
+                    "names": list(users_data.values()),
+                },
+            )
+            return query.rowcount
 
 
 async def get_user_by_api_key(api_key: str) -> Optional[User]:
@@ -59,17 +122,37 @@ async def get_user_by_api_key(api_key: str) -> Optional[User]:
     async with async_session() as session:
         async with session.begin():
             query = await session.execute(
-                select(ApiKeyToUser)
+                select(User)
+                .join(ApiKeyToUser, ApiKeyToUser.user_id == User.id)
                 .where(ApiKeyToUser.api_key == api_key)
                 .options(
-                    selectinload(ApiKeyToUser.user).subqueryload(User.following),
-                    selectinload(ApiKeyToUser.user).subqueryload(User.followers),
+                    selectinload(User.following),
+                    selectinload(User.followers),
                 )
             )
-            key_to_user = query.scalar()
-            if key_to_user:
-                return key_to_user.user
-            return None
+            return query.scalar()
+
+
+async def get_auth_user_by_api_key(api_key: str) -> Optional[User]:
+    """Получение пользователя из БД по его api-key без связанных объектов.
+
+    Используется для аутентификации, которой достаточно ID и имени
+    пользователя, поэтому выполняется одним запросом.
+
+    Args:
+        api_key (str): Api-key пользователя.
+
+    Returns:
+        User: Объект пользователя или None.
+    """
+    async with async_session() as session:
+        async with session.begin():
+            query = await session.execute(
+                select(User)
+                .join(ApiKeyToUser, ApiKeyToUser.user_id == User.id)
+                .where(ApiKeyToUser.api_key == api_key)
+            )
+            return query.scalar()
 
 
 async def get_user_by_id(user_id: int) -> Optional[User]:
@@ -97,6 +180,10 @@ async def get_user_by_id(user_id: int) -> Optional[User]:
 async def create_tweet(user: User, content: str, media_ids: List[int]) -> int:
     """Создание твита в БД за авторством пользователя.
 
+    Твит создается на шарде автора. Медиа того же шарда привязываются
+    к нему отложенной задачей, добавленной в транзакции твита. Событие
+    о новом твите публикуется подписчикам потока событий.
+
     Args:
         user (User): Объект автора твита.
         content (str): Содержимое твита.
@@ -105,24 +192,54 @@ async def create_tweet(user: User, content: str, media_ids: List[int]) -> int:
     Returns:
         int: ID созданного твита.
     """
-    async with async_session() as session:
-        new_tweet = Tweet(
-            content=content,
-            author_id=user.id,
-            attachments=[MEDIA_URL + str(media_id) for media_id in media_ids],
-        )
-        session.add(new_tweet)
-        await session.commit()
-        if media_ids:
-            query = await session.execute(
-                select(Media).filter(Media.id.in_(media_ids)),
+    shard = shards.shard_for_user(user.id)
+    tweet_id = shards.next_id(shard)
+    async with shards.get_session(shard) as session:
+        async with session.begin():
+            new_tweet = Tweet(
+                id=tweet_id,
+                content=content,
+                author_id=user.id,
+                attachments=[
+                    MEDIA_URL + str(media_id) for media_id in media_ids
+                ],
+            )
+            session.add(new_tweet)
+            if media_ids:
+                task_queue.queue.enqueue(
+                    session,
+                    LINK_MEDIAS_TASK,
+                    {"tweet_id": tweet_id, "media_ids": media_ids},
+                )
+            event = stream_hub.tweet_created_event(
+                tweet_id,
+                content,
+                new_tweet.attachments,
+                user.id,
+                user.name,
+            )
+            await stream_hub.hub.notify_workers(session, event)
+    if media_ids:
+        task_queue.queue.wake()
+    stream_hub.hub.publish(event)
+    return tweet_id
+
+
+@task_queue.queue.handler(LINK_MEDIAS_TASK)
+async def link_medias(payload: Dict[str, Any], shard: int) -> None:
+    """Привязка медиа к твиту.
+
+    Args:
+        payload (Dict[str, Any]): ID твита и его медиа.
+        shard (int): Номер шарда твита.
+    """
+    async with shards.get_session(shard) as session:
+        async with session.begin():
+            await session.execute(
+                update(Media)
+                .where(Media.id.in_(payload["media_ids"]))
+                .values(tweet_id=payload["tweet_id"]),
             )
-            medias = query.scalars()
-            for media in medias:
-                media.tweet_id = new_tweet.id
-            await session.commit()
-        await session.close()
-        return new_tweet.id
 
 
 async def get_tweets_by_author_id(author_id: int) -> Optional[List[Tweet]]:
@@ -134,13 +251,16 @@ async def get_tweets_by_author_id(author_id: int) -> Optional[List[Tweet]]:
     Returns:
         List[Tweet]: Список объектов твитов.
     """
-    async with async_session() as session:
+    async with shards.get_session(shards.shard_for_user(author_id)) as session:
         async with session.begin():
             query = await session.execute(
                 select(Tweet)
                 .where(Tweet.author_id == author_id)
                 .order_by(desc(Tweet.id))
-                .options(selectinload(Tweet.likes)),
+                .options(
+                    selectinload(Tweet.author),
+                    selectinload(Tweet.likes),
+                ),
             )
             return query.scalars().all()
 
@@ -154,7 +274,7 @@ async def get_tweet_by_id(tweet_id: int) -> Optional[Tweet]:
     Returns:
         Tweet: Объект твита или None.
     """
-    async with async_session() as session:
+    async with shards.get_session(shards.shard_for_id(tweet_id)) as session:
         async with session.begin():
             query = await session.execute(
                 select(Tweet)
@@ -166,34 +286,220 @@ async def get_tweet_by_id(tweet_id: int) -> Optional[Tweet]:
             return query.scalar()
 
 
-async def get_all_tweets() -> Optional[List[Tweet]]:
-    """Получение списка всех твитов из БД.
+async def _get_shard_tweets(shard: int) -> List[Tweet]:
+    """Получение списка всех твитов шарда.
+
+    Args:
+        shard (int): Номер шарда.
 
     Returns:
-        List[Tweet]: Список объектов твитов или None.
+        List[Tweet]: Список объектов твитов по убыванию ID.
     """
-    async with async_session() as session:
+    async with shards.get_session(shard) as session:
         async with session.begin():
             query = await session.execute(
                 select(Tweet)
                 .order_by(desc(Tweet.id))
                 .options(
+                    selectinload(Tweet.author),
                     selectinload(Tweet.likes),
                 )
             )
             return query.scalars().all()
 
 
+async def get_all_tweets() -> Optional[List[Tweet]]:
+    """Получение списка всех твитов из БД.
+
+    Returns:
+        List[Tweet]: Список объектов твитов или None.
+    """
+    return shards.merge_desc(
+        await shards.gather(_get_shard_tweets),
+        key=lambda tweet: tweet.id,
+    )
+
+
+def _feed_query(since_id: Optional[int] = None):
+    """Запрос строк ленты с агрегированными лайками.
+
+    Условие на since_id повторяется для лайков, чтобы при секционировании
+    обе таблицы читались только из секций новее since_id.
+
+    Args:
+        since_id (Optional[int]): Вернуть только твиты с большим ID.
+
+    Returns:
+        Select: Запрос, возвращающий по одной строке на твит.
+    """
+    like_filter = Like.user_id.isnot(None)
+    like_join = Like.tweet_id == Tweet.id
+    if since_id is not None:
+        like_join = and_(like_join, Like.tweet_id > since_id)
+    statement = (
+        select(
+            Tweet.id,
+            Tweet.content,
+            Tweet.attachments,
+            User.id.label("author_id"),
+            User.name.label("author_name"),
+            func.array_agg(
+                aggregate_order_by(Like.user_id, Like.user_id),
+            ).filter(like_filter).label("like_user_ids"),
+            func.array_agg(
+                aggregate_order_by(Like.name, Like.user_id),
+            ).filter(like_filter).label("like_names"),
+        )
+        .join(User, User.id == Tweet.author_id)
+        .outerjoin(Like, like_join)
+        .group_by(Tweet.id, User.id)
+        .order_by(desc(Tweet.id))
+    )
+    if since_id is not None:
+        statement = statement.where(Tweet.id > since_id)
+    return statement
+
+
+def _make_feed_tweet(row) -> FeedTweet:
+    """Сборка твита ленты из строки результата запроса.
+
+    Args:
+        row: Строка результата запроса ленты.
+
+    Returns:
+        FeedTweet: Твит ленты.
+    """
+    likes = []
+    if row.like_user_ids:
+        likes = [
+            FeedLike(user_id, name)
+            for user_id, name in zip(row.like_user_ids, row.like_names)
+        ]
+    return FeedTweet(
+        row.id,
+        row.content,
+        row.attachments,
+        FeedAuthor(row.author_id, row.author_name),
+        likes,
+    )
+
+
+async def get_feed(since_id: Optional[int] = None) -> List[FeedTweet]:
+    """Получение ленты твитов без создания ORM объектов.
+
+    Твиты, их авторы и лайки выбираются одним запросом к каждому шарду,
+    ленты шардов сливаются по убыванию ID.
+
+    Args:
+        since_id (Optional[int]): Вернуть только твиты с большим ID.
+
+    Returns:
+        List[FeedTweet]: Список твитов ленты.
+    """
+    statement = _feed_query(since_id)
+
+    async def get_shard_feed(shard: int) -> List[FeedTweet]:
+        async with shards.get_session(shard) as session:
+            async with session.begin():
+                query = await session.execute(statement)
+                return [_make_feed_tweet(row) for row in query]
+
+    return shards.merge_desc(
+        await shards.gather(get_shard_feed),
+        key=lambda tweet: tweet.id,
+    )
+
+
+async def _stream_rows(
+    statement,
+    shard: int = 0,
+) -> AsyncIterator[Sequence[Row]]:
+    """Чтение результата запроса пачками через серверный курсор.
+
+    Args:
+        statement: Запрос.
+        shard (int): Номер шарда.
+
+    Yields:
+        Sequence[Row]: Пачка строк результата.
+    """
+    statement = statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+    async with shards.get_session(shard) as session:
+        async with session.begin():
+            result = await session.stream(statement)
+            async for partition in result.partitions():
+                yield partition
+
+
+def stream_user_tweets(
+    user_id: int,
+    after_id: int = 0,
+) -> AsyncIterator[Sequence[Row]]:
+    """Чтение твитов пользователя по возрастанию ID без загрузки в память.
+
+    Args:
+        user_id (int): ID автора твитов.
+        after_id (int): Вернуть только твиты с большим ID.
+
+    Returns:
+        AsyncIterator[Sequence[Row]]: Пачки строк с ID, содержимым
+        и медиа твитов.
+    """
+    return _stream_rows(
+        select(Tweet.id, Tweet.content, Tweet.attachments)
+        .where(Tweet.author_id == user_id, Tweet.id > after_id)
+        .order_by(Tweet.id),
+        shards.shard_for_user(user_id),
+    )
+
+
+def stream_user_likes(
+    user_id: int,
+    after_id: int = 0,
+) -> AsyncIterator[Sequence[Row]]:
+    """Чтение лайков пользователя по возрастанию ID твита.
+
+    Лайки хранятся на шардах твитов, потоки шардов сливаются по ID.
+
+    Args:
+        user_id (int): ID поставившего лайки пользователя.
+        after_id (int): Вернуть только лайки твитов с большим ID.
+
+    Returns:
+        AsyncIterator[Sequence[Row]]: Пачки строк с ID, автором
+        и содержимым понравившихся твитов.
+    """
+    statement = (
+        select(Like.tweet_id, Tweet.author_id, Tweet.content)
+        .join(Tweet, Tweet.id == Like.tweet_id)
+        .where(Like.user_id == user_id, Like.tweet_id > after_id)
+        .order_by(Like.tweet_id)
+    )
+    if len(shards.sessions) == 1:
+        return _stream_rows(statement)
+    return shards.merge_streams(
+        [
+            _stream_rows(statement, shard)
+            for shard in range(len(shards.sessions))
+        ],
+        key=lambda row: row.tweet_id,
+        batch_size=EXPORT_BATCH_SIZE,
+    )
+
+
 async def delete_tweet_by_id(tweet_id: int) -> None:
     """Удаление твита из БД по его ID.
 
     Args:
         tweet_id (int): ID твита.
     """
-    async with async_session() as session:
+    event = stream_hub.tweet_deleted_event(tweet_id)
+    async with shards.get_session(shards.shard_for_id(tweet_id)) as session:
         async with session.begin():
             await session.execute(delete(Tweet).where(Tweet.id == tweet_id))
+            await stream_hub.hub.notify_workers(session, event)
             await session.commit()
+    stream_hub.hub.publish(event)
 
 
 async def delete_given_tweet(tweet: Tweet) -> None:
@@ -205,18 +511,22 @@ async def delete_given_tweet(tweet: Tweet) -> None:
     await delete_tweet_by_id(tweet.id)
 
 
-async def add_media(data: bytes) -> int:
+async def add_media(data: bytes, user_id: Optional[int] = None) -> int:
     """Добавление медиа в БД.
 
     Args:
         data (bytes): Байтовая строка добавляемого медиа.
+        user_id (Optional[int]): ID загрузившего медиа пользователя,
+            медиа хранится на его шарде.
 
     Returns:
         int: ID добавленного медиа.
     """
-    async with async_session() as session:
+    shard = 0 if user_id is None else shards.shard_for_user(user_id)
+    media_id = shards.next_id(shard)
+    async with shards.get_session(shard) as session:
         async with session.begin():
-            new_media = Media(media_data=data)
+            new_media = Media(id=media_id, media_data=data)
             session.add(new_media)
             await session.commit()
             return new_media.id
@@ -231,7 +541,7 @@ async def get_media_by_id(media_id: int) -> Optional[Media]:
     Returns:
         Media: Объект медиа или None.
     """
-    async with async_session() as session:
+    async with shards.get_session(shards.shard_for_id(media_id)) as session:
         async with session.begin():
             query = await session.execute(
                 select(Media).where(Media.id == media_id),
@@ -242,11 +552,17 @@ async def get_media_by_id(media_id: int) -> Optional[Media]:
 async def add_like_by_user_to_tweet(user: User, tweet: Tweet) -> None:
     """Создание записи о лайке твита в БД.
 
+    При включенной отложенной записи лайк добавляется в буфер лайков.
+
     Args:
         user (User): Объект пользователя, поставившего лайк.
         tweet (Tweet): Объект твита, которому поставлен лайк
     """
-    async with async_session() as session:
+    if like_buffer.buffer.running:
+        await like_buffer.buffer.put(tweet.id, user.id, True, user.name)
+        return
+    event = stream_hub.like_event(tweet.id, user.id, user.name)
+    async with shards.get_session(shards.shard_for_id(tweet.id)) as session:
         async with session.begin():
             new_like = Like(
                 tweet_id=tweet.id,
@@ -254,24 +570,36 @@ async def add_like_by_user_to_tweet(user: User, tweet: Tweet) -> None:
                 name=user.name,
             )
             session.add(new_like)
+            await stream_hub.hub.notify_workers(session, event)
             await session.commit()
+    stream_hub.hub.publish(event)
 
 
 async def delete_like_by_user_from_tweet(user: User, tweet: Tweet) -> None:
     """Удаление записи о лайке твита в БД.
 
+    При включенной отложенной записи снятие лайка добавляется в буфер
+    лайков.
+
     Args:
         user (User): Объект пользователя, поставившего лайк.
         tweet (Tweet): Объект твита, которому поставлен лайк
     """
-    async with async_session() as session:
+    if like_buffer.buffer.running:
+        await like_buffer.buffer.put(tweet.id, user.id, False)
+        return
+    event = stream_hub.unlike_event(tweet.id, user.id)
+    async with shards.get_session(shards.shard_for_id(tweet.id)) as session:
         async with session.begin():
             await session.execute(
                 delete(Like).where(
-                    Like.tweet_id == tweet.id and Like.user_id == user.id,
+                    Like.tweet_id == tweet.id,
+                    Like.user_id == user.id,
                 )
             )
+            await stream_hub.hub.notify_workers(session, event)
             await session.commit()
+    stream_hub.hub.publish(event)
 
 
 async def add_following(followed: User, follower: User) -> None:
@@ -307,3 +635,29 @@ async def remove_following(followed: User, follower: User) -> None:
                 )
             )
             await session.commit()
+
+
+async def take_rate_limit_tokens(
+    key: str,
+    rate: float,
+    burst: float,
+    count: int,
+) -> int:
+    """Получение токенов из корзины ограничителя частоты запросов.
+
+    Args:
+        key (str): Ключ корзины.
+        rate (float): Скорость пополнения, токенов в секунду.
+        burst (float): Размер корзины.
+        count (int): Наибольшее количество токенов.
+
+    Returns:
+        int: Количество полученных токенов, 0 - токенов нет.
+    """
+    async with async_session() as session:
+        async with session.begin():
+            query = await session.execute(
+                TAKE_TOKENS_QUERY,
+                {"key": key, "rate": rate, "burst": burst, "count": count},
+            )
+            return int(query.scalar() or 0)
@@ -1,13 +1,43 @@
 """Соединение и работа с базой данных."""
+import asyncio
 import os
+import time
+from typing import Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.orm.decl_api import DeclarativeMeta
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from not_twitter.app.database import instrumentation
+from not_twitter.app.utils import metrics, readiness
 
 DATABASE_URL = os.getenv("POSTGRES_URL")
+POOL_WARMUP_CONNECTIONS = int(os.getenv("DB_POOL_WARMUP_CONNECTIONS", "5"))
+# Журнал всех запросов с параметрами, включая api-key, - только для отладки
+ECHO = os.getenv("DB_ECHO", "0") == "1"
+SCHEMA_LOCK_ID = 7300
+pool_warmed_up = False
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время ожидания соединения."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=ECHO,
+    poolclass=MeasuredQueuePool,
+)
+instrumentation.install(engine.sync_engine)
 async_session = sessionmaker(
     engine,
     expire_on_commit=False,
@@ -16,12 +46,97 @@ async_session = sessionmaker(
 Base: DeclarativeMeta = declarative_base()
 
 
+def collect_pool_metrics() -> None:
+    """Обновление метрик загрузки пула соединений."""
+    pool = engine.sync_engine.pool
+    metrics.DB_POOL_SIZE.set(pool.size())
+    metrics.DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    metrics.DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+metrics.REGISTRY.add_collector(collect_pool_metrics)
+
+
+def get_driver_dsn(db_engine: Optional[AsyncEngine] = None) -> str:
+    """Строка подключения к БД для прямых соединений asyncpg.
+
+    Args:
+        db_engine (Optional[AsyncEngine]): Движок БД, по умолчанию основной.
+
+    Returns:
+        str: DSN без указания драйвера SQLAlchemy.
+    """
+    url = (db_engine or engine).url.set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+def is_pool_exhausted() -> bool:
+    """Проверка, что запрос соединения будет ждать его освобождения.
+
+    Returns:
+        bool: True, если свободных соединений нет и новые создать нельзя.
+    """
+    pool = engine.sync_engine.pool
+    return pool.checkedin() == 0 and pool.overflow() >= pool._max_overflow
+
+
 async def init_db() -> None:
-    """Инициирование таблиц БД на основании ORM моделей."""
+    """Инициирование таблиц БД на основании ORM моделей.
+
+    Выполняется под advisory lock, поэтому одновременный запуск
+    из нескольких процессов не приводит к гонке DDL.
+    """
     async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:lock_id)"),
+            {"lock_id": SCHEMA_LOCK_ID},
+        )
         await conn.run_sync(Base.metadata.create_all)
 
 
+async def _ping() -> None:
+    """Выполнение простейшего запроса на соединении из пула."""
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def warm_up_pool(connections: int = POOL_WARMUP_CONNECTIONS) -> None:
+    """Открытие соединений пула до приема первых запросов.
+
+    Args:
+        connections (int): Количество соединений, не больше размера пула.
+    """
+    global pool_warmed_up
+    connections = min(connections, engine.sync_engine.pool.size())
+    await asyncio.gather(*(_ping() for _ in range(connections)))
+    pool_warmed_up = True
+
+
+async def check_connection() -> bool:
+    """Проверка доступности БД.
+
+    Returns:
+        bool: Признак успешного выполнения запроса.
+    """
+    await _ping()
+    return True
+
+
+async def check_pool_warmed_up() -> bool:
+    """Проверка завершения прогрева пула соединений.
+
+    Returns:
+        bool: Признак прогретого пула.
+    """
+    return pool_warmed_up
+
+
+readiness.REGISTRY.register("database", check_connection)
+readiness.REGISTRY.register("pool_warm_up", check_pool_warmed_up)
+
+
 async def shutdown_db() -> None:
     """Завершение работы с БД."""
+    global pool_warmed_up
+    pool_warmed_up = False
     await engine.dispose()
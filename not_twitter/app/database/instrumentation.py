@@ -0,0 +1,105 @@
+"""Инструментирование SQL запросов.
+
+Хуки событий движка SQLAlchemy считают количество и длительность
+запросов и относят их к текущему HTTP запросу через contextvar.
+Запросы дольше порога пишутся в лог без значений параметров.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from not_twitter.app.utils import metrics
+
+SLOW_QUERY_THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200")) / 1000
+STATEMENT_LOG_LIMIT = 1000
+
+logger = logging.getLogger("not_twitter.sql")
+
+
+class RequestDBStats:
+    """Статистика SQL запросов в рамках одного HTTP запроса."""
+
+    __slots__ = ("query_count", "db_time")
+
+    def __init__(self) -> None:
+        """Создание пустой статистики."""
+        self.query_count = 0
+        self.db_time = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestDBStats]] = ContextVar(
+    "request_db_stats",
+    default=None,
+)
+
+
+def start_request_stats() -> Token:
+    """Начало сбора статистики SQL запросов для текущего контекста.
+
+    Returns:
+        Token: Токен для восстановления предыдущего значения.
+    """
+    return _request_stats.set(RequestDBStats())
+
+
+def get_request_stats() -> Optional[RequestDBStats]:
+    """Получение статистики SQL запросов текущего контекста.
+
+    Returns:
+        Optional[RequestDBStats]: Статистика или None вне HTTP запроса.
+    """
+    return _request_stats.get()
+
+
+def finish_request_stats(token: Token) -> None:
+    """Завершение сбора статистики SQL запросов.
+
+    Args:
+        token (Token): Токен, полученный от start_request_stats.
+    """
+    _request_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    metrics.DB_QUERY_DURATION.observe(duration)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += duration
+
+    if duration >= SLOW_QUERY_THRESHOLD:
+        metrics.DB_SLOW_QUERIES_TOTAL.inc()
+        logger.warning(
+            "Slow query (%.1f ms, executemany=%s, parameters redacted): %s",
+            duration * 1000,
+            executemany,
+            statement[:STATEMENT_LOG_LIMIT],
+        )
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def install(engine: Engine) -> None:
+    """Подключение хуков инструментирования к движку.
+
+    Args:
+        engine (Engine): Синхронный движок SQLAlchemy.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
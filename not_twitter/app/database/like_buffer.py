@@ -0,0 +1,253 @@
+"""Отложенная запись лайков пачками.
+
+При LIKE_BUFFER_FLUSH_MS больше нуля лайки и их снятия копятся в памяти
+процесса и записываются в БД раз в LIKE_BUFFER_FLUSH_MS миллисекунд или
+по накоплении LIKE_BUFFER_MAX_ENTRIES записей: одним INSERT ... ON
+CONFLICT и одним DELETE на шард. Повторные действия пользователя с одним
+твитом до записи схлопываются, остается последнее.
+
+С LIKE_BUFFER_DURABLE=1 запрос ждет записи своей пачки: ответ
+возвращается после фиксации транзакции, а пачка объединяет лайки
+одновременных запросов. С LIKE_BUFFER_DURABLE=0 запрос отвечает сразу,
+лайк виден в ленте после записи пачки и теряется при аварийном
+завершении процесса. Ошибка записи пачки передается ожидающим запросам
+и не останавливает запись в фоне. При остановке приложения буфер
+записывается, включая лайки, добавленные во время последней записи.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+
+from not_twitter.app.database import shards
+from not_twitter.app.utils import metrics, stream_hub
+
+FLUSH_INTERVAL = float(os.getenv("LIKE_BUFFER_FLUSH_MS", "0")) / 1000
+MAX_ENTRIES = int(os.getenv("LIKE_BUFFER_MAX_ENTRIES", "500"))
+DURABLE = os.getenv("LIKE_BUFFER_DURABLE", "1") == "1"
+
+# Лайки удаленных за время ожидания твитов пропускаются
+INSERT_LIKES_QUERY = text(
+    """
+    INSERT INTO likes (tweet_id, user_id, name)
+    SELECT data.tweet_id, data.user_id, data.name
+    FROM unnest(
+        CAST(:tweet_ids AS BIGINT[]),
+        CAST(:user_ids AS INTEGER[]),
+        CAST(:names AS VARCHAR[])
+    ) AS data (tweet_id, user_id, name)
+    JOIN tweets ON tweets.id = data.tweet_id
+    ON CONFLICT (tweet_id, user_id) DO NOTHING
+    RETURNING likes.tweet_id, likes.user_id, likes.name
+    """,
+)
+DELETE_LIKES_QUERY = text(
+    """
+    DELETE FROM likes
+    USING unnest(
+        CAST(:tweet_ids AS BIGINT[]),
+        CAST(:user_ids AS INTEGER[])
+    ) AS data (tweet_id, user_id)
+    WHERE likes.tweet_id = data.tweet_id AND likes.user_id = data.user_id
+    RETURNING likes.tweet_id, likes.user_id
+    """,
+)
+
+logger = logging.getLogger(__name__)
+
+LikeKey = Tuple[int, int]
+
+
+class PendingLike(NamedTuple):
+    """Последнее действие пользователя с твитом, ожидающее записи."""
+
+    liked: bool
+    name: str
+    waiters: List[asyncio.Future]
+
+
+class LikeBuffer:
+    """Буфер лайков с периодической записью в фоне."""
+
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_entries: int = MAX_ENTRIES,
+        durable: bool = DURABLE,
+    ) -> None:
+        """Создание незапущенного буфера.
+
+        Args:
+            flush_interval (float): Интервал записи в секундах,
+                0 - буферизация выключена.
+            max_entries (int): Количество записей для внеочередной записи.
+            durable (bool): Ждать записи пачки при добавлении.
+        """
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self.durable = durable
+        self._pending: Dict[LikeKey, PendingLike] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopped = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """Признак запущенной записи в фоне.
+
+        Returns:
+            bool: True, если лайки нужно добавлять в буфер.
+        """
+        return self._task is not None
+
+    def start(self) -> None:
+        """Запуск периодической записи в фоне."""
+        if self.flush_interval and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._stopped = False
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Запись оставшихся лайков и остановка записи в фоне."""
+        if self._task is None:
+            return
+        self._stopped = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        # Лайки, добавленные во время последней записи; без успешной
+        # записи остаток не ждет вечно
+        written = True
+        while self._pending and written:
+            written = await self.flush()
+
+    async def put(
+        self,
+        tweet_id: int,
+        user_id: int,
+        liked: bool,
+        name: str = "",
+    ) -> None:
+        """Добавление лайка или его снятия в буфер.
+
+        Args:
+            tweet_id (int): ID твита.
+            user_id (int): ID пользователя.
+            liked (bool): True - лайк, False - снятие лайка.
+            name (str): Имя пользователя для лайка.
+        """
+        key = (tweet_id, user_id)
+        previous = self._pending.get(key)
+        waiters = previous.waiters if previous else []
+        waiter = None
+        if self.durable:
+            waiter = asyncio.get_running_loop().create_future()
+            waiters.append(waiter)
+        self._pending[key] = PendingLike(liked, name, waiters)
+        metrics.LIKE_BUFFER_PENDING.set(len(self._pending))
+        if len(self._pending) >= self.max_entries:
+            self._wakeup.set()
+        if waiter is not None:
+            await waiter
+
+    async def flush(self) -> int:
+        """Запись накопленных лайков на их шарды.
+
+        Returns:
+            int: Количество записанных действий.
+        """
+        entries, self._pending = self._pending, {}
+        metrics.LIKE_BUFFER_PENDING.set(0)
+        by_shard: Dict[int, Dict[LikeKey, PendingLike]] = defaultdict(dict)
+        for key, entry in entries.items():
+            by_shard[shards.shard_for_id(key[0])][key] = entry
+        written = 0
+        for shard, shard_entries in by_shard.items():
+            try:
+                await self._write(shard, shard_entries)
+            # Ошибка любого вида, включая ожидание пула, не должна
+            # оставлять запросы ждать записи без ответа
+            except Exception as exc:  # noqa: B902
+                logger.warning("Like buffer flush failed: %s", exc)
+                self._fail(shard_entries, exc)
+                continue
+            written += len(shard_entries)
+            for entry in shard_entries.values():
+                for waiter in entry.waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+        metrics.LIKE_BUFFER_FLUSHED_TOTAL.inc(written)
+        return written
+
+    async def _write(
+        self,
+        shard: int,
+        entries: Dict[LikeKey, PendingLike],
+    ) -> None:
+        likes = [
+            (key, entry.name) for key, entry in entries.items() if entry.liked
+        ]
+        unlikes = [key for key, entry in entries.items() if not entry.liked]
+        events = []
+        async with shards.get_session(shard) as session:
+            async with session.begin():
+                if likes:
+                    query = await session.execute(INSERT_LIKES_QUERY, {
+                        "tweet_ids": [key[0] for key, _ in likes],
+                        "user_ids": [key[1] for key, _ in likes],
+                        "names": [name for _, name in likes],
+                    })
+                    events.extend(
+                        stream_hub.like_event(*row) for row in query
+                    )
+                if unlikes:
+                    query = await session.execute(DELETE_LIKES_QUERY, {
+                        "tweet_ids": [key[0] for key in unlikes],
+                        "user_ids": [key[1] for key in unlikes],
+                    })
+                    events.extend(
+                        stream_hub.unlike_event(*row) for row in query
+                    )
+                for event in events:
+                    await stream_hub.hub.notify_workers(session, event)
+        for event in events:
+            stream_hub.hub.publish(event)
+
+    def _fail(
+        self,
+        entries: Dict[LikeKey, PendingLike],
+        exc: Exception,
+    ) -> None:
+        # Ожидающие запросы получают ошибку, как при прямой записи, а
+        # без ожидания действия возвращаются в буфер, если их не сменили
+        # более новые
+        if self.durable:
+            for entry in entries.values():
+                for waiter in entry.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(exc)
+            return
+        for key, entry in entries.items():
+            self._pending.setdefault(key, entry)
+        metrics.LIKE_BUFFER_PENDING.set(len(self._pending))
+
+    async def _run(self) -> None:
+        while not self._stopped:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    self.flush_interval,
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as exc:  # noqa: B902
+                logger.error("Like buffer flush crashed: %s", exc)
+
+
+buffer = LikeBuffer()
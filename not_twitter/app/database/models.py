@@ -1,7 +1,23 @@
 """ORM модели для базы данных."""
-from sqlalchemy import ARRAY, Column, ForeignKey, Integer, LargeBinary, Sequence, String
+from sqlalchemy import (
+    ARRAY,
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    Sequence,
+    String,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
+from not_twitter.app.database import partitions, snowflake
 from not_twitter.app.database.database import Base
 
 
@@ -43,7 +59,7 @@ class User(Base):
         primaryjoin=id == Following.follower_id,
         secondaryjoin=id == Following.followed_id,
         backref="followers",
-        lazy="selectin",
+        lazy="select",
     )
 
     api_key = relationship(
@@ -55,7 +71,7 @@ class User(Base):
     tweets = relationship(
         "Tweet",
         back_populates="author",
-        lazy="joined",
+        lazy="select",
         cascade="all, delete-orphan",
     )
 
@@ -86,10 +102,15 @@ class Tweet(Base):
     """Представление твита."""
 
     __tablename__ = "tweets"
+    __table_args__ = (
+        Index("ix_tweets_author_id_id", "author_id", "id"),
+        Index("ix_tweets_created_at", "created_at"),
+        partitions.table_options("id"),
+    )
     id = Column(
-        Integer,
-        Sequence("tweet_id_seq"),
+        BigInteger,
         primary_key=True,
+        default=snowflake.generator.next_id,
     )
     content = Column(
         String,
@@ -103,27 +124,36 @@ class Tweet(Base):
     author = relationship(
         "User",
         back_populates="tweets",
-        lazy="selectin",
+        lazy="select",
         passive_deletes=True,
     )
     likes = relationship(
         "Like",
         back_populates="tweet",
-        lazy="selectin",
+        lazy="select",
         cascade="all, delete-orphan",
     )
     attachments = Column(
         ARRAY(String),
         nullable=True,
     )
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
 
 
 class Like(Base):
     """Представление лайка."""
 
     __tablename__ = "likes"
+    __table_args__ = (
+        Index("ix_likes_user_id_tweet_id", "user_id", "tweet_id"),
+        partitions.table_options("tweet_id"),
+    )
     tweet_id = Column(
-        Integer,
+        BigInteger,
         ForeignKey("tweets.id", ondelete="CASCADE"),
         primary_key=True,
         nullable=False,
@@ -150,15 +180,82 @@ class Media(Base):
 
     __tablename__ = "medias"
     id = Column(
-        Integer,
-        Sequence("media_id_seq"),
+        BigInteger,
         primary_key=True,
+        default=snowflake.generator.next_id,
     )
     media_data = Column(
         LargeBinary,
         nullable=False,
     )
     tweet_id = Column(
-        Integer,
+        BigInteger,
         ForeignKey("tweets.id", ondelete="CASCADE"),
     )
+
+
+class RateLimitBucket(Base):
+    """Представление корзины ограничителя частоты запросов.
+
+    Таблица не журналируется: после сбоя сервера корзины просто
+    заполняются заново.
+    """
+
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+    key = Column(
+        String(100),
+        primary_key=True,
+    )
+    tokens = Column(
+        Float,
+        nullable=False,
+    )
+    updated_at = Column(
+        Float,
+        nullable=False,
+    )
+
+
+class Job(Base):
+    """Представление отложенной задачи очереди задач."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index(
+            "ix_jobs_run_at",
+            "run_at",
+            postgresql_where=text("failed_at IS NULL"),
+        ),
+    )
+    id = Column(
+        BigInteger,
+        Sequence("job_id_seq"),
+        primary_key=True,
+    )
+    kind = Column(
+        String(50),
+        nullable=False,
+    )
+    payload = Column(
+        JSONB,
+        nullable=False,
+    )
+    attempts = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+    run_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+    last_error = Column(
+        String,
+        nullable=True,
+    )
+    failed_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
@@ -0,0 +1,390 @@
+"""Секционирование таблиц твитов и лайков по диапазонам ID твитов.
+
+При PARTITION_SIZE больше нуля таблицы tweets и likes создаются
+секционированными по ID твита, секции обеих таблиц имеют одинаковые
+границы. ID твитов возрастают по времени на 4096 в миллисекунду,
+поэтому секция охватывает PARTITION_SIZE / 4096 миллисекунд.
+Приложение заранее создает секции впереди текущего ID и, при
+PARTITIONS_RETAINED больше нуля, отсоединяет секции старше последних
+PARTITIONS_RETAINED. Отсоединенные секции остаются обычными таблицами
+tweets_p<N> и likes_p<N>, запросы приложения их больше не читают.
+
+Медиа отсоединяемых твитов остаются доступны по ID, у них только
+сбрасывается ссылка на твит: ссылки на медиа хранятся в attachments.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from not_twitter.app.database import shards, snowflake
+
+PARTITION_SIZE = int(os.getenv("PARTITION_SIZE", "0"))
+PARTITIONS_AHEAD = int(os.getenv("PARTITIONS_AHEAD", "2"))
+PARTITIONS_RETAINED = int(os.getenv("PARTITIONS_RETAINED", "0"))
+MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_SEC", "300"))
+PARTITION_LOCK_ID = 7302
+# Отсоединение блокирует таблицу целиком, долго ждать блокировку нельзя
+DETACH_LOCK_TIMEOUT = "2s"
+PARTITION_NAME = re.compile(r"_p(\d+)$")
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionedTable(NamedTuple):
+    """Секционированная таблица и ее колонка с ID твита."""
+
+    name: str
+    column: str
+
+
+# Ссылающиеся таблицы идут после тех, на которые ссылаются
+TABLES = (
+    PartitionedTable("tweets", "id"),
+    PartitionedTable("likes", "tweet_id"),
+)
+
+ATTACHED_PARTITIONS_QUERY = text(
+    """
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = CAST(:table AS regclass)
+    """,
+)
+PARENT_FOREIGN_KEYS_QUERY = text(
+    """
+    SELECT conname FROM pg_constraint
+    WHERE conrelid = CAST(:partition AS regclass)
+        AND contype = 'f'
+        AND confrelid = ANY(CAST(:parents AS regclass[]))
+    """,
+)
+PARTITIONED_QUERY = text(
+    "SELECT relkind = 'p' FROM pg_class WHERE oid = CAST(:table AS regclass)",
+)
+UNLINK_MEDIAS_QUERY = text(
+    """
+    UPDATE medias SET tweet_id = NULL
+    WHERE tweet_id >= :lower AND tweet_id < :upper
+    """,
+)
+
+
+def table_options(column: str) -> Dict[str, Any]:
+    """Параметры секционирования таблицы для __table_args__ модели.
+
+    Args:
+        column (str): Колонка с ID твита.
+
+    Returns:
+        Dict[str, Any]: Параметры таблицы, пустые без секционирования.
+    """
+    if not PARTITION_SIZE:
+        return {}
+    return {"postgresql_partition_by": "RANGE ({column})".format(
+        column=column,
+    )}
+
+
+async def is_partitioned(connection: AsyncConnection, table: str) -> bool:
+    """Проверка, что таблица секционирована.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+        table (str): Имя таблицы.
+
+    Returns:
+        bool: True для секционированной таблицы.
+    """
+    return await connection.scalar(PARTITIONED_QUERY, {"table": table})
+
+
+async def check_partitioning(connection: AsyncConnection) -> None:
+    """Проверка соответствия таблиц режиму секционирования.
+
+    Существующие таблицы не преобразуются при изменении PARTITION_SIZE,
+    без проверки создание секций или вставка твитов завершались бы
+    ошибкой уже после запуска.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+
+    Raises:
+        RuntimeError: Таблица секционирована не так, как задано.
+    """
+    for table in TABLES:
+        partitioned = await is_partitioned(connection, table.name)
+        if partitioned != bool(PARTITION_SIZE):
+            raise RuntimeError(
+                "Table {table} is {state}partitioned, but PARTITION_SIZE "
+                "is {size}".format(
+                    table=table.name,
+                    state="" if partitioned else "not ",
+                    size=PARTITION_SIZE,
+                ),
+            )
+
+
+def get_partition_name(table: str, index: int) -> str:
+    """Имя секции таблицы.
+
+    Args:
+        table (str): Имя секционированной таблицы.
+        index (int): Номер секции.
+
+    Returns:
+        str: Имя секции.
+    """
+    return "{table}_p{index}".format(table=table, index=index)
+
+
+def get_create_queries(indexes: Iterable[int]) -> List[str]:
+    """Запросы создания секций всех таблиц с указанными номерами.
+
+    Args:
+        indexes (Iterable[int]): Номера секций.
+
+    Returns:
+        List[str]: Запросы CREATE TABLE.
+    """
+    return [
+        """
+        CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table}
+        FOR VALUES FROM ({lower}) TO ({upper})
+        """.format(
+            partition=get_partition_name(table.name, index),
+            table=table.name,
+            lower=index * PARTITION_SIZE,
+            upper=(index + 1) * PARTITION_SIZE,
+        )
+        for index in sorted(set(indexes))
+        for table in TABLES
+    ]
+
+
+async def get_attached_indexes(
+    connection: AsyncConnection,
+    table: str,
+) -> Set[int]:
+    """Номера присоединенных секций таблицы.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+        table (str): Имя секционированной таблицы.
+
+    Returns:
+        Set[int]: Номера секций.
+    """
+    query = await connection.execute(
+        ATTACHED_PARTITIONS_QUERY,
+        {"table": table},
+    )
+    names = (PARTITION_NAME.search(name) for name in query.scalars())
+    return {int(match.group(1)) for match in names if match}
+
+
+async def get_current_index(connection: AsyncConnection) -> int:
+    """Номер секции с наибольшим ID твита или ID текущего времени.
+
+    ID твитов растут со временем, поэтому секция текущего времени нужна
+    и тогда, когда новых твитов еще нет.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+
+    Returns:
+        int: Номер секции.
+    """
+    table = TABLES[0]
+    max_id = await connection.scalar(text(
+        "SELECT COALESCE(max({column}), 0) FROM {table}".format(
+            column=table.column,
+            table=table.name,
+        ),
+    ))
+    return max(max_id, snowflake.get_min_id(time.time())) // PARTITION_SIZE
+
+
+async def create_partitions(
+    connection: AsyncConnection,
+    indexes: Iterable[int],
+) -> List[int]:
+    """Создание недостающих секций с указанными номерами.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+        indexes (Iterable[int]): Номера секций.
+
+    Returns:
+        List[int]: Номера созданных секций.
+    """
+    attached = await get_attached_indexes(connection, TABLES[0].name)
+    missing = sorted(set(indexes) - attached)
+    for query in get_create_queries(missing):
+        await connection.execute(text(query))
+    return missing
+
+
+async def ensure_partitions(
+    connection: AsyncConnection,
+    ahead: int = PARTITIONS_AHEAD,
+) -> List[int]:
+    """Создание текущей секции и секций впереди нее.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+        ahead (int): Количество секций после текущей.
+
+    Returns:
+        List[int]: Номера созданных секций.
+    """
+    current = await get_current_index(connection)
+    return await create_partitions(
+        connection,
+        range(current, current + ahead + 1),
+    )
+
+
+async def detach_partition(connection: AsyncConnection, index: int) -> None:
+    """Отсоединение секций всех таблиц с указанным номером.
+
+    Внешние ключи отсоединенных секций на другие секционированные
+    таблицы удаляются, иначе отсоединение следующей таблицы нарушит их.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+        index (int): Номер секции.
+    """
+    await connection.execute(
+        UNLINK_MEDIAS_QUERY,
+        {
+            "lower": index * PARTITION_SIZE,
+            "upper": (index + 1) * PARTITION_SIZE,
+        },
+    )
+    parents = [table.name for table in TABLES]
+    for table in reversed(TABLES):
+        partition = get_partition_name(table.name, index)
+        await connection.execute(text(
+            "ALTER TABLE {table} DETACH PARTITION {partition}".format(
+                table=table.name,
+                partition=partition,
+            ),
+        ))
+        query = await connection.execute(
+            PARENT_FOREIGN_KEYS_QUERY,
+            {"partition": partition, "parents": parents},
+        )
+        for constraint in query.scalars().all():
+            await connection.execute(text(
+                "ALTER TABLE {partition} DROP CONSTRAINT {constraint}".format(
+                    partition=partition,
+                    constraint=constraint,
+                ),
+            ))
+
+
+async def detach_partitions(
+    connection: AsyncConnection,
+    retained: int = PARTITIONS_RETAINED,
+) -> List[int]:
+    """Отсоединение секций старше последних retained.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+        retained (int): Количество последних секций, 0 - не отсоединять.
+
+    Returns:
+        List[int]: Номера отсоединенных секций.
+    """
+    if not retained:
+        return []
+    current = await get_current_index(connection)
+    attached = await get_attached_indexes(connection, TABLES[0].name)
+    expired = sorted(index for index in attached if index <= current - retained)
+    for index in expired:
+        await detach_partition(connection, index)
+    return expired
+
+
+class PartitionManager:
+    """Периодическое создание и отсоединение секций в фоне.
+
+    Из нескольких процессов приложения обслуживание в каждый момент
+    выполняет один, остальные пропускают его под advisory lock.
+    """
+
+    def __init__(self) -> None:
+        """Создание незапущенного обслуживания."""
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запуск периодического обслуживания в фоне."""
+        if PARTITION_SIZE and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Остановка периодического обслуживания."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> None:
+        """Создание будущих и отсоединение старых секций на всех шардах."""
+        if not PARTITION_SIZE:
+            return
+        for shard, engine in enumerate(shards.engines):
+            await self._maintain(shard, engine)
+
+    async def _maintain(self, shard: int, engine: AsyncEngine) -> None:
+        # Отсоединение выполняется отдельной транзакцией, чтобы таймаут
+        # блокировки не отменял создание секций
+        async with engine.begin() as conn:
+            created = []
+            if await self._try_lock(conn):
+                created = await ensure_partitions(conn)
+        async with engine.begin() as conn:
+            detached = []
+            if await self._try_lock(conn):
+                await conn.execute(text(
+                    "SET LOCAL lock_timeout = '{timeout}'".format(
+                        timeout=DETACH_LOCK_TIMEOUT,
+                    ),
+                ))
+                detached = await detach_partitions(conn)
+        if created or detached:
+            logger.info(
+                "Shard %s partitions created: %s, detached: %s",
+                shard,
+                created,
+                detached,
+            )
+
+    async def _try_lock(self, conn: AsyncConnection) -> bool:
+        return await conn.scalar(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+            {"lock_id": PARTITION_LOCK_ID},
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except (OSError, DBAPIError) as exc:
+                logger.warning("Partition maintenance failed: %s", exc)
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+
+
+manager = PartitionManager()
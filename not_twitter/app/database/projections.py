@@ -0,0 +1,40 @@
+"""Легковесные представления строк для чтения без ORM объектов.
+
+Используются на горячих путях чтения, где не нужны identity map
+и загрузчики связей ORM моделей.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class FeedAuthor:
+    """Автор твита в ленте."""
+
+    __slots__ = ("id", "name")
+
+    id: int
+    name: str
+
+
+@dataclass
+class FeedLike:
+    """Лайк твита в ленте."""
+
+    __slots__ = ("user_id", "name")
+
+    user_id: int
+    name: str
+
+
+@dataclass
+class FeedTweet:
+    """Твит в ленте."""
+
+    __slots__ = ("id", "content", "attachments", "author", "likes")
+
+    id: int
+    content: str
+    attachments: Optional[List[str]]
+    author: FeedAuthor
+    likes: List[FeedLike]
@@ -0,0 +1,221 @@
+"""Перенос старых твитов из таблиц БД в сжатый архив на диске.
+
+При RETENTION_DAYS больше нуля приложение периодически выбирает твиты
+старше RETENTION_DAYS дней пачками по RETENTION_BATCH_SIZE, записывает
+каждую пачку вместе с лайками и сведениями о медиа в файл архива и
+удаляет твиты из БД в той же транзакции. Если транзакция не
+зафиксируется, пачка будет записана в архив повторно при следующем
+запуске. Медиа остаются доступны по ID, у них только сбрасывается
+ссылка на твит.
+
+Однократный запуск: python -m not_twitter.app.database.retention
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, func, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.future import select
+
+from not_twitter.app.database import database, shards
+from not_twitter.app.database.models import Like, Media, Tweet, User
+from not_twitter.app.utils import metrics
+from not_twitter.app.utils.archive import ArchiveStore, store
+
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))
+BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL_SEC", "3600"))
+RETENTION_LOCK_ID = 7303
+
+logger = logging.getLogger(__name__)
+
+
+def _make_records(tweets, likes, medias) -> List[Dict[str, Any]]:
+    """Сборка записей архива из строк твитов, лайков и медиа.
+
+    Args:
+        tweets: Строки твитов с авторами.
+        likes: Строки лайков.
+        medias: Строки медиа.
+
+    Returns:
+        List[Dict[str, Any]]: Записи архива.
+    """
+    records = {
+        row.id: {
+            "id": row.id,
+            "content": row.content,
+            "attachments": row.attachments,
+            "author": {"id": row.author_id, "name": row.author_name},
+            "likes": [],
+            "created_at": row.created_at.isoformat(),
+            "medias": [],
+        }
+        for row in tweets
+    }
+    for like in likes:
+        records[like.tweet_id]["likes"].append(
+            {"user_id": like.user_id, "name": like.name},
+        )
+    for media in medias:
+        records[media.tweet_id]["medias"].append(
+            {"id": media.id, "size": media.size},
+        )
+    return list(records.values())
+
+
+async def archive_batch(
+    connection: AsyncConnection,
+    cutoff: datetime,
+    archive: ArchiveStore = store,
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """Перенос одной пачки твитов старше cutoff в архив.
+
+    Args:
+        connection (AsyncConnection): Соединение с открытой транзакцией.
+        cutoff (datetime): Твиты, созданные раньше, переносятся.
+        archive (ArchiveStore): Хранилище архива.
+        batch_size (int): Максимум твитов в пачке.
+
+    Returns:
+        int: Количество перенесенных твитов.
+    """
+    query = await connection.execute(
+        select(Tweet.id)
+        .where(Tweet.created_at < cutoff)
+        .order_by(Tweet.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True),
+    )
+    tweet_ids = query.scalars().all()
+    if not tweet_ids:
+        return 0
+
+    tweets = await connection.execute(
+        select(
+            Tweet.id,
+            Tweet.content,
+            Tweet.attachments,
+            Tweet.created_at,
+            User.id.label("author_id"),
+            User.name.label("author_name"),
+        )
+        .join(User, User.id == Tweet.author_id)
+        .where(Tweet.id.in_(tweet_ids)),
+    )
+    likes = await connection.execute(
+        select(Like.tweet_id, Like.user_id, Like.name)
+        .where(Like.tweet_id.in_(tweet_ids))
+        .order_by(Like.tweet_id, Like.user_id),
+    )
+    medias = await connection.execute(
+        select(
+            Media.id,
+            Media.tweet_id,
+            func.octet_length(Media.media_data).label("size"),
+        )
+        .where(Media.tweet_id.in_(tweet_ids))
+        .order_by(Media.id),
+    )
+    await archive.write_async(_make_records(tweets, likes, medias))
+
+    await connection.execute(
+        update(Media)
+        .where(Media.tweet_id.in_(tweet_ids))
+        .values(tweet_id=None),
+    )
+    await connection.execute(delete(Tweet).where(Tweet.id.in_(tweet_ids)))
+    metrics.ARCHIVED_TWEETS_TOTAL.inc(len(tweet_ids))
+    return len(tweet_ids)
+
+
+class RetentionJob:
+    """Периодический перенос старых твитов в архив в фоне.
+
+    Из нескольких процессов приложения перенос в каждый момент выполняет
+    один, остальные пропускают его под advisory lock.
+    """
+
+    def __init__(self) -> None:
+        """Создание незапущенного переноса."""
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запуск периодического переноса в фоне."""
+        if RETENTION_DAYS and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Остановка периодического переноса."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> int:
+        """Перенос всех твитов старше RETENTION_DAYS пачками.
+
+        Шарды обрабатываются по очереди, каждая пачка переносится
+        отдельной транзакцией.
+
+        Returns:
+            int: Количество перенесенных твитов.
+        """
+        if not RETENTION_DAYS:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)
+        total = 0
+        for engine in shards.engines:
+            total += await self._archive_shard(engine, cutoff)
+        if total:
+            logger.info("Tweets archived: %s", total)
+        return total
+
+    async def _archive_shard(self, engine: AsyncEngine, cutoff: datetime) -> int:
+        total = 0
+        archived = BATCH_SIZE
+        while archived == BATCH_SIZE:
+            async with engine.begin() as conn:
+                locked = await conn.scalar(
+                    text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+                    {"lock_id": RETENTION_LOCK_ID},
+                )
+                if not locked:
+                    break
+                archived = await archive_batch(conn, cutoff)
+            total += archived
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except (OSError, DBAPIError) as exc:
+                logger.warning("Tweet archival failed: %s", exc)
+            await asyncio.sleep(RETENTION_INTERVAL)
+
+
+job = RetentionJob()
+
+
+async def main() -> None:
+    """Однократный перенос старых твитов в архив."""
+    try:
+        archived = await job.run_once()
+    finally:
+        await shards.shutdown_shards()
+        await database.shutdown_db()
+    print("Tweets archived:", archived)  # noqa: WPS421
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
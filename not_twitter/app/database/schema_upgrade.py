@@ -0,0 +1,129 @@
+"""Обновление схемы БД, созданной предыдущими версиями приложения.
+
+create_all создает только отсутствующие таблицы, поэтому новые колонки
+и индексы существующих таблиц добавляются здесь. Колонки ID твитов
+и медиа расширяются до bigint, последовательности их ID удаляются.
+Ключ секционирования изменить нельзя, поэтому для секционированных
+таблиц с ID integer обновление прерывается ошибкой, как и для таблиц,
+секционированных не так, как задает PARTITION_SIZE. Обновление
+выполняется при подготовке БД на всех шардах под advisory lock схемы
+и ничего не меняет в уже обновленной БД.
+"""
+from typing import NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from not_twitter.app.database import database, partitions, shards
+
+
+class IdColumn(NamedTuple):
+    """Колонка ID твита или медиа и последовательность ее значений."""
+
+    table: str
+    column: str
+    sequence: Optional[str] = None
+
+
+ID_COLUMNS = (
+    IdColumn("tweets", "id", "tweet_id_seq"),
+    IdColumn("likes", "tweet_id"),
+    IdColumn("medias", "id", "media_id_seq"),
+    IdColumn("medias", "tweet_id"),
+)
+COLUMN_TYPE_QUERY = text(
+    """
+    SELECT data_type FROM information_schema.columns
+    WHERE table_schema = current_schema()
+        AND table_name = :table
+        AND column_name = :column
+    """,
+)
+
+# Твиты, созданные до появления колонки, считаются созданными
+# в момент обновления
+UPGRADE_QUERIES = (
+    """
+    ALTER TABLE tweets ADD COLUMN IF NOT EXISTS
+    created_at timestamptz NOT NULL DEFAULT now()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_tweets_created_at ON tweets (created_at)",
+    """
+    CREATE INDEX IF NOT EXISTS ix_tweets_author_id_id
+    ON tweets (author_id, id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_likes_user_id_tweet_id
+    ON likes (user_id, tweet_id)
+    """,
+)
+
+
+async def widen_id_column(
+    connection: AsyncConnection,
+    id_column: IdColumn,
+) -> bool:
+    """Расширение колонки ID integer до bigint.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+        id_column (IdColumn): Колонка ID.
+
+    Raises:
+        RuntimeError: Колонка integer - ключ секционирования.
+
+    Returns:
+        bool: True, если колонка была расширена.
+    """
+    data_type = await connection.scalar(
+        COLUMN_TYPE_QUERY,
+        {"table": id_column.table, "column": id_column.column},
+    )
+    if data_type != "integer":
+        return False
+    if await partitions.is_partitioned(connection, id_column.table):
+        raise RuntimeError(
+            "Partitioned table {table} has integer {column}, "
+            "recreate it with bigint IDs".format(
+                table=id_column.table,
+                column=id_column.column,
+            ),
+        )
+    alter_query = "ALTER TABLE {table} ALTER COLUMN {column} TYPE bigint"
+    if id_column.sequence:
+        alter_query += ", ALTER COLUMN {column} DROP DEFAULT"
+    await connection.execute(text(alter_query.format(
+        table=id_column.table,
+        column=id_column.column,
+    )))
+    if id_column.sequence:
+        await connection.execute(text(
+            "DROP SEQUENCE IF EXISTS {sequence}".format(
+                sequence=id_column.sequence,
+            ),
+        ))
+    return True
+
+
+async def upgrade_schema(connection: AsyncConnection) -> None:
+    """Обновление схемы БД одного шарда.
+
+    Args:
+        connection (AsyncConnection): Соединение с БД.
+    """
+    for id_column in ID_COLUMNS:
+        await widen_id_column(connection, id_column)
+    for query in UPGRADE_QUERIES:
+        await connection.execute(text(query))
+    await partitions.check_partitioning(connection)
+
+
+async def upgrade_shards() -> None:
+    """Обновление схемы БД всех шардов."""
+    for engine in shards.engines:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                {"lock_id": database.SCHEMA_LOCK_ID},
+            )
+            await upgrade_schema(conn)
@@ -0,0 +1,242 @@
+"""Распределение твитов, лайков и медиа по шардам БД по автору.
+
+Шард 0 - основная БД из POSTGRES_URL, в ней хранятся пользователи,
+api-key, подписки и служебные таблицы. Дополнительные БД из SHARD_URLS
+становятся шардами 1..N-1. Твиты и медиа автора хранятся на шарде
+author_id % N, лайки - на шарде твита. Таблица пользователей копируется
+на все шарды: на нее ссылаются внешние ключи твитов и лайков.
+
+ID твитов и медиа выдаются генератором snowflake с остатком от деления
+на N, равным номеру шарда. Поэтому ID глобально уникальны, растут в
+порядке создания, а шард твита или медиа определяется по ID без поиска.
+Чтения всех твитов выполняются на шардах параллельно и сливаются по ID
+через кучу.
+"""
+import asyncio
+import heapq
+import os
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Sequence,
+    TypeVar,
+)
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from not_twitter.app.database import database, instrumentation, snowflake
+
+SHARD_URLS = [url for url in os.getenv("SHARD_URLS", "").split(",") if url]
+SELECT_USERS_QUERY = text("SELECT id, name FROM users")
+COPY_USERS_QUERY = text(
+    """
+    INSERT INTO users (id, name)
+    SELECT * FROM unnest(CAST(:ids AS INTEGER[]), CAST(:names AS VARCHAR[]))
+    ON CONFLICT (id) DO UPDATE SET name = excluded.name
+    """,
+)
+
+Result = TypeVar("Result")
+
+engines = [database.engine]
+for shard_url in SHARD_URLS:
+    shard_engine = create_async_engine(
+        shard_url,
+        echo=database.ECHO,
+        poolclass=database.MeasuredQueuePool,
+    )
+    instrumentation.install(shard_engine.sync_engine)
+    engines.append(shard_engine)
+sessions = [database.async_session] + [
+    sessionmaker(shard_engine, expire_on_commit=False, class_=AsyncSession)
+    for shard_engine in engines[1:]
+]
+
+
+def shard_for_user(user_id: int) -> int:
+    """Номер шарда с твитами и медиа пользователя.
+
+    Args:
+        user_id (int): ID пользователя.
+
+    Returns:
+        int: Номер шарда.
+    """
+    return user_id % len(sessions)
+
+
+def shard_for_id(object_id: int) -> int:
+    """Номер шарда твита или медиа по его ID.
+
+    Args:
+        object_id (int): ID твита или медиа.
+
+    Returns:
+        int: Номер шарда.
+    """
+    return object_id % len(sessions)
+
+
+def get_session(shard: int = 0) -> AsyncSession:
+    """Создание сессии шарда.
+
+    Args:
+        shard (int): Номер шарда.
+
+    Returns:
+        AsyncSession: Сессия.
+    """
+    return sessions[shard]()
+
+
+def next_id(shard: int) -> int:
+    """Выдача глобально уникального ID для объекта на шарде.
+
+    Args:
+        shard (int): Номер шарда объекта.
+
+    Returns:
+        int: ID.
+    """
+    return snowflake.generator.next_id(shard, len(sessions))
+
+
+async def gather(
+    query: Callable[[int], Awaitable[Result]],
+) -> List[Result]:
+    """Параллельное выполнение запроса на всех шардах.
+
+    Args:
+        query (Callable[[int], Awaitable[Result]]): Запрос к шарду
+            с указанным номером.
+
+    Returns:
+        List[Result]: Результаты шардов по порядку номеров.
+    """
+    if len(sessions) == 1:
+        return [await query(0)]
+    return list(await asyncio.gather(
+        *(query(shard) for shard in range(len(sessions))),
+    ))
+
+
+def merge_desc(
+    results: Sequence[List[Result]],
+    key: Callable[[Result], Any],
+) -> List[Result]:
+    """Слияние отсортированных по убыванию результатов шардов.
+
+    Args:
+        results (Sequence[List[Result]]): Результаты шардов.
+        key (Callable[[Result], Any]): Ключ сортировки.
+
+    Returns:
+        List[Result]: Общий результат по убыванию ключа.
+    """
+    if len(results) == 1:
+        return results[0]
+    return list(heapq.merge(*results, key=key, reverse=True))
+
+
+async def _flatten(
+    partitions: AsyncIterator[Sequence[Result]],
+) -> AsyncIterator[Result]:
+    async for partition in partitions:
+        for row in partition:
+            yield row
+
+
+async def merge_streams(
+    streams: Sequence[AsyncIterator[Sequence[Result]]],
+    key: Callable[[Result], Any],
+    batch_size: int,
+) -> AsyncIterator[List[Result]]:
+    """Слияние отсортированных по возрастанию потоков пачек строк.
+
+    Из каждого потока в памяти держится одна пачка, поэтому память не
+    зависит от объема результата.
+
+    Args:
+        streams (Sequence[AsyncIterator[Sequence[Result]]]): Потоки
+            пачек строк шардов.
+        key (Callable[[Result], Any]): Ключ сортировки.
+        batch_size (int): Размер пачек общего потока.
+
+    Yields:
+        List[Result]: Пачка строк общего потока.
+    """
+    rows = [_flatten(stream) for stream in streams]
+    heap = []
+    for index, shard_rows in enumerate(rows):
+        await _push_next(heap, index, shard_rows, key)
+    batch = []
+    while heap:
+        _, index, row = heapq.heappop(heap)
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+        await _push_next(heap, index, rows[index], key)
+    if batch:
+        yield batch
+
+
+async def _push_next(heap, index, shard_rows, key) -> None:
+    try:
+        row = await shard_rows.__anext__()
+    except StopAsyncIteration:
+        return
+    heapq.heappush(heap, (key(row), index, row))
+
+
+async def copy_users() -> int:
+    """Копирование пользователей основной БД на остальные шарды.
+
+    Returns:
+        int: Количество скопированных пользователей.
+    """
+    if len(sessions) == 1:
+        return 0
+    async with get_session() as session:
+        async with session.begin():
+            users = (await session.execute(SELECT_USERS_QUERY)).all()
+    params = {
+        "ids": [user.id for user in users],
+        "names": [user.name for user in users],
+    }
+    for shard in range(1, len(sessions)):
+        async with get_session(shard) as session:
+            async with session.begin():
+                await session.execute(COPY_USERS_QUERY, params)
+    return len(users)
+
+
+async def init_shards() -> None:
+    """Создание таблиц на дополнительных шардах."""
+    for shard_engine in engines[1:]:
+        async with shard_engine.begin() as conn:
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                {"lock_id": database.SCHEMA_LOCK_ID},
+            )
+            await conn.run_sync(database.Base.metadata.create_all)
+
+
+async def shutdown_shards() -> None:
+    """Завершение работы с дополнительными шардами."""
+    for shard_engine in engines[1:]:
+        await shard_engine.dispose()
+
+
+def get_driver_dsns() -> List[str]:
+    """Строки подключения ко всем шардам для прямых соединений asyncpg.
+
+    Returns:
+        List[str]: DSN шардов по порядку номеров.
+    """
+    return [database.get_driver_dsn(shard_engine) for shard_engine in engines]
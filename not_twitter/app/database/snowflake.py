@@ -0,0 +1,201 @@
+"""Выдача возрастающих по времени ID твитов и медиа без запросов к БД.
+
+ID складывается из миллисекунд от EPOCH (41 бит), номера процесса
+(5 бит) и счетчика в пределах миллисекунды (7 бит). 53 бита передаются
+в JSON и читаются JavaScript без потери точности. ID растут в порядке
+создания, поэтому сортировка и выборка since_id по ID остаются
+хронологическими, а ID для пачки записей выдаются до вставки.
+
+Номер процесса арендуется у основной БД под сессионным advisory lock
+на отдельном соединении. Если соединение разорвано, аренда
+восстанавливается в фоне, а до ее восстановления генератор не выдает
+ID: номер мог занять другой процесс.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+
+import asyncpg
+
+from not_twitter.app.database import database
+
+EPOCH_MS = 1704067200000  # 2024-01-01 00:00:00 UTC
+WORKER_BITS = 5
+SEQUENCE_BITS = 7
+TIMESTAMP_SHIFT = WORKER_BITS + SEQUENCE_BITS
+MAX_WORKERS = 1 << WORKER_BITS
+MAX_SEQUENCE = 1 << SEQUENCE_BITS
+WORKER_LOCK_ID = 7304
+LEASE_QUERY = "SELECT pg_try_advisory_lock($1, $2)"
+RECONNECT_DELAY = 1
+
+logger = logging.getLogger(__name__)
+
+
+def get_min_id(timestamp: float) -> int:
+    """Наименьший ID, выдаваемый в указанный момент времени.
+
+    Args:
+        timestamp (float): Время в секундах от начала эпохи Unix.
+
+    Returns:
+        int: ID.
+    """
+    return (int(timestamp * 1000) - EPOCH_MS) << TIMESTAMP_SHIFT
+
+
+class SnowflakeGenerator:
+    """Генератор возрастающих по времени ID одного процесса."""
+
+    def __init__(
+        self,
+        worker_id: int = 0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Создание генератора.
+
+        Args:
+            worker_id (int): Номер процесса.
+            clock (Callable[[], float]): Источник текущего времени
+                в секундах.
+        """
+        self.worker_id = worker_id
+        self.paused = False
+        self._clock = clock
+        self._timestamp = 0
+        self._sequence = 0
+
+    def next_id(self, shard: int = 0, shards: int = 1) -> int:
+        """Выдача следующего ID.
+
+        ID выбирается так, чтобы остаток от деления на количество шардов
+        был равен номеру шарда. Если счетчик миллисекунды исчерпан или
+        часы отстали, используется следующая миллисекунда, поэтому ID
+        не повторяются и не убывают.
+
+        Args:
+            shard (int): Номер шарда объекта.
+            shards (int): Количество шардов.
+
+        Raises:
+            RuntimeError: Аренда номера процесса потеряна.
+
+        Returns:
+            int: ID.
+        """
+        if self.paused:
+            raise RuntimeError("Snowflake worker id lease is lost")
+        now = int(self._clock() * 1000) - EPOCH_MS
+        timestamp = max(now, self._timestamp)
+        sequence = self._sequence if timestamp == self._timestamp else 0
+        while True:
+            base = (
+                timestamp << TIMESTAMP_SHIFT
+                | self.worker_id << SEQUENCE_BITS
+            )
+            sequence += (shard - base - sequence) % shards
+            if sequence < MAX_SEQUENCE:
+                break
+            timestamp += 1
+            sequence = 0
+        self._timestamp = timestamp
+        self._sequence = sequence + 1
+        return base | sequence
+
+    def next_ids(self, count: int, shard: int = 0, shards: int = 1) -> List[int]:
+        """Выдача ID для пачки записей.
+
+        Args:
+            count (int): Количество ID.
+            shard (int): Номер шарда объектов.
+            shards (int): Количество шардов.
+
+        Returns:
+            List[int]: ID по возрастанию.
+        """
+        return [self.next_id(shard, shards) for _ in range(count)]
+
+
+class WorkerLease:
+    """Аренда номера процесса генератора под advisory lock."""
+
+    def __init__(self, id_generator: SnowflakeGenerator) -> None:
+        """Создание неарендованного номера.
+
+        Args:
+            id_generator (SnowflakeGenerator): Генератор, которому
+                назначается номер.
+        """
+        self.leased = False
+        self._generator = id_generator
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Аренда номера и запуск ее восстановления в фоне.
+
+        Raises:
+            RuntimeError: Все номера процессов заняты.
+        """
+        if self._task is None:
+            await self._acquire()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Освобождение номера процесса."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+
+    async def _acquire(self) -> None:
+        connection = await asyncpg.connect(database.get_driver_dsn())
+        # Сначала пробуется прежний номер, чтобы он не менялся
+        # при переподключении
+        current = self._generator.worker_id
+        candidates = [current] + [
+            worker_id for worker_id in range(MAX_WORKERS)
+            if worker_id != current
+        ]
+        for worker_id in candidates:
+            if await connection.fetchval(LEASE_QUERY, WORKER_LOCK_ID, worker_id):
+                self._generator.worker_id = worker_id
+                self._generator.paused = False
+                self._connection = connection
+                self.leased = True
+                logger.info("Snowflake worker id leased: %s", worker_id)
+                return
+        await connection.close()
+        raise RuntimeError("All snowflake worker ids are leased")
+
+    async def _close(self) -> None:
+        self.leased = False
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+
+    async def _run(self) -> None:
+        while True:
+            closed = asyncio.get_running_loop().create_future()
+            self._connection.add_termination_listener(
+                lambda _: closed.done() or closed.set_result(None),
+            )
+            await closed
+            logger.warning("Snowflake worker id lease lost")
+            self._generator.paused = True
+            await self._close()
+            while not self.leased:
+                await asyncio.sleep(RECONNECT_DELAY)
+                try:
+                    await self._acquire()
+                except (OSError, asyncpg.PostgresError, RuntimeError) as exc:
+                    logger.warning("Snowflake worker id lease failed: %s", exc)
+
+
+generator = SnowflakeGenerator()
+lease = WorkerLease(generator)
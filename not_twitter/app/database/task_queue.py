@@ -0,0 +1,293 @@
+"""Очередь отложенных задач в таблице jobs.
+
+Задача добавляется в той же транзакции, что и запись, после которой ее
+нужно выполнить, поэтому задача не теряется при перезапуске и не
+появляется без записи. Таблица jobs есть на каждом шарде, задача
+добавляется на шард своей записи.
+
+Процесс приложения выбирает готовые задачи через SELECT ... FOR UPDATE
+SKIP LOCKED и арендует их на TASK_LEASE_SEC секунд, одновременно на
+шарде выполняется не больше TASK_WORKERS задач. Шарды обслуживаются
+независимо, а освободившийся слот сразу забирает следующую готовую
+задачу, не дожидаясь остальных задач пачки. Задача, не
+завершившаяся за время аренды, выполняется повторно, поэтому
+обработчики должны быть идемпотентны. Упавшая задача повторяется с
+экспоненциальной задержкой, после TASK_MAX_ATTEMPTS попыток она
+помечается неудавшейся и остается в таблице с текстом ошибки.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from not_twitter.app.database import shards
+from not_twitter.app.database.models import Job
+from not_twitter.app.utils import metrics
+
+WORKERS = int(os.getenv("TASK_WORKERS", "4"))
+POLL_INTERVAL = float(os.getenv("TASK_POLL_INTERVAL_MS", "1000")) / 1000
+LEASE = float(os.getenv("TASK_LEASE_SEC", "60"))
+MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))
+RETRY_DELAY = float(os.getenv("TASK_RETRY_DELAY_SEC", "1"))
+MAX_RETRY_DELAY = float(os.getenv("TASK_MAX_RETRY_DELAY_SEC", "300"))
+MAX_ERROR_LENGTH = 1000
+
+CLAIM_QUERY = text(
+    """
+    UPDATE jobs
+    SET attempts = attempts + 1,
+        run_at = now() + make_interval(secs => :lease)
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE failed_at IS NULL AND run_at <= now()
+        ORDER BY run_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, kind, payload, attempts
+    """,
+)
+COMPLETE_QUERY = text("DELETE FROM jobs WHERE id = :id")
+RETRY_QUERY = text(
+    """
+    UPDATE jobs
+    SET run_at = now() + make_interval(secs => :delay), last_error = :error
+    WHERE id = :id
+    """,
+)
+FAIL_QUERY = text(
+    "UPDATE jobs SET failed_at = now(), last_error = :error WHERE id = :id",
+)
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any], int], Awaitable[None]]
+
+
+def get_retry_delay(attempts: int) -> float:
+    """Задержка перед повтором задачи.
+
+    Args:
+        attempts (int): Количество выполненных попыток.
+
+    Returns:
+        float: Задержка в секундах.
+    """
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+class TaskQueue:
+    """Выполнение отложенных задач из таблиц jobs шардов в фоне."""
+
+    def __init__(self, workers: int = WORKERS) -> None:
+        """Создание незапущенной очереди.
+
+        Args:
+            workers (int): Максимум одновременно выполняемых задач
+                на шарде, 0 - задачи не выполняются в фоне.
+        """
+        self.workers = workers
+        self._handlers: Dict[str, Handler] = {}
+        self._wakeups: List[asyncio.Event] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        """Регистрация обработчика задач указанного вида.
+
+        Обработчик получает данные задачи и номер шарда задачи.
+
+        Args:
+            kind (str): Вид задачи.
+
+        Returns:
+            Callable[[Handler], Handler]: Декоратор обработчика.
+        """
+        def register(task_handler: Handler) -> Handler:
+            self._handlers[kind] = task_handler
+            return task_handler
+        return register
+
+    def enqueue(
+        self,
+        session: AsyncSession,
+        kind: str,
+        payload: Dict[str, Any],
+        delay: float = 0,
+    ) -> None:
+        """Добавление задачи в транзакцию сессии.
+
+        Задача станет доступна после фиксации транзакции, после нее
+        стоит вызвать wake.
+
+        Args:
+            session (AsyncSession): Сессия шарда с открытой транзакцией.
+            kind (str): Вид задачи.
+            payload (Dict[str, Any]): Данные задачи, сериализуемые в JSON.
+            delay (float): Задержка выполнения в секундах.
+        """
+        job = Job(kind=kind, payload=payload)
+        if delay:
+            job.run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        session.add(job)
+
+    def wake(self) -> None:
+        """Внеочередная проверка готовых задач после добавления."""
+        for wakeup in self._wakeups:
+            wakeup.set()
+
+    def start(self) -> None:
+        """Запуск выполнения задач в фоне."""
+        if self.workers and self._task is None:
+            self._wakeups = [asyncio.Event() for _ in shards.sessions]
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Остановка выполнения задач.
+
+        Прерванные задачи будут выполнены повторно после окончания
+        аренды.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeups = []
+
+    async def run_once(self, limit: Optional[int] = None) -> int:
+        """Однократное выполнение пачки готовых задач всех шардов.
+
+        Args:
+            limit (Optional[int]): Максимум задач на шарде,
+                по умолчанию количество обработчиков.
+
+        Returns:
+            int: Количество выполненных задач.
+        """
+        limit = limit or self.workers or 1
+        counts = await asyncio.gather(*(
+            self._run_shard_once(shard, limit)
+            for shard in range(len(shards.sessions))
+        ))
+        return sum(counts)
+
+    async def _run_shard_once(self, shard: int, limit: int) -> int:
+        jobs = await self._claim(shard, limit)
+        await asyncio.gather(*(self._execute(shard, job) for job in jobs))
+        return len(jobs)
+
+    async def _claim(self, shard: int, limit: int) -> List[Any]:
+        async with shards.get_session(shard) as session:
+            async with session.begin():
+                query = await session.execute(
+                    CLAIM_QUERY,
+                    {"lease": LEASE, "limit": limit},
+                )
+                return query.all()
+
+    async def _execute(self, shard: int, job) -> None:
+        start = time.perf_counter()
+        metrics.TASKS_IN_PROGRESS.inc()
+        try:
+            task_handler = self._handlers[job.kind]
+            await task_handler(job.payload, shard)
+        # Ошибка обработчика любого вида переводит задачу в повтор
+        except Exception as exc:  # noqa: B902
+            await self._retry(shard, job, exc)
+        else:
+            await self._finish(shard, COMPLETE_QUERY, {"id": job.id})
+            metrics.TASKS_TOTAL.labels(job.kind, "done").inc()
+        finally:
+            metrics.TASKS_IN_PROGRESS.dec()
+            metrics.TASK_DURATION.labels(job.kind).observe(
+                time.perf_counter() - start,
+            )
+
+    async def _retry(self, shard: int, job, exc: Exception) -> None:
+        error = "{name}: {exc}".format(
+            name=type(exc).__name__,
+            exc=exc,
+        )[:MAX_ERROR_LENGTH]
+        if job.attempts >= MAX_ATTEMPTS:
+            logger.error("Task %s %s failed: %s", job.kind, job.id, error)
+            await self._finish(shard, FAIL_QUERY, {"id": job.id, "error": error})
+            metrics.TASKS_TOTAL.labels(job.kind, "failed").inc()
+            return
+        logger.warning("Task %s %s will be retried: %s", job.kind, job.id, error)
+        await self._finish(shard, RETRY_QUERY, {
+            "id": job.id,
+            "error": error,
+            "delay": get_retry_delay(job.attempts),
+        })
+        metrics.TASKS_TOTAL.labels(job.kind, "retried").inc()
+
+    async def _finish(self, shard: int, query, params: Dict[str, Any]) -> None:
+        async with shards.get_session(shard) as session:
+            async with session.begin():
+                await session.execute(query, params)
+
+    async def _run(self) -> None:
+        await asyncio.gather(*(
+            self._run_shard(shard, wakeup)
+            for shard, wakeup in enumerate(self._wakeups)
+        ))
+
+    async def _run_shard(self, shard: int, wakeup: asyncio.Event) -> None:
+        # Задача занимает слот до завершения, цикл выбирает новые задачи,
+        # как только освобождается хотя бы один слот
+        slots = asyncio.Semaphore(self.workers)
+        running: Set[asyncio.Task] = set()
+
+        def release(task: asyncio.Task) -> None:
+            running.discard(task)
+            slots.release()
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning("Task update failed: %s", task.exception())
+
+        try:
+            while True:
+                await slots.acquire()
+                free = self.workers - len(running)
+                try:
+                    jobs = await self._claim(shard, free)
+                # Ошибка любого вида, включая ожидание пула, не должна
+                # останавливать обработку задач шарда
+                except Exception as exc:  # noqa: B902
+                    logger.warning("Task queue poll failed: %s", exc)
+                    slots.release()
+                    await asyncio.sleep(POLL_INTERVAL)
+                    continue
+                # Один слот уже занят, остальные свободны и не ждут
+                for _ in range(len(jobs) - 1):
+                    await slots.acquire()
+                if not jobs:
+                    slots.release()
+                for job in jobs:
+                    task = asyncio.ensure_future(self._execute(shard, job))
+                    running.add(task)
+                    task.add_done_callback(release)
+                # Неполная пачка - готовых задач больше нет
+                if len(jobs) < free:
+                    await self._wait(wakeup)
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def _wait(self, wakeup: asyncio.Event) -> None:
+        try:
+            await asyncio.wait_for(wakeup.wait(), POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+
+queue = TaskQueue()
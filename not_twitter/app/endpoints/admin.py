@@ -0,0 +1,141 @@
+"""Служебные эндпоинты администратора для профилирования."""
+from fastapi import APIRouter, Header, status
+from fastapi.responses import PlainTextResponse
+from typing_extensions import Annotated
+
+from not_twitter.app.utils import schemas
+from not_twitter.app.utils.api_key_ckecker import check_admin_api_key
+from not_twitter.app.utils.endpoint_tags import Tags
+from not_twitter.app.utils.profiling import profiler
+
+router = APIRouter()
+
+
+def get_profiling_status() -> dict:
+    """Получение состояния профайлера.
+
+    Returns:
+        dict: Содержимое ответа с состоянием профайлера.
+    """
+    return {
+        "result": True,
+        "active": profiler.active,
+        "mode": profiler.mode,
+        "sample_rate": profiler.sample_rate,
+        "sampled_requests": profiler.sampled_requests,
+        "samples": profiler.samples,
+        "breakdown": profiler.get_breakdown(),
+    }
+
+
+@router.post(
+    "/api/admin/profiling",
+    response_model=schemas.ProfilingStatusResponse,
+    responses={status.HTTP_403_FORBIDDEN: {"model": schemas.FailResponse}},
+    status_code=status.HTTP_200_OK,
+    summary="Включение профилирования доли запросов",
+    tags=[Tags.service],
+)
+async def start_profiling(
+    api_key: Annotated[str, Header()],
+    settings: schemas.ProfilingSettings,
+):
+    """Эндпоинт для включения профайлера на окно времени.
+
+    Args:
+        api_key (str): Api-key администратора.
+        settings (ProfilingSettings): Настройки окна профилирования.
+
+    Returns:
+        Ответ с состоянием профайлера или сообщением об ошибке.
+    """
+    error_response = check_admin_api_key(api_key)
+    if error_response:
+        return error_response
+
+    profiler.start(
+        sample_rate=settings.sample_rate,
+        duration=settings.duration,
+        interval=settings.interval_ms / 1000,
+        mode=settings.mode,
+    )
+    return get_profiling_status()
+
+
+@router.delete(
+    "/api/admin/profiling",
+    response_model=schemas.ProfilingStatusResponse,
+    responses={status.HTTP_403_FORBIDDEN: {"model": schemas.FailResponse}},
+    status_code=status.HTTP_200_OK,
+    summary="Выключение профилирования",
+    tags=[Tags.service],
+)
+async def stop_profiling(
+    api_key: Annotated[str, Header()],
+):
+    """Эндпоинт для досрочного выключения профайлера.
+
+    Args:
+        api_key (str): Api-key администратора.
+
+    Returns:
+        Ответ с состоянием профайлера или сообщением об ошибке.
+    """
+    error_response = check_admin_api_key(api_key)
+    if error_response:
+        return error_response
+
+    profiler.stop()
+    return get_profiling_status()
+
+
+@router.get(
+    "/api/admin/profiling",
+    response_model=schemas.ProfilingStatusResponse,
+    responses={status.HTTP_403_FORBIDDEN: {"model": schemas.FailResponse}},
+    status_code=status.HTTP_200_OK,
+    summary="Состояние профайлера и разбивка времени запросов",
+    tags=[Tags.service],
+)
+async def get_profiling(
+    api_key: Annotated[str, Header()],
+):
+    """Эндпоинт для получения состояния профайлера.
+
+    Args:
+        api_key (str): Api-key администратора.
+
+    Returns:
+        Ответ с состоянием профайлера или сообщением об ошибке.
+    """
+    error_response = check_admin_api_key(api_key)
+    if error_response:
+        return error_response
+
+    return get_profiling_status()
+
+
+@router.get(
+    "/api/admin/profiling/folded",
+    response_class=PlainTextResponse,
+    responses={status.HTTP_403_FORBIDDEN: {"model": schemas.FailResponse}},
+    status_code=status.HTTP_200_OK,
+    summary="Стеки профилирования в формате для flame graph",
+    tags=[Tags.service],
+)
+async def get_folded_stacks(
+    api_key: Annotated[str, Header()],
+):
+    """Эндпоинт для выгрузки стеков в формате folded stacks.
+
+    Args:
+        api_key (str): Api-key администратора.
+
+    Returns:
+        Стеки профилирования или сообщение об ошибке.
+    """
+    error_response = check_admin_api_key(api_key)
+    if error_response:
+        return error_response
+
+    return PlainTextResponse(profiler.get_folded_stacks())
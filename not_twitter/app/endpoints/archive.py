@@ -0,0 +1,48 @@
+"""Эндпоинт получения твитов из архива."""
+from fastapi import APIRouter, Header, Path, status
+from typing_extensions import Annotated
+
+from not_twitter.app.utils import schemas, standard_responses
+from not_twitter.app.utils.api_key_ckecker import check_api_key
+from not_twitter.app.utils.archive import store
+from not_twitter.app.utils.endpoint_tags import Tags
+
+router = APIRouter()
+
+
+@router.get(
+    "/api/archive/tweets/{tweet_id}",
+    response_model=schemas.ArchivedTweetResponse,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": schemas.FailResponse},
+        status.HTTP_404_NOT_FOUND: {"model": schemas.FailResponse},
+    },
+    status_code=status.HTTP_200_OK,
+    summary="Получение архивного твита",
+    tags=[Tags.tweets],
+)
+async def get_archived_tweet(
+    api_key: Annotated[str, Header()],
+    tweet_id: Annotated[int, Path(description="ID архивного твита")],
+):
+    """Эндпоинт для получения твита, перенесенного из БД в архив.
+
+    Args:
+        api_key (str): Api-key пользователя.
+        tweet_id (int): ID твита.
+
+    Returns:
+        Ответ с архивным твитом или сообщением об ошибке.
+    """
+    _, error_response = await check_api_key(api_key)
+
+    if error_response:
+        return error_response
+
+    tweet = await store.find_async(tweet_id)
+    if tweet is None:
+        message = "No archived tweet with ID {tweet_id}".format(
+            tweet_id=tweet_id,
+        )
+        return standard_responses.get_not_found_response(message)
+    return {"result": True, "tweet": tweet}
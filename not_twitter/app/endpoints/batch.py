@@ -0,0 +1,72 @@
+"""Эндпоинт для выполнения нескольких запросов чтения одним запросом."""
+import asyncio
+import os
+
+from fastapi import APIRouter, Body, Header, Request, status
+from typing_extensions import Annotated
+
+from not_twitter.app.utils import batch, schemas, standard_responses
+from not_twitter.app.utils.api_key_ckecker import authenticated, check_api_key
+from not_twitter.app.utils.endpoint_tags import Tags
+from not_twitter.app.utils.json_responses import RawJSONResponse
+
+MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+# Ограничение не дает одному пакету занять весь пул соединений с БД
+CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+router = APIRouter()
+
+
+@router.post(
+    "/api/batch",
+    response_model=schemas.BatchResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": schemas.FailResponse},
+        status.HTTP_401_UNAUTHORIZED: {"model": schemas.FailResponse},
+    },
+    summary="Выполнение нескольких запросов чтения одним запросом",
+    tags=[Tags.service],
+)
+async def run_batch(
+    api_key: Annotated[str, Header()],
+    batch_request: Annotated[schemas.BatchRequest, Body()],
+    request: Request,
+):
+    """Эндпоинт для выполнения пакета GET запросов к API.
+
+    Api-key проверяется один раз для всего пакета, до BATCH_CONCURRENCY
+    подзапросов выполняются одновременно, ответы возвращаются в порядке
+    подзапросов.
+
+    Args:
+        api_key (str): Api-key пользователя.
+        batch_request (BatchRequest): Пути подзапросов.
+        request (Request): Запрос для доступа к приложению.
+
+    Returns:
+        Ответ со статусами и телами ответов подзапросов или сообщением
+        об ошибке.
+    """
+    user, error_response = await check_api_key(api_key)
+
+    if error_response:
+        return error_response
+
+    if len(batch_request.requests) > MAX_REQUESTS:
+        message = "Batch can contain at most {count} requests".format(
+            count=MAX_REQUESTS,
+        )
+        return standard_responses.get_bad_request_response(message)
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def run_subrequest(path: str) -> batch.SubResponse:
+        async with semaphore:
+            return await batch.run_subrequest(request.app, path, api_key)
+
+    with authenticated(api_key, user):
+        responses = await asyncio.gather(*(
+            run_subrequest(sub_request.path)
+            for sub_request in batch_request.requests
+        ))
+    return RawJSONResponse(batch.dump_responses(responses))
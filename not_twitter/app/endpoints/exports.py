@@ -0,0 +1,101 @@
+"""Эндпоинт выгрузки истории пользователя для администратора."""
+from fastapi import APIRouter, Header, Path, Query, status
+from fastapi.responses import StreamingResponse
+from typing_extensions import Annotated
+
+from not_twitter.app.database import crud_operations
+from not_twitter.app.utils import exports, schemas, standard_responses
+from not_twitter.app.utils.api_key_ckecker import check_admin_api_key
+from not_twitter.app.utils.endpoint_tags import Tags
+
+router = APIRouter()
+
+KIND_TWEETS = "tweets"
+KIND_LIKES = "likes"
+# Источник строк и имена их полей для каждого вида выгрузки
+EXPORTS = {
+    KIND_TWEETS: (
+        crud_operations.stream_user_tweets,
+        ("id", "content", "attachments"),
+    ),
+    KIND_LIKES: (
+        crud_operations.stream_user_likes,
+        ("tweet_id", "author_id", "content"),
+    ),
+}
+
+
+@router.get(
+    "/api/admin/users/{user_id}/export",
+    summary="Потоковая выгрузка твитов или лайков пользователя",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                media_type: {} for media_type in exports.MEDIA_TYPES.values()
+            },
+        },
+        status.HTTP_403_FORBIDDEN: {"model": schemas.FailResponse},
+        status.HTTP_404_NOT_FOUND: {"model": schemas.FailResponse},
+    },
+    response_class=StreamingResponse,
+    tags=[Tags.service],
+)
+async def export_user_data(
+    api_key: Annotated[str, Header()],
+    user_id: Annotated[int, Path(description="ID пользователя")],
+    kind: Annotated[
+        str,
+        Query(pattern="^(tweets|likes)$", description="Вид выгрузки"),
+    ] = KIND_TWEETS,
+    export_format: Annotated[
+        str,
+        Query(alias="format", pattern="^(ndjson|csv)$"),
+    ] = exports.FORMAT_NDJSON,
+    after_id: Annotated[
+        int,
+        Query(
+            ge=0,
+            description="Продолжить выгрузку после твита с этим ID",
+        ),
+    ] = 0,
+):
+    """Эндпоинт для выгрузки истории пользователя.
+
+    Строки отдаются по возрастанию ID твита, поэтому прерванную выгрузку
+    можно продолжить, передав в after_id последний полученный ID.
+
+    Args:
+        api_key (str): Api-key администратора.
+        user_id (int): ID пользователя.
+        kind (str): Вид выгрузки: tweets или likes.
+        export_format (str): Формат выгрузки: ndjson или csv.
+        after_id (int): ID твита, после которого продолжить выгрузку.
+
+    Returns:
+        Поток строк выгрузки или сообщение об ошибке.
+    """
+    error_response = check_admin_api_key(api_key)
+    if error_response:
+        return error_response
+
+    user = await crud_operations.get_user_by_id(user_id)
+    if not user:
+        message = "No user with ID {user_id}".format(user_id=user_id)
+        return standard_responses.get_not_found_response(message)
+
+    stream_rows, columns = EXPORTS[kind]
+    encode = exports.ENCODERS[export_format]
+    filename = "user_{user_id}_{kind}.{extension}".format(
+        user_id=user_id,
+        kind=kind,
+        extension=export_format,
+    )
+    return StreamingResponse(
+        encode(stream_rows(user_id, after_id), columns),
+        media_type=exports.MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": 'attachment; filename="{filename}"'.format(
+                filename=filename,
+            ),
+        },
+    )
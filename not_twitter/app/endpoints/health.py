@@ -0,0 +1,56 @@
+"""Эндпоинты проверки жизнеспособности и готовности процесса."""
+from fastapi import APIRouter, status
+
+from not_twitter.app.utils import readiness, schemas, standard_responses
+from not_twitter.app.utils.endpoint_tags import Tags
+from not_twitter.app.utils.json_responses import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/healthz",
+    response_model=schemas.Response,
+    status_code=status.HTTP_200_OK,
+    summary="Проверка жизнеспособности процесса",
+    tags=[Tags.service],
+)
+async def get_health():
+    """Эндпоинт для проверки жизнеспособности без обращения к БД.
+
+    Returns:
+        Ответ об успешном выполнении.
+    """
+    return standard_responses.get_success_response()
+
+
+@router.get(
+    "/readyz",
+    response_model=schemas.ReadinessResponse,
+    responses={
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "model": schemas.ReadinessResponse,
+        },
+    },
+    status_code=status.HTTP_200_OK,
+    summary="Проверка готовности процесса принимать трафик",
+    tags=[Tags.service],
+)
+async def get_readiness():
+    """Эндпоинт для проверки готовности.
+
+    Возвращает статус 503, пока не пройдены все проверки: доступность БД,
+    прогрев пула соединений и проверки, зарегистрированные другими модулями.
+
+    Returns:
+        Ответ с результатами проверок.
+    """
+    checks = await readiness.REGISTRY.run()
+    is_ready = all(checks.values())
+    return FastJSONResponse(
+        {"result": is_ready, "checks": checks},
+        status_code=(
+            status.HTTP_200_OK if is_ready
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
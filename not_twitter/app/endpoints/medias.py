@@ -39,7 +39,7 @@ async def upload_media(
     if error_response:
         return error_response
 
-    media_id = await crud_operations.add_media(file.file.read())
+    media_id = await crud_operations.add_media(file.file.read(), user.id)
     return {"result": True, "media_id": media_id}
 
 
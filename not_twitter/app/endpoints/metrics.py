@@ -0,0 +1,29 @@
+"""Эндпоинт выгрузки метрик приложения."""
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+
+from not_twitter.app.utils import metrics
+from not_twitter.app.utils.endpoint_tags import Tags
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Метрики приложения в формате Prometheus",
+    tags=[Tags.service],
+)
+async def get_metrics():
+    """Эндпоинт для выгрузки метрик.
+
+    Returns:
+        Метрики в текстовом формате Prometheus.
+    """
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        headers={"Content-Type": CONTENT_TYPE},
+    )
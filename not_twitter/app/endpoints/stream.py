@@ -0,0 +1,69 @@
+"""Эндпоинт потока событий ленты."""
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, status
+from fastapi.responses import StreamingResponse
+from typing_extensions import Annotated
+
+from not_twitter.app.utils import admission, schemas, standard_responses
+from not_twitter.app.utils.api_key_ckecker import check_api_key
+from not_twitter.app.utils.endpoint_tags import Tags
+from not_twitter.app.utils.stream_hub import hub
+
+router = APIRouter()
+
+
+@router.get(
+    "/api/stream",
+    summary="Поток событий ленты в формате Server-Sent Events",
+    responses={
+        status.HTTP_200_OK: {"content": {"text/event-stream": {}}},
+        status.HTTP_401_UNAUTHORIZED: {"model": schemas.FailResponse},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"model": schemas.FailResponse},
+    },
+    response_class=StreamingResponse,
+    tags=[Tags.tweets],
+)
+async def get_stream(
+    api_key: Annotated[Optional[str], Header()] = None,
+    api_key_param: Annotated[
+        Optional[str],
+        Query(
+            alias="api_key",
+            description="Api-key для клиентов без поддержки хэдеров",
+        ),
+    ] = None,
+):
+    """Эндпоинт для получения новых твитов, лайков и удалений.
+
+    События tweet, delete, like и unlike отправляются по мере появления.
+    Событие reset означает, что клиент не успевал получать события и
+    должен перезапросить ленту. При STREAM_MAX_PER_KEY открытых потоках
+    api-key возвращается ответ 429.
+
+    Args:
+        api_key (Optional[str]): Api-key пользователя.
+        api_key_param (Optional[str]): Api-key пользователя в параметре.
+
+    Returns:
+        Поток событий или сообщение об ошибке.
+    """
+    api_key = api_key or api_key_param
+    if not api_key:
+        return standard_responses.get_unauthorized_response()
+    _, error_response = await check_api_key(api_key)
+
+    if error_response:
+        return error_response
+
+    subscriber = hub.subscribe(api_key)
+    if subscriber is None:
+        return standard_responses.get_too_many_requests_response(
+            admission.RETRY_AFTER,
+        )
+
+    return StreamingResponse(
+        hub.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
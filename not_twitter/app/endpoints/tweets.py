@@ -1,13 +1,15 @@
 """Эндпоинты для создания, получения и удаления твитов."""
-from typing import List
+from typing import List, Optional
 
-from fastapi import Body, APIRouter, Header, Path, status
+from fastapi import Body, APIRouter, Header, Path, Query, Response, status
 from typing_extensions import Annotated
 
 from not_twitter.app.database import crud_operations
 from not_twitter.app.utils import schemas, standard_responses
 from not_twitter.app.utils.api_key_ckecker import check_api_key
 from not_twitter.app.utils.endpoint_tags import Tags
+from not_twitter.app.utils.feed_notifier import MAX_WAIT, feed_notifier
+from not_twitter.app.utils.stale_cache import feed_cache, set_stale_headers
 
 router = APIRouter()
 
@@ -21,22 +23,57 @@ router = APIRouter()
 )
 async def get_tweets(
     api_key: Annotated[str, Header()],
+    response: Response,
+    since_id: Annotated[
+        Optional[int],
+        Query(description="Вернуть только твиты новее твита с этим ID"),
+    ] = None,
+    wait: Annotated[
+        float,
+        Query(
+            ge=0,
+            le=MAX_WAIT,
+            description="Ожидание новых твитов при since_id, секунд",
+        ),
+    ] = 0,
 ):
     """Эндпоинт для получения списка твитов.
 
+    Если БД не отвечает вовремя, возвращается последняя полученная лента
+    с признаком stale и хэдерами X-Stale и Age. С since_id возвращаются
+    только более новые твиты, при отсутствии новых запрос ждет их до
+    wait секунд и отвечает заранее закодированной пустой лентой без
+    обращения к БД.
+
     Args:
         api_key (str): Api-key пользователя.
+        response (Response): Ответ для установки хэдеров.
+        since_id (Optional[int]): ID последнего полученного твита.
+        wait (float): Максимальное ожидание новых твитов, секунд.
 
     Returns:
         Ответ со списком твитов.
     """
-    _, error_response = await check_api_key(api_key)
+    _, error_response = await check_api_key(api_key, allow_stale=True)
 
     if error_response:
         return error_response
 
-    tweets = await crud_operations.get_all_tweets()
-    return {"result": True, "tweets": tweets}
+    if since_id is not None:
+        if not await feed_notifier.wait_for_newer(since_id, wait):
+            return standard_responses.get_empty_feed_response()
+        tweets = await feed_notifier.fetch(since_id, crud_operations.get_feed)
+        return {"result": True, "tweets": tweets}
+
+    tweets, stale_age = await feed_cache.get(
+        "feed",
+        crud_operations.get_feed,
+    )
+    if stale_age is None:
+        feed_notifier.observe(tweets[0].id if tweets else 0)
+        return {"result": True, "tweets": tweets}
+    set_stale_headers(response.headers, stale_age)
+    return {"result": True, "tweets": tweets, "stale": True}
 
 
 @router.post(
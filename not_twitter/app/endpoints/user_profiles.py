@@ -1,15 +1,38 @@
 """Эндпоинты для получения профилей пользователей."""
-from fastapi import APIRouter, Header, Path, status
+from typing import Optional
+
+from fastapi import APIRouter, Header, Path, Response, status
 from typing_extensions import Annotated
 
 from not_twitter.app.database import crud_operations
 from not_twitter.app.utils import schemas, standard_responses
 from not_twitter.app.utils.api_key_ckecker import check_api_key
 from not_twitter.app.utils.endpoint_tags import Tags
+from not_twitter.app.utils.stale_cache import profile_cache, set_stale_headers
 
 router = APIRouter()
 
 
+def get_profile_response(user, stale_age: Optional[float], response: Response):
+    """Формирование ответа с профилем пользователя.
+
+    Устаревший профиль из кэша помечается признаком stale и хэдерами
+    X-Stale и Age.
+
+    Args:
+        user: Пользователь.
+        stale_age (Optional[float]): Возраст устаревшего профиля в секундах.
+        response (Response): Ответ для установки хэдеров.
+
+    Returns:
+        Ответ с профилем пользователя.
+    """
+    if stale_age is None:
+        return {"result": True, "user": user}
+    set_stale_headers(response.headers, stale_age)
+    return {"result": True, "user": user, "stale": True}
+
+
 @router.get(
     "/api/users/me",
     summary="Получение информации о профиле текущего пользователя",
@@ -20,18 +43,23 @@ router = APIRouter()
 )
 async def get_self_profile(
     api_key: Annotated[str, Header()],
+    response: Response,
 ):
     """Эндпоинт для получения профиля пользователя.
 
     Args:
         api_key (str): Api-key пользователя.
+        response (Response): Ответ для установки хэдеров.
 
     Returns:
         Ответ с профилем пользователя или сообщением об ошибке.
     """
-    user = await crud_operations.get_user_by_api_key(api_key)
+    user, stale_age = await profile_cache.get(
+        ("api_key", api_key),
+        lambda: crud_operations.get_user_by_api_key(api_key),
+    )
     if user:
-        return {"result": True, "user": user}
+        return get_profile_response(user, stale_age, response)
 
     message = "No user registered to api-key {api_key}".format(
         api_key=api_key,
@@ -50,24 +78,29 @@ async def get_self_profile(
 async def get_user_profile(
     api_key: Annotated[str, Header()],
     user_id: Annotated[int, Path(description="ID пользователя")],
+    response: Response,
 ):
     """Эндпоинт для получения профиля пользователя по ID.
 
     Args:
         api_key (str): Api-key пользователя.
         user_id (int): ID пользователя.
+        response (Response): Ответ для установки хэдеров.
 
     Returns:
         Ответ с профилем пользователя или сообщением об ошибке.
     """
-    _, error_response = await check_api_key(api_key)
+    _, error_response = await check_api_key(api_key, allow_stale=True)
 
     if error_response:
         return error_response
 
-    user = await crud_operations.get_user_by_id(user_id)
+    user, stale_age = await profile_cache.get(
+        ("id", user_id),
+        lambda: crud_operations.get_user_by_id(user_id),
+    )
     if user:
-        return {"result": True, "user": user}
+        return get_profile_response(user, stale_age, response)
 
     message = "No user with ID {user_id}".format(
         user_id=user_id,
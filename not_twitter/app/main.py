@@ -2,27 +2,80 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
-from not_twitter.app.config_data.users_config import users_data
-from not_twitter.app.database import crud_operations, database
-from not_twitter.app.endpoints import followings, likes, medias, tweets, user_profiles
+from not_twitter.app.database import (
+    database,
+    like_buffer,
+    partitions,
+    retention,
+    shards,
+    snowflake,
+    task_queue,
+)
+from not_twitter.app.endpoints import (
+    admin,
+    archive,
+    batch,
+    exports,
+    followings,
+    health,
+    likes,
+    medias,
+    metrics,
+    stream,
+    tweets,
+    user_profiles,
+)
+from not_twitter.app.utils.admission import AdmissionMiddleware
+from not_twitter.app.utils.json_responses import FastJSONResponse
+from not_twitter.app.utils.metrics_middleware import MetricsMiddleware
+from not_twitter.app.utils.profiling import ProfilingMiddleware, profiler
+from not_twitter.app.utils.rate_limit import RateLimitMiddleware
+from not_twitter.app.utils.stream_hub import listener
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.include_router(followings.router)
 app.include_router(likes.router)
 app.include_router(medias.router)
 app.include_router(tweets.router)
 app.include_router(user_profiles.router)
-app.mount('/', StaticFiles(directory='static', html=True))
+app.include_router(metrics.router)
+app.include_router(admin.router)
+app.include_router(exports.router)
+app.include_router(health.router)
+app.include_router(stream.router)
+app.include_router(archive.router)
+app.include_router(batch.router)
+app.mount('/', StaticFiles(directory='static', html=True), name='static')
 
 
 @app.on_event("startup")
 async def startup():
-    """Первоначальная настройка перед запуском приложения."""
-    await database.init_db()
-    await crud_operations.fill_db(users_data)
+    """Первоначальная настройка перед запуском приложения.
+
+    Таблицы и пользователи создаются заранее модулем database.bootstrap.
+    """
+    await snowflake.lease.start()
+    await database.warm_up_pool()
+    listener.start()
+    like_buffer.buffer.start()
+    task_queue.queue.start()
+    partitions.manager.start()
+    retention.job.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
     """Завершение работы приложения."""
+    profiler.stop()
+    await like_buffer.buffer.stop()
+    await task_queue.queue.stop()
+    await listener.stop()
+    await partitions.manager.stop()
+    await retention.job.stop()
+    await snowflake.lease.stop()
+    await shards.shutdown_shards()
     await database.shutdown_db()
@@ -0,0 +1,112 @@
+"""Тестирование контроля допуска запросов."""
+import asyncio
+
+import pytest
+
+from not_twitter.app.utils import route_classes
+from not_twitter.app.utils.admission import (
+    COMPACT_MIN_STALE,
+    SHED_QUEUE_FULL,
+    SHED_TIMEOUT,
+    AdmissionController,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def test_classify_request():
+    """Тестирование классификации запросов по маршрутам."""
+    classify = route_classes.classify_request
+    assert classify("GET", "/api/tweets") == route_classes.FEED
+    assert classify("GET", "/api/users/me") == route_classes.AUTH
+    assert classify("GET", "/api/users/1") == route_classes.READ
+    assert classify("POST", "/api/tweets") == route_classes.WRITE
+    assert classify("DELETE", "/api/tweets/1/likes") == route_classes.WRITE
+    assert classify("POST", "/api/medias") == route_classes.MEDIA_UPLOAD
+    assert classify("POST", "/api/batch") == route_classes.BATCH
+    assert classify("GET", "/readyz") == route_classes.SERVICE
+    assert classify("POST", "/api/admin/profiling") == route_classes.SERVICE
+    assert classify("GET", "/api/stream") == route_classes.STREAM
+    assert classify("GET", "/index.html") == route_classes.STATIC
+
+
+@pytest.mark.asyncio
+async def test_admission_priority_order():
+    """Тестирование передачи разрешения запросу с большим приоритетом."""
+    controller = AdmissionController(1, 10, queue_wait_budget=5)
+    assert await controller.acquire(0) is None
+
+    admitted = []
+
+    async def request(name: str, priority: int):
+        assert await controller.acquire(priority) is None
+        admitted.append(name)
+        controller.release()
+
+    feed = asyncio.create_task(request("feed", 2))
+    await asyncio.sleep(0)
+    write = asyncio.create_task(request("write", 0))
+    await asyncio.sleep(0)
+    assert controller.waiting == 2
+
+    controller.release()
+    await asyncio.gather(feed, write)
+    assert admitted == ["write", "feed"]
+    assert controller.active == 0
+    assert controller.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_load():
+    """Тестирование отказа при переполнении очереди и по таймауту."""
+    controller = AdmissionController(1, 1, queue_wait_budget=0.05)
+    assert await controller.acquire(0) is None
+
+    queued = asyncio.create_task(controller.acquire(2))
+    await asyncio.sleep(0)
+    assert await controller.acquire(0) == SHED_QUEUE_FULL
+    assert await queued == SHED_TIMEOUT
+    assert controller.waiting == 0
+
+    controller.release()
+    assert controller.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_cancelled_waiter():
+    """Тестирование отмены ожидающего запроса."""
+    controller = AdmissionController(1, 10, queue_wait_budget=5)
+    assert await controller.acquire(0) is None
+
+    queued = asyncio.create_task(controller.acquire(1))
+    await asyncio.sleep(0)
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    assert controller.waiting == 0
+
+    controller.release()
+    assert controller.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_compacts_expired_waiters():
+    """Тестирование удаления истекших ожиданий из очереди."""
+    controller = AdmissionController(1, 1000, queue_wait_budget=0)
+    assert await controller.acquire(0) is None
+
+    for _ in range(3):
+        shed = await asyncio.gather(*(
+            controller.acquire(1) for _ in range(COMPACT_MIN_STALE)
+        ))
+        assert shed == [SHED_TIMEOUT] * COMPACT_MIN_STALE
+    assert controller.waiting == 0
+    assert len(controller._queue) < COMPACT_MIN_STALE  # noqa: WPS437
+
+    controller.queue_wait_budget = 5
+    queued = asyncio.create_task(controller.acquire(0))
+    await asyncio.sleep(0)
+    controller.release()
+    assert await queued is None
+    controller.release()
+    assert controller.active == 0
@@ -1,7 +1,24 @@
 """Тестирование эндпоинтов приложения."""
+import asyncio
+import json
+import time
 from typing import Dict
 
 from fastapi import status
+from sqlalchemy import delete
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from not_twitter.app.database import crud_operations, database, models
+from not_twitter.app.endpoints import batch
+from not_twitter.app.utils import (
+    admission,
+    api_key_ckecker,
+    archive,
+    rate_limit,
+    stale_cache,
+    stream_hub,
+)
 
 
 def get_api_key_headers(api_key: str) -> Dict[str, str]:
@@ -536,3 +553,597 @@ def test_get_media(client, media):
     )
     assert response.status_code == status.HTTP_200_OK
     assert response.content == media.media_data
+
+
+def test_metrics_endpoint(client, api_keys):
+    """Тестирование эндпоинта GET /metrics.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    headers = get_api_key_headers(api_keys[0].api_key)
+    client.get("/api/users/9999", headers=headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_requests_total{method="GET",route="/api/users/{user_id}",'
+        + 'status="404"}'
+    ) in response.text
+    assert "db_pool_checked_out_connections" in response.text
+
+
+def test_server_timing_header(client, api_keys):
+    """Тестирование хэдера Server-Timing с количеством SQL запросов.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    headers = get_api_key_headers(api_keys[0].api_key)
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    server_timing = response.headers.get("server-timing")
+    assert server_timing.startswith("db;dur=")
+    assert "queries" in server_timing
+
+
+def test_profiling_requires_admin(client, api_keys):
+    """Тестирование эндпоинта POST /api/admin/profiling без прав администратора.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    headers = get_api_key_headers(api_keys[0].api_key)
+    response = client.post("/api/admin/profiling", headers=headers, json={})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    res_json = response.json()
+    assert not res_json.get("result")
+
+
+def test_profiling(client, monkeypatch, api_keys):
+    """Тестирование включения профайлера и выгрузки стеков.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    monkeypatch.setattr(api_key_ckecker, "ADMIN_API_KEYS", ("admin_key",))
+    admin_headers = get_api_key_headers("admin_key")
+    payload = {"sample_rate": 1, "duration": 10, "mode": "async"}
+
+    response = client.post(
+        "/api/admin/profiling",
+        headers=admin_headers,
+        json=payload,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json().get("active")
+
+    client.get("/api/tweets", headers=get_api_key_headers(api_keys[0].api_key))
+
+    response = client.delete("/api/admin/profiling", headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    res_json = response.json()
+    assert not res_json.get("active")
+    # Профилируется и запрос ленты, и сам запрос выключения
+    assert res_json.get("sampled_requests") == 2
+    assert res_json["breakdown"]["wall"] > 0
+
+    response = client.get("/api/admin/profiling/folded", headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+
+
+def test_healthz(client):
+    """Тестирование эндпоинта GET /healthz.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+    """
+    response = client.get("/healthz")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json().get("result")
+
+
+def test_readyz(client, monkeypatch):
+    """Тестирование эндпоинта GET /readyz до и после прогрева пула.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+    """
+    response = client.get("/readyz")
+    assert response.status_code == status.HTTP_200_OK
+    res_json = response.json()
+    assert res_json.get("result")
+    assert res_json["checks"] == {"database": True, "pool_warm_up": True}
+
+    monkeypatch.setattr(database, "pool_warmed_up", False)
+    response = client.get("/readyz")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    res_json = response.json()
+    assert not res_json.get("result")
+    assert not res_json["checks"]["pool_warm_up"]
+
+
+def test_admission_sheds_api_requests(client, monkeypatch, api_keys):
+    """Тестирование ответа 503 при переполненной очереди допуска.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    monkeypatch.setattr(
+        admission,
+        "controller",
+        admission.AdmissionController(0, 0, queue_wait_budget=0),
+    )
+    headers = get_api_key_headers(api_keys[0].api_key)
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == str(admission.RETRY_AFTER)
+    assert not response.json().get("result")
+
+    response = client.get("/healthz")
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get("/metrics")
+    assert (
+        'admission_shed_requests_total{route_class="feed",reason="queue_full"}'
+    ) in response.text
+
+
+def test_rate_limit(client, monkeypatch, api_keys):
+    """Тестирование ответа 429 при превышении лимита api-key.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    monkeypatch.setattr(
+        rate_limit,
+        "limiter",
+        rate_limit.RateLimiter(
+            rate_limit.MemoryBackend(),
+            {"feed": rate_limit.RateLimit(rate=0.001, burst=1)},
+        ),
+    )
+    headers = get_api_key_headers(api_keys[0].api_key)
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["retry-after"]) > 0
+    assert not response.json().get("result")
+
+    headers = get_api_key_headers(api_keys[1].api_key)
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_stale_feed(client, monkeypatch, api_keys):
+    """Тестирование отдачи устаревшей ленты при медленной БД.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    headers = get_api_key_headers(api_keys[0].api_key)
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert not response.json()["stale"]
+    assert "x-stale" not in response.headers
+    tweets = response.json()["tweets"]
+
+    async def slow_feed():
+        await asyncio.sleep(0.1)
+        return []
+
+    async def slow_auth(api_key):
+        await asyncio.sleep(0.1)
+        return None
+
+    monkeypatch.setattr(stale_cache.feed_cache, "deadline", 0.01)
+    monkeypatch.setattr(stale_cache, "READ_DEADLINE", 0.01)
+    monkeypatch.setattr(crud_operations, "get_feed", slow_feed)
+    monkeypatch.setattr(crud_operations, "get_auth_user_by_api_key", slow_auth)
+    for _ in range(2):
+        response = client.get("/api/tweets", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["stale"]
+        assert response.json()["tweets"] == tweets
+        assert response.headers["x-stale"] == "true"
+        assert "age" in response.headers
+    client.loop.run_until_complete(asyncio.gather(
+        *stale_cache.feed_cache.refreshing.values(),
+        *api_key_ckecker.refreshing.values(),
+    ))
+    assert not api_key_ckecker.is_known_key(api_keys[0].api_key)
+
+
+def test_stale_reads_with_exhausted_pool(client, monkeypatch, api_keys):
+    """Тестирование устаревших ленты и профиля при исчерпанном пуле.
+
+    Сессии приложения переключаются на пул из одного соединения, занятого
+    тестом, поэтому и проверка api-key, и чтение ленты ждали бы его.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    headers = get_api_key_headers(api_keys[0].api_key)
+    profile_url = "/api/users/{id}".format(id=api_keys[1].user_id)
+    tweets = client.get("/api/tweets", headers=headers).json()["tweets"]
+    profile = client.get(profile_url, headers=headers).json()["user"]
+
+    small_engine = create_async_engine(
+        database.engine.url,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=1,
+    )
+    held = client.loop.run_until_complete(small_engine.connect())
+    bind = database.async_session.kw["bind"]
+    monkeypatch.setattr(database, "engine", small_engine)
+    database.async_session.configure(bind=small_engine)
+    try:
+        assert database.is_pool_exhausted()
+        for url in ("/api/tweets", profile_url):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            assert time.perf_counter() - start < stale_cache.READ_DEADLINE
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["stale"]
+            assert response.headers["x-stale"] == "true"
+        assert response.json()["user"] == profile
+        response = client.get("/api/tweets", headers=headers)
+        assert response.json()["tweets"] == tweets
+    finally:
+        database.async_session.configure(bind=bind)
+        client.loop.run_until_complete(held.close())
+        client.loop.run_until_complete(small_engine.dispose())
+
+
+def test_auth_is_not_stale(client, monkeypatch, session, api_keys):
+    """Тестирование проверки api-key записи по БД без устаревших данных.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        session (AsyncSession): сессия для работы с БД.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    headers = get_api_key_headers(api_keys[0].api_key)
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    async def unavailable(api_key):
+        raise PoolTimeoutError("pool exhausted")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(crud_operations, "get_auth_user_by_api_key", unavailable)
+        response = client.post(
+            "/api/tweets",
+            headers=headers,
+            json={"tweet_data": "unchecked", "tweet_media_ids": []},
+        )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == str(admission.RETRY_AFTER)
+
+    client.loop.run_until_complete(session.execute(
+        delete(models.ApiKeyToUser)
+        .where(models.ApiKeyToUser.api_key == api_keys[0].api_key),
+    ))
+    client.loop.run_until_complete(session.commit())
+    response = client.post(
+        "/api/tweets",
+        headers=headers,
+        json={"tweet_data": "revoked", "tweet_media_ids": []},
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_get_tweets_since_id(client, tweets_and_api_keys):
+    """Тестирование получения только новых твитов ленты.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+    """
+    api_keys = tweets_and_api_keys["api_keys"]
+    headers = get_api_key_headers(api_keys[0].api_key)
+    tweets = client.get("/api/tweets", headers=headers).json()["tweets"]
+
+    params = {"since_id": tweets[-1]["id"]}
+    response = client.get("/api/tweets", headers=headers, params=params)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["tweets"] == tweets[:-1]
+
+    params = {"since_id": tweets[0]["id"], "wait": 0.01}
+    response = client.get("/api/tweets", headers=headers, params=params)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"result": True, "tweets": [], "stale": False}
+
+    payload = {"tweet_data": "new tweet", "tweet_media_ids": []}
+    tweet_id = client.post(
+        "/api/tweets",
+        headers=headers,
+        json=payload,
+    ).json()["tweet_id"]
+    response = client.get("/api/tweets", headers=headers, params=params)
+    assert [tweet["id"] for tweet in response.json()["tweets"]] == [tweet_id]
+
+
+def test_stream_without_auth(client):
+    """Тестирование отказа в потоке событий без api-key.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+    """
+    response = client.get("/api/stream")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = client.get("/api/stream", params={"api_key": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_stream_limits(client, monkeypatch, api_keys):
+    """Тестирование лимитов потока событий с api-key в параметре.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    monkeypatch.setattr(
+        rate_limit,
+        "limiter",
+        rate_limit.RateLimiter(
+            rate_limit.MemoryBackend(),
+            {"stream": rate_limit.RateLimit(rate=0.001, burst=1)},
+        ),
+    )
+    response = client.get("/api/stream", params={"api_key": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.get("/api/stream", params={"api_key": "wrong"})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    monkeypatch.setattr(stream_hub.hub, "max_streams_per_key", 0)
+    response = client.get(
+        "/api/stream",
+        params={"api_key": api_keys[0].api_key},
+    )
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert not stream_hub.hub.subscribers
+
+
+def test_export_user_data(client, monkeypatch, liked_tweets_and_api_keys):
+    """Тестирование потоковой выгрузки твитов и лайков пользователя.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        liked_tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты,
+            лайки и api-keys.
+    """
+    monkeypatch.setattr(api_key_ckecker, "ADMIN_API_KEYS", ("admin_key",))
+    headers = get_api_key_headers("admin_key")
+    user_id = liked_tweets_and_api_keys["api_keys"][0].user_id
+    tweet_ids = sorted(
+        tweet.id
+        for tweet in liked_tweets_and_api_keys["tweets"]
+        if tweet.author_id == user_id
+    )
+    url = "/api/admin/users/{id}/export".format(id=user_id)
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == tweet_ids
+
+    response = client.get(url, headers=headers, params={"after_id": tweet_ids[0]})
+    assert response.text.count("\n") == len(tweet_ids) - 1
+
+    response = client.get(
+        url,
+        headers=headers,
+        params={"kind": "likes", "format": "csv"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    lines = response.text.splitlines()
+    assert lines[0] == "tweet_id,author_id,content"
+    assert len(lines) == 2
+
+    response = client.get(url, headers=get_api_key_headers("wrong"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_get_archived_tweet(client, monkeypatch, api_keys, tmp_path):
+    """Тестирование получения твита из архива.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+        tmp_path: Временный каталог.
+    """
+    monkeypatch.setattr(archive.store, "directory", str(tmp_path))
+    archive.store.write([
+        {
+            "id": 10,
+            "content": "archived",
+            "attachments": [],
+            "author": {"id": api_keys[0].user_id, "name": "Test_User_1"},
+            "likes": [],
+            "created_at": "2020-01-01T00:00:00+00:00",
+            "medias": [],
+        },
+    ])
+    headers = get_api_key_headers(api_keys[0].api_key)
+
+    response = client.get("/api/archive/tweets/10", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["tweet"]["content"] == "archived"
+
+    response = client.get("/api/archive/tweets/11", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_batch(client, monkeypatch, tweets_and_api_keys):
+    """Тестирование пакетного запроса с одной проверкой api-key.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+    """
+    api_keys = tweets_and_api_keys["api_keys"]
+    auth_calls = []
+    get_auth_user = crud_operations.get_auth_user_by_api_key
+
+    async def count_auth(api_key):
+        auth_calls.append(api_key)
+        return await get_auth_user(api_key)
+
+    monkeypatch.setattr(crud_operations, "get_auth_user_by_api_key", count_auth)
+    # Сессии подзапросов в тесте делят одно соединение с транзакцией
+    monkeypatch.setattr(batch, "CONCURRENCY", 1)
+    paths = [
+        "/api/users/me",
+        "/api/tweets",
+        "/api/users/{id}".format(id=api_keys[1].user_id),
+        "/api/users/0",
+        "/api/users/abc",
+        "/api/stream",
+        "/api/medias/1",
+        "/api/admin/profiling",
+    ]
+    response = client.post(
+        "/api/batch",
+        headers=get_api_key_headers(api_keys[0].api_key),
+        json={"requests": [{"path": path} for path in paths]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(auth_calls) == 1
+    responses = response.json()["responses"]
+    assert [sub["status"] for sub in responses] == [
+        status.HTTP_200_OK,
+        status.HTTP_200_OK,
+        status.HTTP_200_OK,
+        status.HTTP_404_NOT_FOUND,
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        status.HTTP_400_BAD_REQUEST,
+        status.HTTP_400_BAD_REQUEST,
+        status.HTTP_400_BAD_REQUEST,
+    ]
+    assert responses[0]["body"]["user"]["id"] == api_keys[0].user_id
+    assert len(responses[1]["body"]["tweets"]) == 2
+    assert responses[2]["body"]["user"]["id"] == api_keys[1].user_id
+
+    response = client.post(
+        "/api/batch",
+        headers=get_api_key_headers("wrong_key"),
+        json={"requests": [{"path": "/api/users/me"}]},
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    monkeypatch.setattr(batch, "MAX_REQUESTS", 1)
+    response = client.post(
+        "/api/batch",
+        headers=get_api_key_headers(api_keys[0].api_key),
+        json={"requests": [{"path": "/api/users/me"}] * 2},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_batch_subrequest_error(client, monkeypatch, tweets_and_api_keys):
+    """Тестирование ответа 500 на упавший подзапрос пакета.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+    """
+    api_keys = tweets_and_api_keys["api_keys"]
+
+    async def fail(user_id):
+        raise RuntimeError("profile failed")
+
+    monkeypatch.setattr(crud_operations, "get_user_by_id", fail)
+    monkeypatch.setattr(batch, "CONCURRENCY", 1)
+    response = client.post(
+        "/api/batch",
+        headers=get_api_key_headers(api_keys[0].api_key),
+        json={"requests": [
+            {"path": "/api/users/me"},
+            {"path": "/api/users/{id}".format(id=api_keys[1].user_id)},
+            {"path": "/api/tweets"},
+        ]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    responses = response.json()["responses"]
+    assert [sub["status"] for sub in responses] == [
+        status.HTTP_200_OK,
+        status.HTTP_500_INTERNAL_SERVER_ERROR,
+        status.HTTP_200_OK,
+    ]
+    assert responses[1]["body"]["result"] is False
+    assert len(responses[2]["body"]["tweets"]) == 2
+
+
+def test_batch_charges_subrequests(client, monkeypatch, tweets_and_api_keys):
+    """Тестирование учета подзапросов пакета по их классам маршрутов.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+    """
+    monkeypatch.setattr(
+        rate_limit,
+        "limiter",
+        rate_limit.RateLimiter(
+            rate_limit.MemoryBackend(),
+            {"feed": rate_limit.RateLimit(rate=0.001, burst=1)},
+        ),
+    )
+    monkeypatch.setattr(batch, "CONCURRENCY", 1)
+    headers = get_api_key_headers(tweets_and_api_keys["api_keys"][0].api_key)
+    paths = ["/api/tweets", "/api/tweets", "/api/users/me"]
+    response = client.post(
+        "/api/batch",
+        headers=headers,
+        json={"requests": [{"path": path} for path in paths]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [sub["status"] for sub in response.json()["responses"]] == [
+        status.HTTP_200_OK,
+        status.HTTP_429_TOO_MANY_REQUESTS,
+        status.HTTP_200_OK,
+    ]
+
+    monkeypatch.setattr(
+        admission,
+        "controller",
+        admission.AdmissionController(0, 0, queue_wait_budget=0),
+    )
+    response = client.post(
+        "/api/batch",
+        headers=headers,
+        json={"requests": [{"path": "/api/users/me"}]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["responses"][0]["status"] == (
+        status.HTTP_503_SERVICE_UNAVAILABLE
+    )
@@ -0,0 +1,148 @@
+"""Тестирование массового импорта через COPY."""
+import json
+from typing import Dict
+
+import pytest
+from sqlalchemy import text
+
+from not_twitter.app.database import bulk_import, partitions
+
+pytest_plugins = ("pytest_asyncio",)
+
+FIRST_ID = 900000
+
+
+def write_jsonl(path, records) -> str:
+    """Запись записей в файл JSONL.
+
+    Args:
+        path: Путь к файлу.
+        records: Записи.
+
+    Returns:
+        str: Путь к файлу.
+    """
+    path.write_text("\n".join(json.dumps(record) for record in records))
+    return str(path)
+
+
+async def save_sequences(connection) -> Dict[str, int]:
+    """Сохранение значений последовательностей ID.
+
+    Args:
+        connection (AsyncConnection): соединение с БД.
+
+    Returns:
+        Dict[str, int]: Значения последовательностей.
+    """
+    return {
+        sequence: await connection.scalar(text(
+            "SELECT last_value FROM {sequence}".format(sequence=sequence),
+        ))
+        for sequence, _ in bulk_import.SEQUENCES
+    }
+
+
+async def restore_sequences(connection, sequences: Dict[str, int]) -> None:
+    """Восстановление значений последовательностей ID.
+
+    Сдвиг последовательности не отменяется откатом транзакции теста.
+
+    Args:
+        connection (AsyncConnection): соединение с БД.
+        sequences (Dict[str, int]): Значения последовательностей.
+    """
+    for sequence, last_value in sequences.items():
+        await connection.execute(
+            text("SELECT setval(:sequence, :last_value)"),
+            {"sequence": sequence, "last_value": last_value},
+        )
+
+
+@pytest.mark.asyncio
+async def test_import_files(db_transaction, tmp_path):
+    """Тестирование импорта с пропуском дубликатов, строк без ID и ссылок.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+        tmp_path: Временный каталог.
+    """
+    users = [
+        {"id": FIRST_ID + idx, "name": "user", "api_key": "key{0}".format(idx)}
+        for idx in range(3)
+    ]
+    users.append({"name": "no id", "api_key": "key_no_id"})
+    tweets_csv = tmp_path / "tweets.csv"
+    tweets_csv.write_text(
+        "id,author_id,content,attachments\n"
+        "{0},{1},first,api/medias/1 api/medias/2\n"
+        "{2},{1},second,\n"
+        "{2},{1},duplicate,\n"
+        ",{1},no id,\n"
+        "{3},{4},orphan,\n".format(
+            FIRST_ID,
+            FIRST_ID + 1,
+            FIRST_ID + 1,
+            FIRST_ID + 2,
+            FIRST_ID + 100,
+        ),
+    )
+    likes = [
+        {"tweet_id": FIRST_ID, "user_id": FIRST_ID + 2},
+        {"tweet_id": FIRST_ID, "user_id": FIRST_ID + 2},
+        {"tweet_id": FIRST_ID + 50, "user_id": FIRST_ID},
+    ]
+    paths = {
+        "users": write_jsonl(tmp_path / "users.jsonl", users),
+        "tweets": str(tweets_csv),
+        "likes": write_jsonl(tmp_path / "likes.jsonl", likes),
+    }
+
+    # BEGIN отправляется лениво, без него импорт зафиксируется отдельно
+    await db_transaction.execute(text("SELECT 1"))
+    raw_connection = await db_transaction.get_raw_connection()
+    sequences = await save_sequences(db_transaction)
+    try:
+        stats = await bulk_import.import_files(
+            raw_connection.driver_connection,
+            paths,
+            defer_indexes=True,
+        )
+        next_id = await db_transaction.scalar(
+            text("SELECT nextval('user_id_seq')"),
+        )
+    finally:
+        await restore_sequences(db_transaction, sequences)
+    assert stats["users"].staged == 4
+    assert stats["users"].merged == 6
+    assert stats["users"].without_id == 1
+    assert stats["tweets"].staged == 5
+    assert stats["tweets"].merged == 2
+    assert stats["tweets"].without_id == 1
+    assert stats["likes"].staged == 3
+    assert stats["likes"].merged == 1
+
+    attachments = await db_transaction.scalar(
+        text("SELECT attachments FROM tweets WHERE id = :id"),
+        {"id": FIRST_ID},
+    )
+    assert attachments == ["api/medias/1", "api/medias/2"]
+    assert next_id > FIRST_ID + 2
+    index_count = await db_transaction.scalar(
+        text("SELECT count(*) FROM pg_indexes WHERE indexname = :name"),
+        {"name": "ix_tweets_author_id_id"},
+    )
+    assert index_count == 1
+
+
+@pytest.mark.asyncio
+async def test_partitioned_import_refused(monkeypatch):
+    """Тестирование отказа импортировать твиты в секционированные таблицы.
+
+    Args:
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    monkeypatch.setattr(partitions, "PARTITION_SIZE", 1)
+    args = bulk_import.get_parser().parse_args(["--tweets", "tweets.csv"])
+    with pytest.raises(SystemExit):
+        await bulk_import.main(args)
@@ -1,12 +1,60 @@
 """Тестирование CRUD операций с базой данных."""
 import pytest
-from sqlalchemy import select
+from sqlalchemy import delete, select
 
-from not_twitter.app.database import crud_operations, models
+from not_twitter.app.database import crud_operations, instrumentation, models
 
 pytest_plugins = ("pytest_asyncio",)
 
 
+async def count_queries(operation):
+    """Выполнение операции с подсчетом SQL запросов.
+
+    Args:
+        operation (Awaitable): Операция с БД.
+
+    Returns:
+        Tuple[Any, int]: Результат операции и количество запросов.
+    """
+    token = instrumentation.start_request_stats()
+    try:
+        result = await operation
+        query_count = instrumentation.get_request_stats().query_count
+    finally:
+        instrumentation.finish_request_stats(token)
+    return result, query_count
+
+
+@pytest.mark.asyncio
+async def test_fill_db(session):
+    """Тестирование функции fill_db.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+    """
+    users_data = {"fill_key_1": "Fill_User_1", "fill_key_2": "Fill_User_2"}
+    assert await crud_operations.fill_db(users_data) == len(users_data)
+    assert await crud_operations.fill_db(users_data) == 0
+
+    users_data["fill_key_3"] = "Fill_User_3"
+    assert await crud_operations.fill_db(users_data) == 1
+
+    await session.execute(
+        delete(models.ApiKeyToUser)
+        .where(models.ApiKeyToUser.api_key == "fill_key_1"),
+    )
+    await session.commit()
+    assert await crud_operations.fill_db(users_data) == 1
+
+    query = await session.execute(
+        select(models.User.name)
+        .join(models.ApiKeyToUser, models.ApiKeyToUser.user_id == models.User.id)
+        .where(models.ApiKeyToUser.api_key.in_(list(users_data)))
+        .order_by(models.User.name),
+    )
+    assert query.scalars().all() == sorted(users_data.values())
+
+
 @pytest.mark.asyncio
 async def test_get_user_by_api_key(api_keys):
     """Тестирование функции get_user_by_api_key.
@@ -33,6 +81,50 @@ async def test_get_user_by_id(api_keys):
     assert result.id == user_id
 
 
+@pytest.mark.asyncio
+async def test_user_lookups_query_count(liked_tweets_and_api_keys):
+    """Тестирование количества запросов при получении пользователя.
+
+    Связанные объекты загружаются только явно указанные, твиты
+    пользователя и их лайки не загружаются.
+
+    Args:
+        liked_tweets_and_api_keys (Dict[str, List[base]]): твиты, лайки
+            и api-keys.
+    """
+    api_key = liked_tweets_and_api_keys["api_keys"][0]
+    user, query_count = await count_queries(
+        crud_operations.get_auth_user_by_api_key(api_key.api_key),
+    )
+    assert user.id == api_key.user_id
+    assert query_count == 1
+
+    user, query_count = await count_queries(
+        crud_operations.get_user_by_api_key(api_key.api_key),
+    )
+    assert user.following == []
+    assert query_count == 3
+
+    user, query_count = await count_queries(
+        crud_operations.get_user_by_id(api_key.user_id),
+    )
+    assert user.followers == []
+    assert query_count == 3
+
+
+@pytest.mark.asyncio
+async def test_get_all_tweets_query_count(liked_tweets_and_api_keys):
+    """Тестирование количества запросов при получении всех твитов.
+
+    Args:
+        liked_tweets_and_api_keys (Dict[str, List[base]]): твиты, лайки
+            и api-keys.
+    """
+    tweets, query_count = await count_queries(crud_operations.get_all_tweets())
+    assert all(tweet.author.name and tweet.likes for tweet in tweets)
+    assert query_count == 3
+
+
 @pytest.mark.asyncio
 async def test_create_tweet(session, api_keys):
     """Тестирование функции create_tweet.
@@ -101,6 +193,27 @@ async def test_get_all_tweets(tweets_and_api_keys):
     assert len(result) == len(tweets)
 
 
+@pytest.mark.asyncio
+async def test_get_feed(liked_tweets_and_api_keys):
+    """Тестирование функции get_feed.
+
+    Args:
+        liked_tweets_and_api_keys (Dict[str, List[base]]): твиты и api-keys.
+    """
+    tweets = liked_tweets_and_api_keys["tweets"]
+    api_keys = liked_tweets_and_api_keys["api_keys"]
+    result = await crud_operations.get_feed()
+    assert [tweet.id for tweet in result] == sorted(
+        (tweet.id for tweet in tweets),
+        reverse=True,
+    )
+    assert result[-1].author.id == api_keys[0].user_id
+    assert result[-1].content == tweets[0].content
+    assert [like.user_id for like in result[-1].likes] == [
+        api_keys[1].user_id,
+    ]
+
+
 @pytest.mark.asyncio
 async def test_add_like_by_user_to_tweet(session, tweets_and_api_keys):
     """Тестирование функции add_like_by_user_to_tweet.
@@ -128,7 +241,8 @@ async def test_add_like_by_user_to_tweet(session, tweets_and_api_keys):
     assert count_after - count_before == 1
 
     query = select(models.Like).where(
-        (models.Like.tweet_id == tweet.id and models.Like.user_id == user.id),
+        models.Like.tweet_id == tweet.id,
+        models.Like.user_id == user.id,
     )
     like = await session.execute(query)
     assert isinstance(like.scalar(), models.Like)
@@ -148,6 +262,13 @@ async def test_delete_like_by_user_from_tweet(
     tweet = liked_tweets_and_api_keys["tweets"][0]
     api_keys = liked_tweets_and_api_keys["api_keys"]
     user = await crud_operations.get_user_by_id(api_keys[1].user_id)
+    # Лайк другого пользователя на том же твите должен остаться
+    session.add(models.Like(
+        tweet_id=tweet.id,
+        user_id=api_keys[0].user_id,
+        name="",
+    ))
+    await session.commit()
 
     query = select(models.Like).where(models.Like.tweet_id == tweet.id)
     likes = await session.execute(query)
@@ -164,7 +285,8 @@ async def test_delete_like_by_user_from_tweet(
     assert count_before - count_after == 1
 
     query = select(models.Like).where(
-        (models.Like.tweet_id == tweet.id and models.Like.user_id == user.id),
+        models.Like.tweet_id == tweet.id,
+        models.Like.user_id == user.id,
     )
     like = await session.execute(query)
     assert like.scalar() is None
@@ -0,0 +1,93 @@
+"""Тестирование уведомления запросов ленты о новых твитах."""
+import asyncio
+
+import pytest
+
+from not_twitter.app.database.projections import FeedAuthor, FeedTweet
+from not_twitter.app.utils import route_classes
+from not_twitter.app.utils.feed_notifier import FeedNotifier
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def make_tweet(tweet_id: int) -> FeedTweet:
+    """Создание твита ленты.
+
+    Args:
+        tweet_id (int): ID твита.
+
+    Returns:
+        FeedTweet: Твит ленты.
+    """
+    return FeedTweet(tweet_id, "tweet", [], FeedAuthor(1, "author"), [])
+
+
+def test_classify_long_poll():
+    """Тестирование выделения long-poll запросов ленты."""
+    classify = route_classes.classify_request
+    assert classify("GET", "/api/tweets", b"since_id=1&wait=5") == (
+        route_classes.LONG_POLL
+    )
+    assert classify("GET", "/api/tweets", b"since_id=1&wait=0") == (
+        route_classes.FEED
+    )
+    assert classify("GET", "/api/tweets", b"wait=x") == route_classes.FEED
+
+
+@pytest.mark.asyncio
+async def test_long_poll_wakes_on_publish():
+    """Тестирование пробуждения ожидающих запросов новым твитом."""
+    notifier = FeedNotifier()
+    assert notifier.has_newer(10)
+    notifier.observe(10)
+    assert not notifier.has_newer(10)
+    assert not await notifier.wait_for_newer(10, 0.01)
+
+    waiting = [
+        asyncio.create_task(notifier.wait_for_newer(10, 5))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    notifier.publish(11)
+    assert await asyncio.gather(*waiting) == [True, True, True]
+    assert notifier.latest_id == 11
+
+
+@pytest.mark.asyncio
+async def test_incomplete_notifier_skips_bound():
+    """Тестирование отказа от границы без событий всех процессов."""
+    notifier = FeedNotifier()
+    notifier.observe(10)
+    waiting = asyncio.create_task(notifier.wait_for_newer(10, 5))
+    await asyncio.sleep(0)
+    notifier.set_complete(False)
+    assert await waiting
+    assert notifier.latest_id is None
+    notifier.observe(10)
+    assert notifier.has_newer(10)
+    assert await notifier.wait_for_newer(10, 5)
+
+    notifier.set_complete(True)
+    notifier.observe(10)
+    assert not notifier.has_newer(10)
+    notifier.invalidate()
+    assert notifier.has_newer(10)
+
+
+@pytest.mark.asyncio
+async def test_fetch_coalesces_queries():
+    """Тестирование общего запроса к БД для одинакового since_id."""
+    notifier = FeedNotifier()
+    calls = []
+
+    async def loader(since_id: int):
+        calls.append(since_id)
+        await asyncio.sleep(0.01)
+        return [make_tweet(12), make_tweet(11)]
+
+    results = await asyncio.gather(
+        *(notifier.fetch(10, loader) for _ in range(5)),
+    )
+    assert calls == [10]
+    assert all(len(tweets) == 2 for tweets in results)
+    assert notifier.latest_id == 12
@@ -0,0 +1,53 @@
+"""Тестирование инструментирования SQL запросов."""
+import logging
+
+import pytest
+
+from not_twitter.app.database import crud_operations, instrumentation
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_request_stats_count_queries(api_keys):
+    """Тестирование подсчета SQL запросов в рамках контекста.
+
+    Args:
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    assert instrumentation.get_request_stats() is None
+
+    token = instrumentation.start_request_stats()
+    try:
+        await crud_operations.get_user_by_id(api_keys[0].user_id)
+        stats = instrumentation.get_request_stats()
+    finally:
+        instrumentation.finish_request_stats(token)
+
+    assert stats.query_count > 0
+    assert stats.db_time > 0
+    assert instrumentation.get_request_stats() is None
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log_redacts_parameters(monkeypatch, caplog, api_keys):
+    """Тестирование лога медленных запросов без значений параметров.
+
+    Args:
+        monkeypatch (MonkeyPatch): фикстура подмены атрибутов.
+        caplog (LogCaptureFixture): фикстура перехвата логов.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    monkeypatch.setattr(instrumentation, "SLOW_QUERY_THRESHOLD", 0)
+    api_key = api_keys[0].api_key
+
+    with caplog.at_level(logging.WARNING, logger="not_twitter.sql"):
+        await crud_operations.get_user_by_api_key(api_key)
+
+    slow_queries = [
+        record.getMessage()
+        for record in caplog.records
+        if record.name == "not_twitter.sql"
+    ]
+    assert slow_queries
+    assert all(api_key not in message for message in slow_queries)
@@ -0,0 +1,158 @@
+"""Тестирование отложенной записи лайков пачками."""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from not_twitter.app.database import crud_operations, like_buffer, models
+from not_twitter.app.utils import stream_hub
+
+pytest_plugins = ("pytest_asyncio",)
+
+MISSING_TWEET_ID = 1
+
+
+async def get_likes(session):
+    """Получение пар ID твита и пользователя всех лайков.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+
+    Returns:
+        Set[Tuple[int, int]]: Пары ID твита и пользователя.
+    """
+    query = await session.execute(
+        select(models.Like.tweet_id, models.Like.user_id),
+    )
+    return set(query.all())
+
+
+@pytest.mark.asyncio
+async def test_flush_coalesces_likes(session, tweets_and_api_keys, monkeypatch):
+    """Тестирование схлопывания и записи лайков пачкой.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    events = []
+    monkeypatch.setattr(stream_hub.hub, "publish", events.append)
+    tweets = tweets_and_api_keys["tweets"]
+    user_ids = [key.user_id for key in tweets_and_api_keys["api_keys"]]
+    buffer = like_buffer.LikeBuffer(flush_interval=60, durable=False)
+    buffer.start()
+
+    await buffer.put(tweets[0].id, user_ids[1], True, "user")
+    await buffer.put(tweets[1].id, user_ids[0], True, "user")
+    await buffer.put(tweets[1].id, user_ids[0], False)
+    await buffer.put(MISSING_TWEET_ID, user_ids[0], True, "user")
+    assert await get_likes(session) == set()
+    assert await buffer.flush() == 3
+    assert await get_likes(session) == {(tweets[0].id, user_ids[1])}
+    assert [event["type"] for event in events] == [stream_hub.EVENT_LIKE]
+
+    await buffer.put(tweets[0].id, user_ids[1], True, "user")
+    assert await buffer.flush() == 1
+    assert len(events) == 1
+
+    await buffer.put(tweets[0].id, user_ids[1], False)
+    await buffer.stop()
+    assert not buffer.running
+    assert await get_likes(session) == set()
+    assert events[-1]["type"] == stream_hub.EVENT_UNLIKE
+
+
+@pytest.mark.asyncio
+async def test_durable_likes(session, tweets_and_api_keys, monkeypatch):
+    """Тестирование ожидания записи пачки лайками из crud_operations.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    tweets = tweets_and_api_keys["tweets"]
+    users = [
+        await crud_operations.get_user_by_id(key.user_id)
+        for key in tweets_and_api_keys["api_keys"]
+    ]
+    buffer = like_buffer.LikeBuffer(flush_interval=60, max_entries=2)
+    monkeypatch.setattr(like_buffer, "buffer", buffer)
+    buffer.start()
+
+    await asyncio.wait_for(asyncio.gather(
+        crud_operations.add_like_by_user_to_tweet(users[1], tweets[0]),
+        crud_operations.add_like_by_user_to_tweet(users[0], tweets[1]),
+    ), timeout=5)
+    assert await get_likes(session) == {
+        (tweets[0].id, users[1].id),
+        (tweets[1].id, users[0].id),
+    }
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_error_keeps_buffer(session, tweets_and_api_keys, monkeypatch):
+    """Тестирование ошибки записи без остановки записи в фоне.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    tweets = tweets_and_api_keys["tweets"]
+    user_id = tweets_and_api_keys["api_keys"][0].user_id
+    buffer = like_buffer.LikeBuffer(flush_interval=60, max_entries=1)
+    write = buffer._write  # noqa: WPS437
+    errors = [PoolTimeoutError("pool exhausted")]
+
+    async def failing_write(shard, entries):
+        if errors:
+            raise errors.pop()
+        await write(shard, entries)
+
+    monkeypatch.setattr(buffer, "_write", failing_write)
+    buffer.start()
+    with pytest.raises(PoolTimeoutError):
+        await asyncio.wait_for(
+            buffer.put(tweets[0].id, user_id, True, "user"),
+            timeout=5,
+        )
+    await asyncio.wait_for(
+        buffer.put(tweets[0].id, user_id, True, "user"),
+        timeout=5,
+    )
+    assert buffer.running
+    assert await get_likes(session) == {(tweets[0].id, user_id)}
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_late_likes(session, tweets_and_api_keys, monkeypatch):
+    """Тестирование записи лайков, добавленных во время последней записи.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    tweets = tweets_and_api_keys["tweets"]
+    user_id = tweets_and_api_keys["api_keys"][0].user_id
+    buffer = like_buffer.LikeBuffer(flush_interval=60, durable=False)
+    write = buffer._write  # noqa: WPS437
+
+    async def write_and_put(shard, entries):
+        await write(shard, entries)
+        if (tweets[1].id, user_id) not in entries:
+            await buffer.put(tweets[1].id, user_id, True, "user")
+
+    monkeypatch.setattr(buffer, "_write", write_and_put)
+    buffer.start()
+    await buffer.put(tweets[0].id, user_id, True, "user")
+    await buffer.stop()
+    assert await get_likes(session) == {
+        (tweets[0].id, user_id),
+        (tweets[1].id, user_id),
+    }
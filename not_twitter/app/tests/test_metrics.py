@@ -0,0 +1,24 @@
+"""Тестирование метрик приложения."""
+from not_twitter.app.utils import metrics
+
+
+def test_histogram_render():
+    """Тестирование выгрузки гистограммы в формате Prometheus."""
+    histogram = metrics.Histogram(
+        "test_duration_seconds",
+        "Test histogram.",
+        ("route",),
+        buckets=(0.1, 1),
+    )
+    child = histogram.labels("/api/tweets")
+    child.observe(0.05)
+    child.observe(0.5)
+    child.observe(5)
+
+    lines = list(histogram.render())
+
+    assert "# TYPE test_duration_seconds histogram" in lines
+    assert 'test_duration_seconds_bucket{route="/api/tweets",le="0.1"} 1' in lines
+    assert 'test_duration_seconds_bucket{route="/api/tweets",le="1.0"} 2' in lines
+    assert 'test_duration_seconds_bucket{route="/api/tweets",le="+Inf"} 3' in lines
+    assert 'test_duration_seconds_count{route="/api/tweets"} 3' in lines
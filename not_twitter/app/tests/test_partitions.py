@@ -0,0 +1,151 @@
+"""Тестирование секционирования таблиц твитов и лайков."""
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from not_twitter.app.database import (
+    crud_operations,
+    models,
+    partitions,
+    snowflake,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+pytestmark = pytest.mark.skipif(
+    not partitions.PARTITION_SIZE,
+    reason="Таблицы не секционированы",
+)
+
+FAR_OFFSET = 50
+
+
+def get_index(tweet_id: int) -> int:
+    """Номер секции твита.
+
+    Args:
+        tweet_id (int): ID твита.
+
+    Returns:
+        int: Номер секции.
+    """
+    return tweet_id // partitions.PARTITION_SIZE
+
+
+def get_far_index() -> int:
+    """Номер секции далеко впереди текущего времени.
+
+    Returns:
+        int: Номер секции.
+    """
+    return get_index(snowflake.get_min_id(time.time())) + FAR_OFFSET
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions(db_transaction, api_keys):
+    """Тестирование создания секций впереди текущего ID твита.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    far_index = get_far_index()
+    assert await partitions.create_partitions(
+        db_transaction,
+        [far_index],
+    ) == [far_index]
+    await db_transaction.execute(
+        text(
+            "INSERT INTO tweets (id, content, author_id) "
+            "VALUES (:id, '', :author_id)",
+        ),
+        {
+            "id": far_index * partitions.PARTITION_SIZE,
+            "author_id": api_keys[0].user_id,
+        },
+    )
+
+    created = await partitions.ensure_partitions(db_transaction, ahead=2)
+    assert created == [far_index + 1, far_index + 2]
+    for table in partitions.TABLES:
+        attached = await partitions.get_attached_indexes(
+            db_transaction,
+            table.name,
+        )
+        assert {far_index, far_index + 1, far_index + 2} <= attached
+
+
+@pytest.mark.asyncio
+async def test_detach_partitions(
+    db_transaction,
+    session,
+    liked_tweets_and_api_keys,
+    media,
+):
+    """Тестирование отсоединения старых секций.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+        session (AsyncSession): сессия для работы с БД.
+        liked_tweets_and_api_keys (Dict[str, List[base]]): твиты и api-keys.
+        media (Media): тестовое медиа.
+    """
+    old_tweet = liked_tweets_and_api_keys["tweets"][0]
+    media.tweet_id = old_tweet.id
+    await session.commit()
+    old_index = get_index(old_tweet.id)
+    far_index = get_far_index()
+    await partitions.create_partitions(db_transaction, [far_index])
+    new_tweet = models.Tweet(
+        id=far_index * partitions.PARTITION_SIZE,
+        content="new",
+        author_id=old_tweet.author_id,
+    )
+    session.add(new_tweet)
+    await session.commit()
+
+    detached = await partitions.detach_partitions(db_transaction, retained=1)
+    assert old_index in detached
+    assert far_index not in detached
+
+    feed = await crud_operations.get_feed()
+    assert [tweet.id for tweet in feed] == [new_tweet.id]
+    assert await crud_operations.get_media_by_id(media.id)
+    media_tweet_id = await db_transaction.scalar(
+        text("SELECT tweet_id FROM medias WHERE id = :id"),
+        {"id": media.id},
+    )
+    assert media_tweet_id is None
+    detached_likes = await db_transaction.scalar(
+        text("SELECT count(*) FROM likes_p{index}".format(index=old_index)),
+    )
+    assert detached_likes == 2
+
+
+@pytest.mark.asyncio
+async def test_feed_query_prunes_partitions(db_transaction):
+    """Тестирование чтения ленты с since_id только из новых секций.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+    """
+    current_index = await partitions.get_current_index(db_transaction)
+    far_index = get_far_index()
+    await partitions.create_partitions(db_transaction, [far_index])
+    statement = crud_operations._feed_query(
+        far_index * partitions.PARTITION_SIZE,
+    )
+    compiled = statement.compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True},
+    )
+    query = await db_transaction.execute(
+        text("EXPLAIN {query}".format(query=compiled)),
+    )
+    plan = "\n".join(query.scalars())
+    assert "tweets_p{index}".format(index=far_index) in plan
+    assert "likes_p{index}".format(index=far_index) in plan
+    for table in partitions.TABLES:
+        current = partitions.get_partition_name(table.name, current_index)
+        assert current not in plan
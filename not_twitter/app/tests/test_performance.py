@@ -0,0 +1,263 @@
+"""Регрессионные тесты количества SQL запросов и памяти эндпоинтов.
+
+Тесты выполняются на синтетическом социальном графе, поэтому жадная
+загрузка связей, добавленная в ORM модели, увеличивает количество
+запросов и проваливает тест.
+"""
+import re
+import tracemalloc
+from typing import Dict
+
+import pytest
+from fastapi import status
+
+from not_twitter.app.benchmarks import social_graph
+from not_twitter.app.database.database import engine
+
+SCALE = social_graph.GraphScale(users=100, tweets=500, likes=3000, medias=20)
+QUERY_COUNT_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+# Допустимое количество SQL запросов на один вызов эндпоинта. Записи
+# твитов и лайков включают NOTIFY для потока событий других процессов.
+QUERY_BUDGETS = {
+    "get_tweets": 2,
+    "post_tweet": 3,
+    "post_tweet_with_media": 5,
+    "delete_tweet": 5,
+    "like_tweet": 5,
+    "unlike_tweet": 5,
+    "get_users_me": 3,
+    "get_user_profile": 4,
+    "follow_user": 5,
+    "unfollow_user": 5,
+    "upload_media": 2,
+    "download_media": 1,
+    "poll_tweets_unchanged": 1,
+}
+
+# Допустимая пиковая память на один твит ленты, байт
+FEED_PEAK_BYTES_PER_TWEET = 16 * 1024
+
+
+@pytest.fixture(scope="module")
+def graph(event_loop):
+    """Синтетический социальный граф.
+
+    Args:
+        event_loop: event loop.
+
+    Yields:
+        graph (SeededGraph): ID загруженных сущностей.
+    """
+    yield event_loop.run_until_complete(
+        social_graph.seed_graph(engine, SCALE),
+    )
+    event_loop.run_until_complete(social_graph.cleanup_graph(engine))
+
+
+def get_headers(graph: social_graph.SeededGraph, idx: int) -> Dict[str, str]:
+    """Получение хэдеров с api-key пользователя графа.
+
+    Args:
+        graph (SeededGraph): ID загруженных сущностей.
+        idx (int): Порядковый номер пользователя.
+
+    Returns:
+        headers (Dict[str, str]): словарь хэдеров.
+    """
+    return {"api-key": graph.api_keys[idx]}
+
+
+def get_query_count(response) -> int:
+    """Получение количества SQL запросов из хэдера Server-Timing.
+
+    Args:
+        response (Response): ответ тестового клиента.
+
+    Returns:
+        int: Количество SQL запросов.
+    """
+    match = QUERY_COUNT_PATTERN.search(response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+def assert_within_budget(response, endpoint: str) -> None:
+    """Проверка количества SQL запросов эндпоинта.
+
+    Args:
+        response (Response): ответ тестового клиента.
+        endpoint (str): Имя эндпоинта в QUERY_BUDGETS.
+    """
+    assert response.status_code < status.HTTP_400_BAD_REQUEST
+    query_count = get_query_count(response)
+    assert query_count <= QUERY_BUDGETS[endpoint], (
+        "{endpoint} executed {count} SQL statements, budget is {budget}".format(
+            endpoint=endpoint,
+            count=query_count,
+            budget=QUERY_BUDGETS[endpoint],
+        )
+    )
+
+
+def post_tweet(client, graph, author_idx: int = 0) -> int:
+    """Создание твита пользователем графа.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        graph (SeededGraph): ID загруженных сущностей.
+        author_idx (int): Порядковый номер автора.
+
+    Returns:
+        int: ID созданного твита.
+    """
+    response = client.post(
+        "/api/tweets",
+        headers=get_headers(graph, author_idx),
+        json={"tweet_data": "budget", "tweet_media_ids": []},
+    )
+    assert_within_budget(response, "post_tweet")
+    return response.json()["tweet_id"]
+
+
+def test_get_tweets_budget(client, graph):
+    """Лента выполняет фиксированное число запросов при любом числе лайков.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        graph (SeededGraph): ID загруженных сущностей.
+    """
+    response = client.get("/api/tweets", headers=get_headers(graph, 1))
+    assert_within_budget(response, "get_tweets")
+    query_count = get_query_count(response)
+
+    tweet_id = post_tweet(client, graph)
+    for idx in range(1, 20):
+        client.post(
+            "/api/tweets/{id}/likes".format(id=tweet_id),
+            headers=get_headers(graph, idx),
+        )
+
+    response = client.get("/api/tweets", headers=get_headers(graph, 1))
+    assert get_query_count(response) == query_count
+
+
+def test_poll_tweets_budget(client, graph):
+    """Опрос ленты без новых твитов выполняет только проверку api-key.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        graph (SeededGraph): ID загруженных сущностей.
+    """
+    response = client.get("/api/tweets", headers=get_headers(graph, 1))
+    latest_id = response.json()["tweets"][0]["id"]
+
+    response = client.get(
+        "/api/tweets",
+        headers=get_headers(graph, 1),
+        params={"since_id": latest_id},
+    )
+    assert response.json()["tweets"] == []
+    assert_within_budget(response, "poll_tweets_unchanged")
+
+
+def test_tweet_budgets(client, graph):
+    """Создание и удаление твита с медиа.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        graph (SeededGraph): ID загруженных сущностей.
+    """
+    headers = get_headers(graph, 2)
+    response = client.post(
+        "/api/medias",
+        headers=headers,
+        files={"file": ("budget.png", b"budget")},
+    )
+    assert_within_budget(response, "upload_media")
+    media_id = response.json()["media_id"]
+
+    response = client.get("/api/medias/{id}".format(id=media_id))
+    assert_within_budget(response, "download_media")
+
+    response = client.post(
+        "/api/tweets",
+        headers=headers,
+        json={"tweet_data": "budget", "tweet_media_ids": [media_id]},
+    )
+    assert_within_budget(response, "post_tweet_with_media")
+
+    response = client.delete(
+        "/api/tweets/{id}".format(id=response.json()["tweet_id"]),
+        headers=headers,
+    )
+    assert_within_budget(response, "delete_tweet")
+
+
+def test_like_budgets(client, graph):
+    """Лайк и снятие лайка.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        graph (SeededGraph): ID загруженных сущностей.
+    """
+    url = "/api/tweets/{id}/likes".format(id=post_tweet(client, graph))
+    headers = get_headers(graph, 3)
+
+    assert_within_budget(client.post(url, headers=headers), "like_tweet")
+    assert_within_budget(client.delete(url, headers=headers), "unlike_tweet")
+
+
+def test_user_budgets(client, graph):
+    """Профили пользователей, подписка и отписка.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        graph (SeededGraph): ID загруженных сущностей.
+    """
+    headers = get_headers(graph, 4)
+    # Первый пользователь графа самый популярный
+    popular_user_id = graph.user_ids[0]
+    least_popular_user_id = graph.user_ids[-1]
+
+    response = client.get("/api/users/me", headers=headers)
+    assert_within_budget(response, "get_users_me")
+
+    response = client.get(
+        "/api/users/{id}".format(id=popular_user_id),
+        headers=headers,
+    )
+    assert_within_budget(response, "get_user_profile")
+
+    response = client.delete(
+        "/api/users/{id}/follow".format(id=least_popular_user_id),
+        headers=headers,
+    )
+    assert_within_budget(response, "follow_user")
+
+    response = client.delete(
+        "/api/tweets/{id}/follow".format(id=least_popular_user_id),
+        headers=headers,
+    )
+    assert_within_budget(response, "unfollow_user")
+
+
+def test_get_tweets_peak_memory(client, graph):
+    """Пиковая память ленты ограничена на один твит.
+
+    Args:
+        client (TestClient): тестовый клиент FastAPI.
+        graph (SeededGraph): ID загруженных сущностей.
+    """
+    headers = get_headers(graph, 5)
+    client.get("/api/tweets", headers=headers)
+
+    tracemalloc.start()
+    try:
+        response = client.get("/api/tweets", headers=headers)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tweets_count = len(response.json()["tweets"])
+    assert tweets_count >= SCALE.tweets
+    assert peak_bytes / tweets_count <= FEED_PEAK_BYTES_PER_TWEET
@@ -0,0 +1,50 @@
+"""Тестирование статистического профайлера."""
+import asyncio
+import time
+
+import pytest
+
+from not_twitter.app.utils.profiling import MODE_ASYNC, SamplingProfiler
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def busy_wait(seconds: float) -> None:
+    """Загрузка CPU на заданное время.
+
+    Args:
+        seconds (float): Время работы.
+    """
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass  # noqa: WPS420
+
+
+@pytest.mark.asyncio
+async def test_profiler_samples_only_tracked_tasks():
+    """Тестирование сэмплирования только отмеченных задач."""
+    profiler = SamplingProfiler()
+    profiler.start(sample_rate=1, duration=5, interval=0.001, mode=MODE_ASYNC)
+
+    async def sampled_request():
+        task = asyncio.current_task()
+        profiler.track(task)
+        busy_wait(0.1)
+        profiler.untrack(task, wall_time=0.1, db_time=0)
+
+    async def other_request():
+        busy_wait(0.1)
+
+    await asyncio.gather(sampled_request(), other_request())
+    profiler.stop()
+
+    folded = profiler.get_folded_stacks()
+    assert profiler.sampled_requests == 1
+    assert profiler.samples > 0
+    assert "busy_wait" in folded
+    assert "sampled_request" in folded
+    assert "other_request" not in folded
+
+    breakdown = profiler.get_breakdown()
+    assert breakdown["wall"] == pytest.approx(0.1)
+    assert breakdown["cpu_endpoint"] > 0
@@ -0,0 +1,173 @@
+"""Тестирование ограничения частоты запросов."""
+from collections import OrderedDict
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from not_twitter.app.database import crud_operations, database
+from not_twitter.app.utils import api_key_ckecker
+from not_twitter.app.utils.rate_limit import (
+    EVICTION_INTERVAL,
+    UNKNOWN_KEY,
+    MemoryBackend,
+    PostgresBackend,
+    RateLimit,
+    RateLimiter,
+    parse_limits,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+
+LIMIT = RateLimit(rate=2, burst=3)
+
+
+class FakeClock:
+    """Управляемый источник времени."""
+
+    def __init__(self) -> None:
+        """Создание часов на нулевой секунде."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Текущее время.
+
+        Returns:
+            float: Время в секундах.
+        """
+        return self.now
+
+
+def test_parse_limits():
+    """Тестирование разбора строки лимитов."""
+    assert parse_limits("feed=5:20, write=0.5:2") == {
+        "feed": RateLimit(5, 20),
+        "write": RateLimit(0.5, 2),
+    }
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_refills_tokens():
+    """Тестирование расхода и пополнения токенов в памяти."""
+    clock = FakeClock()
+    backend = MemoryBackend(clock)
+    for _ in range(int(LIMIT.burst)):
+        assert await backend.consume("feed", "key", LIMIT) == 0
+    assert await backend.consume("feed", "key", LIMIT) == pytest.approx(0.5)
+    assert await backend.consume("feed", "other_key", LIMIT) == 0
+
+    clock.now = 0.5
+    assert await backend.consume("feed", "key", LIMIT) == 0
+    assert await backend.consume("feed", "key", LIMIT) > 0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_full_buckets():
+    """Тестирование удаления заполнившихся корзин."""
+    clock = FakeClock()
+    backend = MemoryBackend(clock)
+    await backend.consume("feed", "idle_key", LIMIT)
+    for _ in range(int(LIMIT.burst) + 1):
+        await backend.consume("feed", "busy_key", LIMIT)
+
+    clock.now = EVICTION_INTERVAL - 1
+    await backend.consume("write", "busy_key", RateLimit(rate=0.001, burst=2))
+    clock.now = EVICTION_INTERVAL
+    backend.evict(clock.now)
+    assert list(backend.buckets) == [("write", "busy_key")]
+
+
+@pytest.mark.asyncio
+async def test_postgres_backend():
+    """Тестирование общего хранилища корзин в PostgreSQL."""
+    backend = PostgresBackend()
+    limit = RateLimit(rate=0.001, burst=2)
+    assert await backend.consume("feed", "key", limit) == 0
+    assert await backend.consume("feed", "key", limit) == 0
+    assert await backend.consume("feed", "key", limit) > 0
+    assert await backend.consume("write", "key", limit) == 0
+
+
+@pytest.mark.asyncio
+async def test_postgres_backend_takes_batches(monkeypatch):
+    """Тестирование получения токенов из БД пачками.
+
+    Args:
+        monkeypatch (MonkeyPatch): Подмена атрибутов.
+    """
+    take_tokens = crud_operations.take_rate_limit_tokens
+    calls = []
+
+    async def counted_take_tokens(*args):
+        calls.append(args)
+        return await take_tokens(*args)
+
+    monkeypatch.setattr(
+        crud_operations,
+        "take_rate_limit_tokens",
+        counted_take_tokens,
+    )
+    clock = FakeClock()
+    backend = PostgresBackend(batch=3, clock=clock)
+    limit = RateLimit(rate=0.001, burst=4)
+    for _ in range(4):
+        assert await backend.consume("feed", "key", limit) == 0
+    assert await backend.consume("feed", "key", limit) > 0
+    assert len(calls) == 3
+
+    await backend.consume("read", "key", limit)
+    clock.now = EVICTION_INTERVAL
+    backend.evict(clock.now)
+    assert not backend.leases
+
+
+@pytest.mark.asyncio
+async def test_postgres_backend_falls_back_to_memory(monkeypatch):
+    """Тестирование корзин в памяти при недоступной БД.
+
+    Args:
+        monkeypatch (MonkeyPatch): Подмена атрибутов.
+    """
+    async def failing_take_tokens(*args):
+        raise PoolTimeoutError("pool exhausted")
+
+    monkeypatch.setattr(
+        crud_operations,
+        "take_rate_limit_tokens",
+        failing_take_tokens,
+    )
+    backend = PostgresBackend()
+    limit = RateLimit(rate=0.001, burst=1)
+    assert await backend.consume("feed", "key", limit) == 0
+    assert await backend.consume("feed", "key", limit) > 0
+
+    monkeypatch.setattr(database, "is_pool_exhausted", lambda: True)
+    monkeypatch.setattr(crud_operations, "take_rate_limit_tokens", None)
+    assert await backend.consume("write", "key", limit) == 0
+    assert list(backend.fallback.buckets) == [("feed", "key"), ("write", "key")]
+
+
+@pytest.mark.asyncio
+async def test_unknown_keys_share_bucket(monkeypatch):
+    """Тестирование общей корзины еще не найденных по БД api-key.
+
+    Args:
+        monkeypatch (MonkeyPatch): Подмена атрибутов.
+    """
+    monkeypatch.setattr(
+        api_key_ckecker,
+        "known_users",
+        OrderedDict(known_key=None),
+    )
+    backend = MemoryBackend(FakeClock())
+    limiter = RateLimiter(
+        backend,
+        {"feed": RateLimit(rate=0.001, burst=1)},
+        unknown_keys_scale=2,
+    )
+    assert await limiter.check("feed", "fake_key_1") == 0
+    assert await limiter.check("feed", "fake_key_2") == 0
+    assert await limiter.check("feed", "fake_key_3") > 0
+    assert await limiter.check("feed", "known_key") == 0
+    assert await limiter.check("write", "fake_key_4") == 0
+    assert ("feed", "fake_key_3") not in backend.buckets
+    assert ("feed", UNKNOWN_KEY) in backend.buckets
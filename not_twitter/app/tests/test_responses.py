@@ -0,0 +1,39 @@
+"""Тестирование готовых стандартных ответов."""
+import json
+
+from fastapi import status
+
+from not_twitter.app.utils import standard_responses
+
+
+def test_success_response():
+    """Тестирование готового ответа для статуса 200."""
+    response = standard_responses.get_success_response()
+    assert response.status_code == status.HTTP_200_OK
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"result": True}
+
+
+def test_unauthorized_response():
+    """Тестирование готового ответа для статуса 401."""
+    response = standard_responses.get_unauthorized_response()
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    res_json = json.loads(response.body)
+    assert not res_json.get("result")
+    assert res_json.get("error_type") == "Authentication error"
+
+
+def test_error_responses_escape_message():
+    """Тестирование сборки ответов об ошибках с произвольным сообщением."""
+    message = 'Сообщение с "кавычками"'
+    not_found = standard_responses.get_not_found_response(message)
+    forbidden = standard_responses.get_forbidden_response(message)
+
+    assert not_found.status_code == status.HTTP_404_NOT_FOUND
+    assert json.loads(not_found.body) == {
+        "result": False,
+        "error_type": "Not found error",
+        "error_message": message,
+    }
+    assert forbidden.status_code == status.HTTP_403_FORBIDDEN
+    assert json.loads(forbidden.body)["error_message"] == message
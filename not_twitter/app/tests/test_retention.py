@@ -0,0 +1,54 @@
+"""Тестирование переноса старых твитов в архив."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from not_twitter.app.database import crud_operations, retention
+from not_twitter.app.utils.archive import ArchiveStore
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_archive_batch(
+    db_transaction,
+    session,
+    liked_tweets_and_api_keys,
+    media,
+    tmp_path,
+):
+    """Тестирование переноса твита с лайками и медиа в архив.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+        session (AsyncSession): сессия для работы с БД.
+        liked_tweets_and_api_keys (Dict[str, List[base]]): твиты и api-keys.
+        media (Media): тестовое медиа.
+        tmp_path: Временный каталог.
+    """
+    old_tweet, new_tweet = liked_tweets_and_api_keys["tweets"]
+    media.tweet_id = old_tweet.id
+    await session.commit()
+    await db_transaction.execute(
+        text(
+            "UPDATE tweets SET created_at = now() - interval '30 days' "
+            "WHERE id = :id",
+        ),
+        {"id": old_tweet.id},
+    )
+    archive = ArchiveStore(str(tmp_path))
+    cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+
+    assert await retention.archive_batch(db_transaction, cutoff, archive) == 1
+    assert await retention.archive_batch(db_transaction, cutoff, archive) == 0
+
+    assert await crud_operations.get_tweet_by_id(old_tweet.id) is None
+    assert await crud_operations.get_tweet_by_id(new_tweet.id)
+    assert await crud_operations.get_media_by_id(media.id)
+    record = archive.find(old_tweet.id)
+    assert record["content"] == old_tweet.content
+    assert record["author"]["id"] == old_tweet.author_id
+    assert len(record["likes"]) == 1
+    assert record["medias"] == [{"id": media.id, "size": len(b"test_media")}]
+    assert archive.find(new_tweet.id) is None
@@ -0,0 +1,121 @@
+"""Тестирование обновления схемы БД предыдущих версий."""
+import pytest
+from sqlalchemy import text
+
+from not_twitter.app.database import partitions, schema_upgrade
+
+pytest_plugins = ("pytest_asyncio",)
+
+UPGRADED_INDEXES = (
+    "ix_tweets_created_at",
+    "ix_tweets_author_id_id",
+    "ix_likes_user_id_tweet_id",
+)
+COLUMN_QUERY = text(
+    """
+    SELECT data_type, is_nullable FROM information_schema.columns
+    WHERE table_name = :table AND column_name = :column
+    """,
+)
+
+
+@pytest.mark.asyncio
+async def test_upgrade_adds_created_at(db_transaction):
+    """Тестирование добавления времени создания твитов и индексов.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+    """
+    await db_transaction.execute(text(
+        "ALTER TABLE tweets DROP COLUMN created_at",
+    ))
+    for index in UPGRADED_INDEXES[1:]:
+        await db_transaction.execute(text(
+            "DROP INDEX {index}".format(index=index),
+        ))
+    for _ in range(2):
+        await schema_upgrade.upgrade_schema(db_transaction)
+
+    query = await db_transaction.execute(
+        COLUMN_QUERY,
+        {"table": "tweets", "column": "created_at"},
+    )
+    assert query.all() == [("timestamp with time zone", "NO")]
+    for index in UPGRADED_INDEXES:
+        assert await db_transaction.scalar(
+            text("SELECT to_regclass(:index) IS NOT NULL"),
+            {"index": index},
+        )
+
+
+@pytest.mark.asyncio
+async def test_upgrade_widens_media_ids(db_transaction):
+    """Тестирование расширения ID медиа из последовательности до bigint.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+    """
+    await db_transaction.execute(text("CREATE SEQUENCE media_id_seq"))
+    await db_transaction.execute(text(
+        """
+        ALTER TABLE medias ALTER COLUMN id TYPE integer,
+        ALTER COLUMN id SET DEFAULT nextval('media_id_seq'),
+        ALTER COLUMN tweet_id TYPE integer
+        """,
+    ))
+    await schema_upgrade.upgrade_schema(db_transaction)
+
+    for column in ("id", "tweet_id"):
+        query = await db_transaction.execute(
+            COLUMN_QUERY,
+            {"table": "medias", "column": column},
+        )
+        assert query.first().data_type == "bigint"
+    assert await db_transaction.scalar(text(
+        "SELECT to_regclass('media_id_seq') IS NULL",
+    ))
+    assert await db_transaction.scalar(text(
+        """
+        SELECT column_default IS NULL FROM information_schema.columns
+        WHERE table_name = 'medias' AND column_name = 'id'
+        """,
+    ))
+    assert not await schema_upgrade.widen_id_column(
+        db_transaction,
+        schema_upgrade.IdColumn("medias", "id", "media_id_seq"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_upgrade_rejects_integer_partition_key(db_transaction):
+    """Тестирование ошибки для ключа секционирования integer.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+    """
+    await db_transaction.execute(text(
+        "CREATE TABLE old_tweets (id integer) PARTITION BY RANGE (id)",
+    ))
+    with pytest.raises(RuntimeError):
+        await schema_upgrade.widen_id_column(
+            db_transaction,
+            schema_upgrade.IdColumn("old_tweets", "id"),
+        )
+
+
+@pytest.mark.asyncio
+async def test_upgrade_checks_partitioning(db_transaction, monkeypatch):
+    """Тестирование ошибки при несовпадении режима секционирования.
+
+    Args:
+        db_transaction (AsyncConnection): соединение с транзакцией теста.
+        monkeypatch (MonkeyPatch): Подмена настроек.
+    """
+    await schema_upgrade.upgrade_schema(db_transaction)
+    monkeypatch.setattr(
+        partitions,
+        "PARTITION_SIZE",
+        0 if partitions.PARTITION_SIZE else 1,
+    )
+    with pytest.raises(RuntimeError):
+        await schema_upgrade.upgrade_schema(db_transaction)
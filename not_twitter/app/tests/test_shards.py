@@ -0,0 +1,88 @@
+"""Тестирование распределения твитов, лайков и медиа по шардам."""
+import pytest
+from sqlalchemy import text
+
+from not_twitter.app.database import crud_operations, shards, task_queue
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+async def make_stream(partitions):
+    """Поток пачек строк из списка пачек.
+
+    Args:
+        partitions: Пачки строк.
+
+    Yields:
+        Пачка строк.
+    """
+    for partition in partitions:
+        yield partition
+
+
+@pytest.mark.asyncio
+async def test_merge_streams():
+    """Тестирование слияния отсортированных потоков пачек."""
+    streams = [
+        make_stream([[1, 4], [9]]),
+        make_stream([]),
+        make_stream([[2, 3, 10]]),
+    ]
+    merged = [
+        batch
+        async for batch in shards.merge_streams(streams, lambda row: row, 2)
+    ]
+    assert merged == [[1, 2], [3, 4], [9, 10]]
+
+
+@pytest.mark.asyncio
+async def test_sharded_crud(second_shard, api_keys):
+    """Тестирование записи по шарду автора и слияния чтений.
+
+    Args:
+        second_shard (AsyncConnection): соединение с транзакцией на шарде.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+    """
+    assert await shards.copy_users() >= len(api_keys)
+    users = [
+        await crud_operations.get_user_by_id(api_key.user_id)
+        for api_key in api_keys
+    ]
+    assert {shards.shard_for_user(user.id) for user in users} == {0, 1}
+
+    media_ids = [
+        await crud_operations.add_media(b"media", user.id) for user in users
+    ]
+    tweet_ids = [
+        await crud_operations.create_tweet(user, "sharded", [media_id])
+        for user, media_id in zip(users, media_ids)
+    ]
+    assert await task_queue.queue.run_once() == len(users)
+    for user, media_id, tweet_id in zip(users, media_ids, tweet_ids):
+        shard = shards.shard_for_user(user.id)
+        assert shards.shard_for_id(tweet_id) == shard
+        assert shards.shard_for_id(media_id) == shard
+        tweet = await crud_operations.get_tweet_by_id(tweet_id)
+        assert tweet.author_id == user.id
+        media = await crud_operations.get_media_by_id(media_id)
+        assert media.tweet_id == tweet_id
+    shard_tweets = await second_shard.scalar(text("SELECT count(*) FROM tweets"))
+    assert shard_tweets == 1
+
+    for user, tweet_id in zip(users, reversed(tweet_ids)):
+        tweet = await crud_operations.get_tweet_by_id(tweet_id)
+        await crud_operations.add_like_by_user_to_tweet(user, tweet)
+
+    feed = await crud_operations.get_feed()
+    assert [tweet.id for tweet in feed] == sorted(tweet_ids, reverse=True)
+    assert all(len(tweet.likes) == 1 for tweet in feed)
+    all_tweets = await crud_operations.get_all_tweets()
+    assert [tweet.id for tweet in all_tweets] == sorted(tweet_ids, reverse=True)
+    assert await crud_operations.get_feed(since_id=max(tweet_ids)) == []
+
+    likes = [
+        row.tweet_id
+        async for partition in crud_operations.stream_user_likes(users[0].id)
+        for row in partition
+    ]
+    assert likes == [tweet_ids[1]]
@@ -0,0 +1,96 @@
+"""Тестирование выдачи возрастающих по времени ID."""
+import asyncio
+
+import pytest
+
+from not_twitter.app.database import snowflake
+
+pytest_plugins = ("pytest_asyncio",)
+
+NOW = 1800000000.0
+JS_MAX_SAFE_INTEGER = 2 ** 53 - 1
+
+
+def test_ids_grow_within_millisecond():
+    """Тестирование выдачи ID с исчерпанием счетчика миллисекунды."""
+    generator = snowflake.SnowflakeGenerator(worker_id=3, clock=lambda: NOW)
+    ids = generator.next_ids(snowflake.MAX_SEQUENCE + 1)
+    assert ids == sorted(set(ids))
+    assert ids[0] == snowflake.get_min_id(NOW) | 3 << snowflake.SEQUENCE_BITS
+    assert ids[-1] >> snowflake.TIMESTAMP_SHIFT == (
+        ids[0] >> snowflake.TIMESTAMP_SHIFT
+    ) + 1
+    assert ids[-1] < JS_MAX_SAFE_INTEGER
+
+
+def test_ids_grow_when_clock_goes_back():
+    """Тестирование выдачи ID при отставании часов."""
+    times = iter([NOW, NOW - 10])
+    generator = snowflake.SnowflakeGenerator(clock=lambda: next(times))
+    first_id = generator.next_id()
+    assert generator.next_id() > first_id
+
+
+def test_ids_match_shard():
+    """Тестирование выдачи ID с остатком, равным номеру шарда."""
+    generator = snowflake.SnowflakeGenerator(clock=lambda: NOW)
+    ids = [generator.next_id(shard % 3, 3) for shard in range(100)]
+    assert ids == sorted(set(ids))
+    assert [tweet_id % 3 for tweet_id in ids] == [
+        shard % 3 for shard in range(100)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_worker_lease():
+    """Тестирование аренды разных номеров процессов."""
+    leases = [
+        snowflake.WorkerLease(snowflake.SnowflakeGenerator())
+        for _ in range(2)
+    ]
+    try:
+        for lease in leases:
+            await lease.start()
+        worker_ids = {lease._generator.worker_id for lease in leases}
+        assert len(worker_ids) == 2
+        assert all(lease.leased for lease in leases)
+    finally:
+        for lease in leases:
+            await lease.stop()
+    assert not any(lease.leased for lease in leases)
+
+
+async def wait_for_lease(lease, leased: bool) -> None:
+    """Ожидание потери или восстановления аренды.
+
+    Args:
+        lease (WorkerLease): Аренда номера процесса.
+        leased (bool): Ожидаемое состояние аренды.
+    """
+    for _ in range(100):
+        if lease.leased == leased:
+            break
+        await asyncio.sleep(0.01)
+    assert lease.leased == leased
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_pauses_generator(monkeypatch):
+    """Тестирование отказа в ID до восстановления потерянной аренды.
+
+    Args:
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    monkeypatch.setattr(snowflake, "RECONNECT_DELAY", 0.05)
+    generator = snowflake.SnowflakeGenerator()
+    lease = snowflake.WorkerLease(generator)
+    await lease.start()
+    try:
+        await lease._connection.close()  # noqa: WPS437
+        await wait_for_lease(lease, leased=False)
+        with pytest.raises(RuntimeError):
+            generator.next_id()
+        await wait_for_lease(lease, leased=True)
+        assert generator.next_id()
+    finally:
+        await lease.stop()
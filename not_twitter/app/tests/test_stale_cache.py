@@ -0,0 +1,109 @@
+"""Тестирование кэша устаревших данных чтения."""
+import asyncio
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from not_twitter.app.utils.stale_cache import StaleCache
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def not_overloaded() -> bool:
+    """Пул соединений не исчерпан.
+
+    Returns:
+        bool: False.
+    """
+    return False
+
+
+class Loader:
+    """Управляемое чтение из БД."""
+
+    def __init__(self, value) -> None:
+        """Создание чтения с результатом.
+
+        Args:
+            value: Результат чтения.
+        """
+        self.value = value
+        self.delay = 0.0
+        self.error = None
+        self.calls = 0
+
+    async def __call__(self):
+        """Чтение результата.
+
+        Returns:
+            Результат чтения.
+
+        Raises:
+            Exception: Заданная ошибка чтения.
+        """
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.value
+
+
+@pytest.mark.asyncio
+async def test_stale_cache_deadline():
+    """Тестирование отдачи устаревшего результата и обновления в фоне."""
+    cache = StaleCache("test", deadline=0.02, overloaded=not_overloaded)
+    loader = Loader("old")
+    assert await cache.get("key", loader) == ("old", None)
+
+    loader.value = "new"
+    loader.delay = 0.1
+    value, stale_age = await cache.get("key", loader)
+    assert value == "old"
+    assert stale_age is not None
+
+    # Пока идет фоновое обновление, БД не запрашивается
+    assert (await cache.get("key", loader))[0] == "old"
+    assert loader.calls == 2
+
+    await asyncio.gather(*cache.refreshing.values())
+    assert not cache.refreshing
+    loader.delay = 0
+    assert await cache.get("key", loader) == ("new", None)
+
+
+@pytest.mark.asyncio
+async def test_stale_cache_without_entry_waits():
+    """Тестирование ожидания БД при отсутствии сохраненного результата."""
+    cache = StaleCache("test", deadline=0.01, overloaded=not_overloaded)
+    loader = Loader(None)
+    loader.delay = 0.05
+    assert await cache.get("key", loader) == (None, None)
+    assert not cache.entries
+
+    loader.error = PoolTimeoutError()
+    with pytest.raises(PoolTimeoutError):
+        await cache.get("key", loader)
+
+
+@pytest.mark.asyncio
+async def test_stale_cache_pool_exhausted():
+    """Тестирование отдачи устаревшего результата при исчерпании пула."""
+    overloaded = False
+
+    def is_overloaded() -> bool:
+        return overloaded
+
+    cache = StaleCache("test", max_entries=1, overloaded=is_overloaded)
+    loader = Loader("first")
+    await cache.get("first", loader)
+    loader.value = "second"
+    await cache.get("second", loader)
+    assert list(cache.entries) == ["second"]
+
+    overloaded = True
+    assert (await cache.get("second", loader))[0] == "second"
+    assert loader.calls == 2
+
+    overloaded = False
+    loader.error = PoolTimeoutError()
+    assert (await cache.get("second", loader))[0] == "second"
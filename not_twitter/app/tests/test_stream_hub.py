@@ -0,0 +1,132 @@
+"""Тестирование хаба событий потока /api/stream."""
+import asyncio
+import json
+
+import pytest
+
+from not_twitter.app.database import crud_operations, database
+from not_twitter.app.utils import stream_hub
+from not_twitter.app.utils.feed_notifier import feed_notifier
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_hub_publishes_frames():
+    """Тестирование раздачи кадров событий подписчикам."""
+    hub = stream_hub.StreamHub(queue_size=10)
+    subscribers = [hub.subscribe() for _ in range(3)]
+    hub.publish(stream_hub.like_event(1, 2, "name"))
+    hub.publish(stream_hub.tweet_created_event(100, "text", [], 2, "name"))
+
+    for subscriber in subscribers:
+        frame = subscriber.queue.get_nowait()
+        assert frame.startswith(b"event: like\ndata: ")
+        assert json.loads(frame.split(b"data: ")[1])["delta"] == 1
+        assert subscriber.queue.get_nowait().startswith(b"event: tweet\n")
+    assert feed_notifier.latest_id == 100
+
+
+@pytest.mark.asyncio
+async def test_hub_import_resets_feed_bound():
+    """Тестирование сброса границы ленты событием массового импорта."""
+    hub = stream_hub.StreamHub(queue_size=10)
+    subscriber = hub.subscribe()
+    feed_notifier.observe(100)
+    hub.publish({"type": stream_hub.EVENT_IMPORT})
+    assert feed_notifier.latest_id is None
+    assert subscriber.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_hub_drops_slow_subscriber():
+    """Тестирование отключения не успевающего подписчика."""
+    hub = stream_hub.StreamHub(queue_size=2)
+    slow = hub.subscribe()
+    for tweet_id in range(3):
+        hub.publish(stream_hub.tweet_deleted_event(tweet_id))
+    assert slow.overflowed
+    assert not hub.subscribers
+
+    frames = [frame async for frame in hub.stream(slow)]
+    assert frames[0] == stream_hub.RETRY_FRAME
+    assert len(frames) == 3
+    assert frames[-1] == stream_hub.RESET_FRAME
+
+
+@pytest.mark.asyncio
+async def test_hub_limits_streams_per_key():
+    """Тестирование ограничения числа потоков одного api-key."""
+    hub = stream_hub.StreamHub(queue_size=2, max_streams_per_key=2)
+    first, second = hub.subscribe("key"), hub.subscribe("key")
+    assert hub.subscribe("key") is None
+    assert hub.subscribe("other_key") is not None
+
+    hub.unsubscribe(first)
+    hub.unsubscribe(first)
+    assert hub.streams_per_key["key"] == 1
+    assert hub.subscribe("key") is not None
+
+    for tweet_id in range(3):
+        hub.publish(stream_hub.tweet_deleted_event(tweet_id))
+    assert second.overflowed
+    assert not hub.streams_per_key
+
+
+@pytest.mark.asyncio
+async def test_crud_publishes_events(tweets_and_api_keys):
+    """Тестирование публикации событий CRUD операциями.
+
+    Args:
+        tweets_and_api_keys (Dict[str, List[base]]): тестовые твиты и api-keys.
+    """
+    user = tweets_and_api_keys["api_keys"][0].user
+    subscriber = stream_hub.hub.subscribe()
+    try:
+        tweet_id = await crud_operations.create_tweet(user, "stream", [])
+        tweet = await crud_operations.get_tweet_by_id(tweet_id)
+        await crud_operations.add_like_by_user_to_tweet(user, tweet)
+        await crud_operations.delete_tweet_by_id(tweet_id)
+    finally:
+        stream_hub.hub.unsubscribe(subscriber)
+
+    frames = [subscriber.queue.get_nowait() for _ in range(3)]
+    assert [frame.split(b"\n")[0] for frame in frames] == [
+        b"event: tweet",
+        b"event: like",
+        b"event: delete",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_listener_receives_other_workers_events():
+    """Тестирование приема событий другого процесса через NOTIFY."""
+    listener = stream_hub.WorkerListener()
+    subscriber = stream_hub.hub.subscribe()
+    listener.start()
+    try:
+        for _ in range(100):
+            if listener.connected:
+                break
+            await asyncio.sleep(0.01)
+        assert listener.connected
+
+        event = stream_hub.tweet_deleted_event(42)
+        async with database.engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for origin in (stream_hub.ORIGIN, "other_worker"):
+                await conn.execute(
+                    stream_hub.NOTIFY_QUERY,
+                    {
+                        "channel": stream_hub.CHANNEL,
+                        "payload": json.dumps(
+                            {"origin": origin, "event": event},
+                        ),
+                    },
+                )
+        frame = await asyncio.wait_for(subscriber.queue.get(), 1)
+        assert frame == stream_hub.encode_event(event)
+        assert subscriber.queue.empty()
+    finally:
+        stream_hub.hub.unsubscribe(subscriber)
+        await listener.stop()
@@ -0,0 +1,211 @@
+"""Тестирование очереди отложенных задач."""
+import asyncio
+from typing import Callable
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from not_twitter.app.database import crud_operations, models, shards, task_queue
+from not_twitter.app.utils import metrics
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+async def enqueue(queue, kind: str, payload, delay: float = 0) -> None:
+    """Добавление задачи отдельной транзакцией.
+
+    Args:
+        queue (TaskQueue): Очередь задач.
+        kind (str): Вид задачи.
+        payload: Данные задачи.
+        delay (float): Задержка выполнения в секундах.
+    """
+    async with shards.get_session() as session:
+        async with session.begin():
+            queue.enqueue(session, kind, payload, delay)
+
+
+@pytest.mark.asyncio
+async def test_run_once(session):
+    """Тестирование выполнения и удаления готовой задачи.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+    """
+    queue = task_queue.TaskQueue(workers=1)
+    calls = []
+
+    @queue.handler("test")
+    async def handle(payload, shard):
+        calls.append((payload, shard))
+
+    await enqueue(queue, "test", {"value": 1})
+    assert await queue.run_once() == 1
+    assert calls == [({"value": 1}, 0)]
+    jobs = await session.execute(select(models.Job))
+    assert jobs.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_retry_and_fail(session, monkeypatch):
+    """Тестирование повторов упавшей задачи и пометки неудавшейся.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    monkeypatch.setattr(task_queue, "MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(task_queue, "RETRY_DELAY", 0)
+    queue = task_queue.TaskQueue(workers=1)
+    failed = metrics.TASKS_TOTAL.labels("broken", "failed")
+    failed_before = failed.value
+
+    @queue.handler("broken")
+    async def handle(payload, shard):
+        raise ValueError("broken task")
+
+    await enqueue(queue, "broken", {})
+    assert await queue.run_once() == 1
+    job = (await session.execute(select(models.Job))).scalar()
+    assert job.attempts == 1
+    assert job.failed_at is None
+    assert job.last_error == "ValueError: broken task"
+
+    assert await queue.run_once() == 1
+    assert await queue.run_once() == 0
+    await session.refresh(job)
+    assert job.attempts == 2
+    assert job.failed_at is not None
+    assert failed.value == failed_before + 1
+
+
+async def wait_until(condition: Callable[[], bool]) -> None:
+    """Ожидание выполнения условия фоновыми задачами.
+
+    Args:
+        condition (Callable[[], bool]): Проверяемое условие.
+    """
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_free_slot_claims_next_job(session, monkeypatch):
+    """Тестирование выполнения следующих задач во время долгой задачи.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    monkeypatch.setattr(task_queue, "POLL_INTERVAL", 60)
+    queue = task_queue.TaskQueue(workers=2)
+    unblock = asyncio.Event()
+    done = []
+    claims = []
+    slow_done = metrics.TASKS_TOTAL.labels("slow", "done")
+    slow_done_before = slow_done.value
+
+    @queue.handler("slow")
+    async def handle_slow(payload, shard):
+        await unblock.wait()
+        done.append("slow")
+
+    @queue.handler("fast")
+    async def handle_fast(payload, shard):
+        done.append(payload["value"])
+
+    claim = queue._claim  # noqa: WPS437
+
+    async def record_claim(shard: int, limit: int):
+        jobs = await claim(shard, limit)
+        claims.append(len(jobs))
+        return jobs
+
+    monkeypatch.setattr(queue, "_claim", record_claim)
+    # now() в транзакции теста не меняется, порядок задают задержки
+    await enqueue(queue, "slow", {}, delay=-30)
+    for value in (1, 2):
+        await enqueue(queue, "fast", {"value": value}, delay=value * 10 - 30)
+    queue.start()
+    try:
+        # Пустая выборка - очередь ждет опроса и не обращается к БД
+        await wait_until(lambda: len(claims) == 3)
+        assert claims == [2, 1, 0]
+        assert done == [1, 2]
+        unblock.set()
+        await wait_until(lambda: slow_done.value > slow_done_before)
+        assert done == [1, 2, "slow"]
+    finally:
+        await queue.stop()
+    jobs = await session.execute(select(models.Job))
+    assert jobs.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_claim_error_keeps_loop(session, monkeypatch):
+    """Тестирование продолжения обработки после ошибки выборки задач.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    monkeypatch.setattr(task_queue, "POLL_INTERVAL", 0.01)
+    queue = task_queue.TaskQueue(workers=1)
+    done = []
+
+    @queue.handler("test")
+    async def handle(payload, shard):
+        done.append(payload)
+
+    claim = queue._claim  # noqa: WPS437
+    errors = [PoolTimeoutError("pool exhausted"), RuntimeError("broken")]
+
+    async def failing_claim(shard: int, limit: int):
+        if errors:
+            raise errors.pop(0)
+        return await claim(shard, limit)
+
+    monkeypatch.setattr(queue, "_claim", failing_claim)
+    completed = metrics.TASKS_TOTAL.labels("test", "done")
+    completed_before = completed.value
+    await enqueue(queue, "test", {"value": 1})
+    queue.start()
+    try:
+        await wait_until(lambda: completed.value > completed_before)
+    finally:
+        await queue.stop()
+    assert done == [{"value": 1}]
+
+
+def test_retry_delay(monkeypatch):
+    """Тестирование экспоненциальной задержки повтора.
+
+    Args:
+        monkeypatch: Фикстура подмены атрибутов.
+    """
+    monkeypatch.setattr(task_queue, "RETRY_DELAY", 1)
+    monkeypatch.setattr(task_queue, "MAX_RETRY_DELAY", 5)
+    delays = [task_queue.get_retry_delay(attempts) for attempts in (1, 2, 3, 4)]
+    assert delays == [1, 2, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_create_tweet_links_medias(session, api_keys, media):
+    """Тестирование привязки медиа к твиту задачей очереди.
+
+    Args:
+        session (AsyncSession): сессия для работы с БД.
+        api_keys (List[ApiKeyToUser]): Список тестовых api-key.
+        media (Media): тестовое медиа.
+    """
+    user = await crud_operations.get_user_by_id(api_keys[0].user_id)
+    tweet_id = await crud_operations.create_tweet(user, "media", [media.id])
+    await session.refresh(media)
+    assert media.tweet_id is None
+
+    assert await task_queue.queue.run_once() == 1
+    await session.refresh(media)
+    assert media.tweet_id == tweet_id
@@ -0,0 +1,203 @@
+"""Контроль допуска запросов и сброс нагрузки при перегрузке.
+
+Одновременно обрабатывается не больше заданного числа запросов к API,
+остальные ждут в ограниченной очереди с приоритетами: запись и
+аутентификация обслуживаются раньше чтения, чтение раньше ленты. Запрос,
+не дождавшийся обработки за бюджет ожидания или не поместившийся в
+очередь, сразу получает ответ 503 с хэдером Retry-After.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from not_twitter.app.utils import metrics, route_classes, standard_responses
+
+MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+MAX_QUEUE_SIZE = int(os.getenv("ADMISSION_MAX_QUEUE_SIZE", "256"))
+QUEUE_WAIT_BUDGET = float(os.getenv("ADMISSION_QUEUE_WAIT_MS", "500")) / 1000
+RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER_SEC", "1"))
+
+# Очередь перестраивается без завершенных ожиданий, когда их в ней
+# не меньше порога и не меньше половины очереди
+COMPACT_MIN_STALE = 64
+
+SHED_QUEUE_FULL = "queue_full"
+SHED_TIMEOUT = "timeout"
+
+# Меньшее значение обслуживается раньше. Служебные маршруты и статика
+# не ограничиваются, чтобы проверки готовности и метрики работали
+# и при перегрузке. Long-poll запросы и поток событий не ограничиваются,
+# чтобы ожидающие клиенты не занимали места обычных запросов, обращения
+# long-poll к БД объединяются по since_id. Пакетный запрос не занимает
+# места сам, его подзапросы допускаются по своим классам.
+PRIORITIES = {
+    route_classes.AUTH: 0,
+    route_classes.WRITE: 0,
+    route_classes.MEDIA_UPLOAD: 0,
+    route_classes.READ: 1,
+    route_classes.FEED: 2,
+}
+
+
+class AdmissionController:
+    """Ограничитель параллельных запросов с очередью по приоритетам."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_size: int,
+        queue_wait_budget: float,
+    ) -> None:
+        """Создание ограничителя.
+
+        Args:
+            max_concurrency (int): Максимум одновременно обрабатываемых запросов.
+            max_queue_size (int): Максимум ожидающих запросов.
+            queue_wait_budget (float): Максимальное ожидание в очереди, секунд.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_wait_budget = queue_wait_budget
+        self.active = 0
+        self.waiting = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._stale = 0
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: int) -> Optional[str]:
+        """Получение разрешения на обработку запроса.
+
+        Args:
+            priority (int): Приоритет запроса, меньшее значение раньше.
+
+        Returns:
+            Optional[str]: Причина отказа или None, если запрос допущен.
+        """
+        if self.active < self.max_concurrency and not self.waiting:
+            self.active += 1
+            return None
+        if self.waiting >= self.max_queue_size:
+            return SHED_QUEUE_FULL
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._counter), waiter))
+        self.waiting += 1
+        timer = loop.call_later(self.queue_wait_budget, self._expire, waiter)
+        try:
+            admitted = await waiter
+        except asyncio.CancelledError:
+            # Разрешение могло быть передано до отмены задачи
+            if not waiter.done() or waiter.cancelled():
+                waiter.cancel()
+                self.waiting -= 1
+                self._discard()
+            elif waiter.result():
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+        if admitted:
+            return None
+        return SHED_TIMEOUT
+
+    def release(self) -> None:
+        """Освобождение разрешения и передача его следующему в очереди."""
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                self._stale -= 1
+                continue
+            self.waiting -= 1
+            waiter.set_result(True)
+            return
+        self.active -= 1
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            self.waiting -= 1
+            waiter.set_result(False)
+            self._discard()
+
+    def _discard(self) -> None:
+        # Завершенное ожидание остается в очереди до извлечения, а при
+        # потоке таймаутов очередь перестраивается, чтобы не расти
+        self._stale += 1
+        if self._stale >= max(COMPACT_MIN_STALE, len(self._queue) // 2):
+            self._queue = [
+                entry for entry in self._queue if not entry[2].done()
+            ]
+            heapq.heapify(self._queue)
+            self._stale = 0
+
+
+controller = AdmissionController(
+    MAX_CONCURRENCY,
+    MAX_QUEUE_SIZE,
+    QUEUE_WAIT_BUDGET,
+)
+
+
+def collect_admission_metrics() -> None:
+    """Обновление метрик загрузки ограничителя."""
+    metrics.ADMISSION_ACTIVE_REQUESTS.set(controller.active)
+    metrics.ADMISSION_QUEUED_REQUESTS.set(controller.waiting)
+
+
+metrics.REGISTRY.add_collector(collect_admission_metrics)
+
+
+class AdmissionMiddleware:
+    """Допуск запросов к API через ограничитель."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Создание middleware.
+
+        Args:
+            app (ASGIApp): Оборачиваемое приложение.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Обработка запроса после получения разрешения.
+
+        Args:
+            scope (Scope): ASGI scope.
+            receive (Receive): ASGI receive.
+            send (Send): ASGI send.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class = route_classes.classify_request(
+            scope["method"],
+            scope["path"],
+            scope["query_string"],
+        )
+        priority = PRIORITIES.get(route_class)
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        shed_reason = await controller.acquire(priority)
+        metrics.ADMISSION_QUEUE_WAIT.labels(route_class).observe(
+            time.perf_counter() - start,
+        )
+        if shed_reason:
+            metrics.ADMISSION_SHED_TOTAL.labels(route_class, shed_reason).inc()
+            response = standard_responses.get_service_unavailable_response(
+                RETRY_AFTER,
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
@@ -1,39 +1,205 @@
 """Проверка api-key и получение связанного с ним пользователя."""
-from typing import Optional, Tuple
+import asyncio
+import hmac
+import logging
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
 
-from fastapi import status
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
-from not_twitter.app.database import crud_operations
+from not_twitter.app.database import crud_operations, database
 from not_twitter.app.database.models import User
+from not_twitter.app.utils import (
+    admission,
+    metrics,
+    stale_cache,
+    standard_responses,
+)
+
+ADMIN_API_KEYS = tuple(
+    key.strip()
+    for key in os.getenv("ADMIN_API_KEYS", "").split(",")
+    if key.strip()
+)
+KNOWN_API_KEYS_MAX_ENTRIES = int(
+    os.getenv("KNOWN_API_KEYS_MAX_ENTRIES", "10000"),
+)
+# Ошибки, при которых пользователя нельзя проверить по БД
+DB_UNAVAILABLE_ERRORS = (OSError, DBAPIError, PoolTimeoutError)
+
+logger = logging.getLogger(__name__)
+
+# Пользователь, уже найденный по api-key пакетного запроса
+authenticated_user: ContextVar[Optional[Tuple[str, User]]] = ContextVar(
+    "authenticated_user",
+    default=None,
+)
+# Api-key, недавно найденные по БД, от давних к недавним
+known_users: "OrderedDict[str, User]" = OrderedDict()
+# Проверки api-key, продолжающиеся после отдачи пользователя из памяти
+refreshing: Dict[str, asyncio.Task] = {}
+
+
+def is_known_key(api_key: str) -> bool:
+    """Проверка, что api-key недавно был найден по БД.
+
+    Args:
+        api_key (str): api-key пользователя.
+
+    Returns:
+        bool: True, если ключ принадлежит пользователю.
+    """
+    return api_key in known_users
+
+
+def remember_user(api_key: str, user: Optional[User]) -> None:
+    """Запоминание результата проверки api-key по БД.
+
+    Args:
+        api_key (str): api-key пользователя.
+        user (Optional[User]): Найденный пользователь или None.
+    """
+    if user is None:
+        known_users.pop(api_key, None)
+        return
+    known_users[api_key] = user
+    known_users.move_to_end(api_key)
+    while len(known_users) > KNOWN_API_KEYS_MAX_ENTRIES:
+        known_users.popitem(last=False)
+
+
+@contextmanager
+def authenticated(api_key: str, user: User) -> Iterator[None]:
+    """Использование найденного пользователя без повторной проверки.
+
+    Действует для проверок api-key в задачах, созданных внутри блока.
+
+    Args:
+        api_key (str): Проверенный api-key.
+        user (User): Найденный по api-key пользователь.
+
+    Yields:
+        None
+    """
+    token = authenticated_user.set((api_key, user))
+    try:
+        yield
+    finally:
+        authenticated_user.reset(token)
 
 
 async def check_api_key(
     api_key: str,
-) -> Tuple[Optional[User], Optional[JSONResponse]]:
+    allow_stale: bool = False,
+) -> Tuple[Optional[User], Optional[Response]]:
     """Проверка api-key и получение связанного с ним пользователя.
 
     Возвращает кортеж из пользователя, если найден и JSONResponse
-    с сообщением об ошибке,  если пользователь не найден.
+    с сообщением об ошибке,  если пользователь не найден. Api-key
+    проверяется по БД, при недоступной БД возвращается ответ 503.
+    В подзапросах пакетного запроса используется уже найденный
+    пользователь.
+
+    С allow_stale, для запросов чтения с отдачей устаревших данных,
+    пользователь недавно найденного api-key берется из памяти, если пул
+    соединений исчерпан или БД не ответила за STALE_READ_DEADLINE_MS.
+    Начатая проверка продолжается в фоне и обновляет результат.
 
     Args:
         api_key (str): api-key пользователя.
+        allow_stale (bool): Разрешить результат прошлой проверки.
 
     Returns:
-        Tuple[Optional[User], Optional[JSONResponse]]
+        Tuple[Optional[User], Optional[Response]]
     """
-    user = await crud_operations.get_user_by_api_key(api_key)
+    authenticated_key = authenticated_user.get()
+    if authenticated_key is not None and authenticated_key[0] == api_key:
+        return authenticated_key[1], None
+    known_user = known_users.get(api_key) if allow_stale else None
+    try:
+        if known_user is None:
+            user = await _lookup_user(api_key)
+        else:
+            user = await _lookup_known_user(api_key, known_user)
+    except DB_UNAVAILABLE_ERRORS as exc:
+        logger.warning("Api-key check failed: %s", exc)
+        return None, standard_responses.get_service_unavailable_response(
+            admission.RETRY_AFTER,
+        )
     if user:
         error_response = None
     else:
-        message = "Api-key for existing user is required"
-        error_response = JSONResponse(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            content={
-                "result": False,
-                "error_type": "Authentication error",
-                "error_message": message,
-            },
-        )
+        error_response = standard_responses.get_unauthorized_response()
 
     return user, error_response
+
+
+async def _lookup_user(api_key: str) -> Optional[User]:
+    user = await crud_operations.get_auth_user_by_api_key(api_key)
+    remember_user(api_key, user)
+    return user
+
+
+async def _lookup_known_user(api_key: str, known_user: User) -> Optional[User]:
+    # Ожидание соединения из исчерпанного пула заведомо дольше срока
+    if api_key in refreshing or database.is_pool_exhausted():
+        return _serve_known_user(known_user)
+    lookup = asyncio.ensure_future(_lookup_user(api_key))
+    try:
+        return await asyncio.wait_for(
+            asyncio.shield(lookup),
+            stale_cache.READ_DEADLINE,
+        )
+    except asyncio.TimeoutError:
+        _refresh_in_background(api_key, lookup)
+    except DB_UNAVAILABLE_ERRORS as exc:
+        logger.warning("Api-key check failed: %s", exc)
+    return _serve_known_user(known_user)
+
+
+def _serve_known_user(user: User) -> User:
+    metrics.STALE_RESPONSES_TOTAL.labels("auth").inc()
+    return user
+
+
+def _refresh_in_background(api_key: str, lookup: asyncio.Task) -> None:
+    refreshing[api_key] = lookup
+    lookup.add_done_callback(
+        lambda done: _finish_refresh(api_key, done),
+    )
+
+
+def _finish_refresh(api_key: str, lookup: asyncio.Task) -> None:
+    refreshing.pop(api_key, None)
+    if not lookup.cancelled() and lookup.exception() is not None:
+        logger.warning(
+            "Background api-key check failed",
+            exc_info=lookup.exception(),
+        )
+
+
+def check_admin_api_key(api_key: str) -> Optional[Response]:
+    """Проверка api-key администратора.
+
+    Ключи администраторов задаются переменной окружения ADMIN_API_KEYS
+    через запятую и не требуют обращения к БД.
+
+    Args:
+        api_key (str): api-key администратора.
+
+    Returns:
+        Optional[Response]: Ответ с ошибкой или None, если ключ верный.
+    """
+    is_admin = False
+    for admin_key in ADMIN_API_KEYS:
+        is_admin |= hmac.compare_digest(api_key.encode(), admin_key.encode())
+    if is_admin:
+        return None
+    return standard_responses.get_forbidden_response(
+        "Api-key of administrator is required",
+    )
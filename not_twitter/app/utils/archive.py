@@ -0,0 +1,134 @@
+"""Хранение архивных твитов в сжатых файлах JSONL на локальном диске.
+
+Каждый файл содержит пачку твитов, упорядоченных по ID, а диапазон ID
+указан в имени файла: tweets_<first>_<last>.jsonl.<codec>. Файлы
+сжимаются zstd, если установлен пакет zstandard, иначе gzip. Поиск
+твита по ID распаковывает только файлы, диапазон которых его содержит.
+"""
+import asyncio
+import gzip
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+FILE_NAME = "tweets_{first}_{last}.jsonl.{codec}"
+FILE_NAME_PATTERN = re.compile(r"^tweets_(\d+)_(\d+)\.jsonl\.(\w+)$")
+
+CODEC_GZIP = "gz"
+CODEC_ZSTD = "zst"
+CODECS = {CODEC_GZIP: (gzip.compress, gzip.decompress)}
+if zstandard is not None:
+    CODECS[CODEC_ZSTD] = (
+        zstandard.ZstdCompressor().compress,
+        zstandard.ZstdDecompressor().decompress,
+    )
+WRITE_CODEC = CODEC_ZSTD if CODEC_ZSTD in CODECS else CODEC_GZIP
+
+
+class ArchiveStore:
+    """Каталог файлов с архивными твитами."""
+
+    def __init__(self, directory: str = ARCHIVE_DIR) -> None:
+        """Создание хранилища.
+
+        Args:
+            directory (str): Каталог файлов архива.
+        """
+        self.directory = directory
+
+    def write(self, records: List[Dict[str, Any]]) -> str:
+        """Запись пачки твитов в новый файл архива.
+
+        Файл сначала пишется под временным именем и сбрасывается на
+        диск, поэтому недописанный файл не виден при поиске.
+
+        Args:
+            records (List[Dict[str, Any]]): Твиты.
+
+        Returns:
+            str: Путь к файлу архива.
+        """
+        records = sorted(records, key=lambda record: record["id"])
+        compress, _ = CODECS[WRITE_CODEC]
+        data = compress("".join(
+            json.dumps(record, ensure_ascii=False) + "\n"
+            for record in records
+        ).encode())
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, FILE_NAME.format(
+            first=records[0]["id"],
+            last=records[-1]["id"],
+            codec=WRITE_CODEC,
+        ))
+        temp_path = "{path}.tmp".format(path=path)
+        with open(temp_path, "wb") as archive_file:
+            archive_file.write(data)
+            archive_file.flush()
+            os.fsync(archive_file.fileno())
+        os.replace(temp_path, path)
+        return path
+
+    def find(self, tweet_id: int) -> Optional[Dict[str, Any]]:
+        """Поиск архивного твита по ID.
+
+        Args:
+            tweet_id (int): ID твита.
+
+        Returns:
+            Optional[Dict[str, Any]]: Твит или None.
+        """
+        for path, codec in self._get_candidates(tweet_id):
+            _, decompress = CODECS[codec]
+            with open(path, "rb") as archive_file:
+                lines = decompress(archive_file.read()).splitlines()
+            for line in lines:
+                record = json.loads(line)
+                if record["id"] == tweet_id:
+                    return record
+        return None
+
+    async def write_async(self, records: List[Dict[str, Any]]) -> str:
+        """Запись пачки твитов в потоке, не блокируя цикл событий.
+
+        Args:
+            records (List[Dict[str, Any]]): Твиты.
+
+        Returns:
+            str: Путь к файлу архива.
+        """
+        return await asyncio.to_thread(self.write, records)
+
+    async def find_async(self, tweet_id: int) -> Optional[Dict[str, Any]]:
+        """Поиск архивного твита в потоке, не блокируя цикл событий.
+
+        Args:
+            tweet_id (int): ID твита.
+
+        Returns:
+            Optional[Dict[str, Any]]: Твит или None.
+        """
+        return await asyncio.to_thread(self.find, tweet_id)
+
+    def _get_candidates(self, tweet_id: int) -> List[Tuple[str, str]]:
+        if not os.path.isdir(self.directory):
+            return []
+        candidates = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                match = FILE_NAME_PATTERN.match(entry.name)
+                if not match or match.group(3) not in CODECS:
+                    continue
+                first, last = int(match.group(1)), int(match.group(2))
+                if first <= tweet_id <= last:
+                    candidates.append((entry.path, match.group(3)))
+        return candidates
+
+
+store = ArchiveStore()
@@ -0,0 +1,237 @@
+"""Выполнение подзапросов пакетного запроса.
+
+Подзапросы передаются обработчикам маршрутов приложения напрямую, без
+middleware, поэтому каждый подзапрос сам расходует токен своего класса
+маршрута и проходит контроль допуска с приоритетом своего класса; при
+отказе его ответом становится 429 или 503. Допускаются GET запросы
+к API с ответом JSON, потоковые и служебные маршруты в пакете
+не выполняются. Тела ответов
+подзапросов вставляются в ответ пакета без повторного кодирования.
+Необработанная ошибка подзапроса становится его ответом со статусом
+500 и не прерывает остальные подзапросы пакета.
+"""
+import logging
+import math
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.routing import Match
+
+from not_twitter.app.utils import (
+    admission,
+    metrics,
+    rate_limit,
+    route_classes,
+    standard_responses,
+)
+from not_twitter.app.utils.json_responses import dump_json
+
+ALLOWED_CLASSES = frozenset((
+    route_classes.AUTH,
+    route_classes.FEED,
+    route_classes.READ,
+))
+JSON_MEDIA_TYPE = b"application/json"
+NOT_ALLOWED_MESSAGE = "Only GET API requests with JSON responses are allowed"
+
+logger = logging.getLogger(__name__)
+
+
+class SubResponse(NamedTuple):
+    """Статус и JSON тело ответа на подзапрос."""
+
+    status: int
+    body: bytes
+
+
+class _ResponseCollector:
+    """Сбор ответа обработчика из сообщений ASGI."""
+
+    def __init__(self) -> None:
+        """Создание пустого ответа."""
+        self.status = 500
+        self.media_type = b""
+        self.chunks: List[bytes] = []
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Прием сообщения ASGI.
+
+        Args:
+            message (Dict[str, Any]): Сообщение ASGI.
+        """
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            headers = dict(message.get("headers", ()))
+            self.media_type = headers.get(b"content-type", b"")
+        elif message["type"] == "http.response.body":
+            self.chunks.append(message.get("body", b""))
+
+
+async def _receive() -> Dict[str, Any]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def _make_scope(app: FastAPI, path: str, api_key: str) -> Dict[str, Any]:
+    url = urlsplit(path)
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "root_path": "",
+        "query_string": url.query.encode(),
+        "headers": [(b"api-key", api_key.encode())],
+        "client": None,
+        "server": None,
+        "app": app,
+    }
+
+
+def _match_route(app: FastAPI, scope: Dict[str, Any]) -> Optional[APIRoute]:
+    for route in app.router.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            scope.update(child_scope)
+            return route
+    return None
+
+
+def _is_streaming(route: APIRoute) -> bool:
+    response_class = getattr(route.response_class, "value", route.response_class)
+    return issubclass(response_class, StreamingResponse)
+
+
+async def _handle(
+    app: FastAPI,
+    route: APIRoute,
+    scope: Dict[str, Any],
+    collector: _ResponseCollector,
+) -> None:
+    async with AsyncExitStack() as stack:
+        scope["fastapi_astack"] = stack
+        try:
+            await route.handle(scope, _receive, collector.send)
+        except Exception as exc:  # noqa: B902
+            # Ошибки валидации и HTTPException обычно преобразует в ответ
+            # middleware исключений, пропущенный для подзапросов
+            handler = _get_exception_handler(app, exc)
+            if handler is None:
+                raise
+            response = await handler(Request(scope), exc)
+            await response(scope, _receive, collector.send)
+
+
+def _get_exception_handler(app: FastAPI, exc: Exception):
+    for exc_class in type(exc).__mro__:
+        handler = app.exception_handlers.get(exc_class)
+        if handler is not None:
+            return handler
+    return None
+
+
+async def _collect(response: Response) -> SubResponse:
+    collector = _ResponseCollector()
+    await response({"type": "http"}, _receive, collector.send)
+    return SubResponse(collector.status, b"".join(collector.chunks))
+
+
+async def run_subrequest(app: FastAPI, path: str, api_key: str) -> SubResponse:
+    """Выполнение подзапроса обработчиком его маршрута.
+
+    Args:
+        app (FastAPI): Приложение.
+        path (str): Путь GET запроса с параметрами.
+        api_key (str): Api-key пакетного запроса.
+
+    Returns:
+        SubResponse: Ответ на подзапрос.
+    """
+    scope = _make_scope(app, path, api_key)
+    route_class = route_classes.classify_request(
+        "GET",
+        scope["path"],
+        scope["query_string"],
+    )
+    if route_class not in ALLOWED_CLASSES:
+        return await _collect(
+            standard_responses.get_bad_request_response(NOT_ALLOWED_MESSAGE),
+        )
+    route = _match_route(app, scope)
+    if route is None:
+        return await _collect(standard_responses.get_not_found_response(
+            "No route for {path}".format(path=scope["path"]),
+        ))
+    if _is_streaming(route):
+        return await _collect(
+            standard_responses.get_bad_request_response(NOT_ALLOWED_MESSAGE),
+        )
+    retry_after = await rate_limit.limiter.check(route_class, api_key)
+    if retry_after:
+        metrics.RATE_LIMITED_TOTAL.labels(route_class).inc()
+        return await _collect(standard_responses.get_too_many_requests_response(
+            math.ceil(retry_after),
+        ))
+    start = time.perf_counter()
+    shed_reason = await admission.controller.acquire(
+        admission.PRIORITIES[route_class],
+    )
+    metrics.ADMISSION_QUEUE_WAIT.labels(route_class).observe(
+        time.perf_counter() - start,
+    )
+    if shed_reason:
+        metrics.ADMISSION_SHED_TOTAL.labels(route_class, shed_reason).inc()
+        return await _collect(
+            standard_responses.get_service_unavailable_response(
+                admission.RETRY_AFTER,
+            ),
+        )
+    collector = _ResponseCollector()
+    try:
+        await _handle(app, route, scope, collector)
+    # Без обработчика ошибка любого вида отменила бы весь пакет
+    except Exception:  # noqa: B902
+        logger.exception("Batch subrequest %s failed", path)
+        return await _collect(standard_responses.get_internal_error_response())
+    finally:
+        admission.controller.release()
+    if not collector.media_type.startswith(JSON_MEDIA_TYPE):
+        return await _collect(
+            standard_responses.get_bad_request_response(NOT_ALLOWED_MESSAGE),
+        )
+    return SubResponse(collector.status, b"".join(collector.chunks))
+
+
+def dump_responses(responses: List[SubResponse]) -> bytes:
+    """Кодирование ответа пакета из ответов подзапросов.
+
+    Args:
+        responses (List[SubResponse]): Ответы подзапросов по порядку.
+
+    Returns:
+        bytes: JSON тело ответа пакета.
+    """
+    parts = []
+    for response in responses:
+        parts.append(b"".join((
+            b'{"status":',
+            dump_json(response.status),
+            b',"body":',
+            response.body,
+            b"}",
+        )))
+    return b"".join((
+        b'{"result":true,"responses":[',
+        b",".join(parts),
+        b"]}",
+    ))
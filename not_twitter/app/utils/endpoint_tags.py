@@ -9,3 +9,4 @@ class Tags(Enum):
     tweets = "tweets"
     users = "users"
     media = "media"
+    service = "service"
@@ -0,0 +1,79 @@
+"""Кодирование выгрузок данных пользователя в NDJSON и CSV.
+
+Строки приходят пачками из серверного курсора и кодируются пачками,
+поэтому память выгрузки не зависит от объема истории пользователя.
+"""
+import csv
+import io
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Row
+
+from not_twitter.app.utils.json_responses import dump_json
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+MEDIA_TYPES = {
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_CSV: "text/csv",
+}
+ATTACHMENTS_SEPARATOR = " "
+
+
+async def encode_ndjson(
+    partitions: AsyncIterator[Sequence[Row]],
+    columns: Sequence[str],
+) -> AsyncIterator[bytes]:
+    """Кодирование строк в NDJSON.
+
+    Args:
+        partitions (AsyncIterator[Sequence[Row]]): Пачки строк.
+        columns (Sequence[str]): Имена полей строк.
+
+    Yields:
+        bytes: JSON объекты пачки строк, по одному в строке.
+    """
+    async for partition in partitions:
+        yield b"".join(
+            dump_json(dict(zip(columns, row))) + b"\n"
+            for row in partition
+        )
+
+
+async def encode_csv(
+    partitions: AsyncIterator[Sequence[Row]],
+    columns: Sequence[str],
+) -> AsyncIterator[bytes]:
+    """Кодирование строк в CSV с заголовком.
+
+    Списки значений записываются в одну ячейку через пробел.
+
+    Args:
+        partitions (AsyncIterator[Sequence[Row]]): Пачки строк.
+        columns (Sequence[str]): Имена полей строк.
+
+    Yields:
+        bytes: Строки CSV пачки строк.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+    async for partition in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [
+                ATTACHMENTS_SEPARATOR.join(cell) if isinstance(cell, list)
+                else cell
+                for cell in row
+            ]
+            for row in partition
+        )
+        yield buffer.getvalue().encode()
+
+
+ENCODERS = {
+    FORMAT_NDJSON: encode_ndjson,
+    FORMAT_CSV: encode_csv,
+}
@@ -0,0 +1,148 @@
+"""Уведомление ожидающих запросов ленты о новых твитах.
+
+Процесс помнит верхнюю границу ID твитов в БД. Запрос ленты с since_id
+не меньше этой границы заведомо пуст и обслуживается без обращения к
+БД, а в режиме long-poll ждет публикации нового твита или таймаута.
+Граница учитывает твиты этого процесса, события других процессов и
+массового импорта из PostgreSQL NOTIFY и результаты запросов ленты к
+БД. Пока процесс не получает события всех процессов (слушатель NOTIFY
+отключен или не подключен ко всем шардам), граница не используется:
+запросы с since_id обращаются к БД и не ждут. При смене этого признака
+граница сбрасывается, так как события могли быть пропущены.
+Проснувшиеся одновременно запросы с одинаковым since_id получают
+результат одного общего запроса к БД.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from not_twitter.app.database.projections import FeedTweet
+
+MAX_WAIT = float(os.getenv("FEED_LONG_POLL_MAX_WAIT_SEC", "30"))
+
+
+class FeedNotifier:
+    """Верхняя граница ID твитов и ожидание ее роста."""
+
+    def __init__(self, complete: bool = True) -> None:
+        """Создание уведомителя с неизвестной границей.
+
+        Args:
+            complete (bool): Получает ли процесс события обо всех
+                новых твитах.
+        """
+        self.complete = complete
+        self.latest_id: Optional[int] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self._fetches: Dict[int, asyncio.Future] = {}
+
+    def has_newer(self, since_id: int) -> bool:
+        """Проверка, могут ли в БД быть твиты новее since_id.
+
+        Args:
+            since_id (int): ID последнего полученного клиентом твита.
+
+        Returns:
+            bool: False, если новых твитов заведомо нет.
+        """
+        if not self.complete or self.latest_id is None:
+            return True
+        return self.latest_id > since_id
+
+    def set_complete(self, complete: bool) -> None:
+        """Смена признака получения событий обо всех новых твитах.
+
+        Args:
+            complete (bool): Получает ли процесс события обо всех
+                новых твитах.
+        """
+        self.complete = complete
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Сброс границы и пробуждение ожидающих запросов.
+
+        Используется, когда твиты могли появиться без события, например
+        после массового импорта.
+        """
+        self.latest_id = None
+        self._wake()
+
+    def observe(self, tweet_id: int) -> None:
+        """Учет ID из результата запроса ленты к БД.
+
+        Args:
+            tweet_id (int): Наибольший ID твита в БД на момент запроса.
+        """
+        if self.latest_id is None or tweet_id > self.latest_id:
+            self.latest_id = tweet_id
+
+    def publish(self, tweet_id: int) -> None:
+        """Учет созданного твита и пробуждение ожидающих запросов.
+
+        Args:
+            tweet_id (int): ID созданного твита.
+        """
+        self.observe(tweet_id)
+        self._wake()
+
+    async def wait_for_newer(self, since_id: int, timeout: float) -> bool:
+        """Ожидание твита новее since_id.
+
+        Args:
+            since_id (int): ID последнего полученного клиентом твита.
+            timeout (float): Максимальное ожидание, секунд.
+
+        Returns:
+            bool: True, если могут быть новые твиты.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self.has_newer(since_id):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            waiter = self._waiter
+            if waiter is None or waiter.done() or waiter.get_loop() is not loop:
+                waiter = loop.create_future()
+                self._waiter = waiter
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def fetch(
+        self,
+        since_id: int,
+        loader: Callable[[int], Awaitable[List[FeedTweet]]],
+    ) -> List[FeedTweet]:
+        """Получение твитов новее since_id общим запросом к БД.
+
+        Args:
+            since_id (int): ID последнего полученного клиентом твита.
+            loader (Callable[[int], Awaitable[List[FeedTweet]]]): Запрос
+                твитов новее ID к БД.
+
+        Returns:
+            List[FeedTweet]: Твиты новее since_id.
+        """
+        fetch = self._fetches.get(since_id)
+        if fetch is None:
+            fetch = asyncio.ensure_future(loader(since_id))
+            self._fetches[since_id] = fetch
+            fetch.add_done_callback(
+                lambda _: self._fetches.pop(since_id, None),
+            )
+        tweets = await asyncio.shield(fetch)
+        self.observe(tweets[0].id if tweets else since_id)
+        return tweets
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        self._waiter = None
+
+
+# Пока слушатель событий других процессов не подключен, граница неполна
+feed_notifier = FeedNotifier(complete=False)
@@ -0,0 +1,67 @@
+"""Быстрые классы JSON ответов приложения.
+
+По умолчанию используется кодирование через orjson. Если библиотека
+не установлена, классы откатываются к стандартному JSONResponse.
+"""
+import json
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse  # noqa: N812
+
+    def dump_json(content: Any) -> bytes:
+        """Кодирование данных в JSON.
+
+        Args:
+            content (Any): Данные для кодирования.
+
+        Returns:
+            bytes: Байтовая строка JSON.
+        """
+        return orjson.dumps(content)
+
+else:  # pragma: no cover
+    FastJSONResponse = JSONResponse  # noqa: N816
+
+    def dump_json(content: Any) -> bytes:
+        """Кодирование данных в JSON.
+
+        Args:
+            content (Any): Данные для кодирования.
+
+        Returns:
+            bytes: Байтовая строка JSON.
+        """
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+class RawJSONResponse(Response):
+    """Ответ с заранее закодированным JSON телом."""
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        body: bytes,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+    ) -> None:
+        """Создание ответа без повторного кодирования тела.
+
+        Args:
+            body (bytes): Готовое JSON тело ответа.
+            status_code (int): HTTP статус ответа.
+            headers (Optional[dict]): Дополнительные хэдеры.
+        """
+        super().__init__(content=body, status_code=status_code, headers=headers)
@@ -0,0 +1,413 @@
+"""Метрики приложения в текстовом формате Prometheus.
+
+Реализация намеренно минимальна: значения хранятся в дочерних объектах
+со слотами, которые создаются один раз на набор значений меток, поэтому
+обновление метрики на горячем пути сводится к поиску в словаре и сложению.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Форматирование меток метрики.
+
+    Args:
+        names (Sequence[str]): Имена меток.
+        values (Sequence[str]): Значения меток.
+
+    Returns:
+        str: Метки в формате Prometheus или пустая строка.
+    """
+    if not names:
+        return ""
+    pairs = (
+        '{name}="{value}"'.format(
+            name=name,
+            value=str(value).replace("\\", "\\\\").replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class _ValueChild:
+    """Значение счетчика или шкалы для одного набора меток."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        """Увеличение значения.
+
+        Args:
+            amount (float): Величина увеличения.
+        """
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        """Уменьшение значения.
+
+        Args:
+            amount (float): Величина уменьшения.
+        """
+        self.value -= amount
+
+    def set(self, value: float) -> None:  # noqa: WPS125
+        """Установка значения.
+
+        Args:
+            value (float): Новое значение.
+        """
+        self.value = value
+
+
+class _HistogramChild:
+    """Гистограмма для одного набора меток."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0  # noqa: WPS125
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Добавление наблюдения.
+
+        Args:
+            value (float): Наблюдаемое значение.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """Базовая метрика с дочерними значениями по наборам меток."""
+
+    metric_type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        """Создание метрики.
+
+        Args:
+            name (str): Имя метрики.
+            documentation (str): Описание метрики.
+            labelnames (Sequence[str]): Имена меток.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str):
+        """Получение дочернего значения для набора меток.
+
+        Args:
+            values (str): Значения меток в порядке их имен.
+
+        Returns:
+            Дочернее значение метрики.
+        """
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> Iterable[str]:
+        """Строки метрики в формате Prometheus.
+
+        Yields:
+            str: Строка метрики.
+        """
+        yield "# HELP {name} {doc}".format(name=self.name, doc=self.documentation)
+        yield "# TYPE {name} {type}".format(name=self.name, type=self.metric_type)
+        for label_values, child in list(self._children.items()):
+            yield from self._render_child(label_values, child)
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def _render_child(self, label_values: LabelValues, child) -> Iterable[str]:
+        yield "{name}{labels} {value}".format(
+            name=self.name,
+            labels=_format_labels(self.labelnames, label_values),
+            value=float(child.value),
+        )
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик."""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1) -> None:
+        """Увеличение счетчика без меток.
+
+        Args:
+            amount (float): Величина увеличения.
+        """
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """Шкала с произвольным значением."""
+
+    metric_type = "gauge"
+
+    def inc(self, amount: float = 1) -> None:
+        """Увеличение шкалы без меток.
+
+        Args:
+            amount (float): Величина увеличения.
+        """
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        """Уменьшение шкалы без меток.
+
+        Args:
+            amount (float): Величина уменьшения.
+        """
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:  # noqa: WPS125
+        """Установка значения шкалы без меток.
+
+        Args:
+            value (float): Новое значение.
+        """
+        self._default.set(value)
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами корзин."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Создание гистограммы.
+
+        Args:
+            name (str): Имя метрики.
+            documentation (str): Описание метрики.
+            labelnames (Sequence[str]): Имена меток.
+            buckets (Sequence[float]): Верхние границы корзин.
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float) -> None:
+        """Добавление наблюдения в гистограмму без меток.
+
+        Args:
+            value (float): Наблюдаемое значение.
+        """
+        self._default.observe(value)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, label_values: LabelValues, child) -> Iterable[str]:
+        labelnames = self.labelnames + ("le",)
+        cumulative = 0
+        bounds = [str(float(bound)) for bound in self.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, child.counts):
+            cumulative += count
+            yield "{name}_bucket{labels} {value}".format(
+                name=self.name,
+                labels=_format_labels(labelnames, label_values + (bound,)),
+                value=cumulative,
+            )
+        labels = _format_labels(self.labelnames, label_values)
+        yield "{name}_sum{labels} {value}".format(
+            name=self.name,
+            labels=labels,
+            value=child.sum,
+        )
+        yield "{name}_count{labels} {value}".format(
+            name=self.name,
+            labels=labels,
+            value=child.count,
+        )
+
+
+class Registry:
+    """Реестр метрик и сборщиков значений на момент запроса."""
+
+    def __init__(self) -> None:
+        """Создание пустого реестра."""
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Регистрация метрики.
+
+        Args:
+            metric (_Metric): Метрика.
+
+        Returns:
+            _Metric: Зарегистрированная метрика.
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Добавление сборщика, обновляющего метрики перед выгрузкой.
+
+        Args:
+            collector (Callable[[], None]): Функция-сборщик.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Выгрузка всех метрик в текстовом формате Prometheus.
+
+        Returns:
+            str: Текст с метриками.
+        """
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.append("")
+        return "\n".join(lines)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "http_requests_total",
+    "Total number of HTTP requests.",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "http_requests_in_progress",
+    "Number of HTTP requests being processed.",
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency in seconds.",
+    ("method", "route", "status"),
+))
+DB_POOL_CHECKOUT_WAIT = REGISTRY.register(Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the DB pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+))
+DB_POOL_SIZE = REGISTRY.register(Gauge(
+    "db_pool_size",
+    "Configured size of the DB connection pool.",
+))
+DB_POOL_CHECKED_OUT = REGISTRY.register(Gauge(
+    "db_pool_checked_out_connections",
+    "Number of connections currently checked out from the DB pool.",
+))
+DB_POOL_OVERFLOW = REGISTRY.register(Gauge(
+    "db_pool_overflow_connections",
+    "Number of overflow connections opened beyond the pool size.",
+))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time in seconds.",
+))
+DB_SLOW_QUERIES_TOTAL = REGISTRY.register(Counter(
+    "db_slow_queries_total",
+    "Number of SQL statements slower than the slow query threshold.",
+))
+HTTP_REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries",
+    "Number of SQL statements executed per HTTP request.",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+))
+HTTP_REQUEST_DB_DURATION = REGISTRY.register(Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in SQL statements per HTTP request.",
+    ("method", "route"),
+))
+ADMISSION_ACTIVE_REQUESTS = REGISTRY.register(Gauge(
+    "admission_active_requests",
+    "Number of API requests admitted and being processed.",
+))
+ADMISSION_QUEUED_REQUESTS = REGISTRY.register(Gauge(
+    "admission_queued_requests",
+    "Number of API requests waiting in the admission queue.",
+))
+ADMISSION_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "admission_queue_wait_seconds",
+    "Time API requests spent waiting for admission.",
+    ("route_class",),
+))
+ADMISSION_SHED_TOTAL = REGISTRY.register(Counter(
+    "admission_shed_requests_total",
+    "Number of API requests rejected with 503 by admission control.",
+    ("route_class", "reason"),
+))
+RATE_LIMITED_TOTAL = REGISTRY.register(Counter(
+    "rate_limited_requests_total",
+    "Number of requests rejected with 429 by the per api-key rate limiter.",
+    ("route_class",),
+))
+STALE_RESPONSES_TOTAL = REGISTRY.register(Counter(
+    "stale_responses_total",
+    "Number of reads served from the stale cache instead of the database.",
+    ("cache",),
+))
+STREAM_SUBSCRIBERS = REGISTRY.register(Gauge(
+    "stream_subscribers",
+    "Number of clients connected to the event stream.",
+))
+STREAM_DROPPED_SUBSCRIBERS_TOTAL = REGISTRY.register(Counter(
+    "stream_dropped_subscribers_total",
+    "Number of stream clients disconnected for not keeping up with events.",
+))
+ARCHIVED_TWEETS_TOTAL = REGISTRY.register(Counter(
+    "archived_tweets_total",
+    "Number of tweets moved from the database to archive files.",
+))
+LIKE_BUFFER_PENDING = REGISTRY.register(Gauge(
+    "like_buffer_pending",
+    "Number of coalesced likes and unlikes waiting to be written.",
+))
+LIKE_BUFFER_FLUSHED_TOTAL = REGISTRY.register(Counter(
+    "like_buffer_flushed_total",
+    "Number of buffered likes and unlikes written to the database.",
+))
+TASKS_TOTAL = REGISTRY.register(Counter(
+    "tasks_total",
+    "Number of background task runs by kind and outcome.",
+    ("kind", "outcome"),
+))
+TASKS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "tasks_in_progress",
+    "Number of background tasks being executed.",
+))
+TASK_DURATION = REGISTRY.register(Histogram(
+    "task_duration_seconds",
+    "Background task execution time in seconds.",
+    ("kind",),
+))
@@ -0,0 +1,117 @@
+"""ASGI middleware для сбора метрик HTTP запросов."""
+import time
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from not_twitter.app.database import instrumentation
+from not_twitter.app.utils import metrics
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def get_server_timing(db_stats: instrumentation.RequestDBStats) -> str:
+    """Получение значения хэдера Server-Timing для SQL запросов.
+
+    Args:
+        db_stats (RequestDBStats): Статистика SQL запросов.
+
+    Returns:
+        str: Значение хэдера.
+    """
+    return 'db;dur={duration:.2f};desc="{count} queries"'.format(
+        duration=db_stats.db_time * 1000,
+        count=db_stats.query_count,
+    )
+
+
+class MetricsMiddleware:
+    """Счетчики, шкала и гистограмма задержек HTTP запросов.
+
+    Метки маршрута берутся из шаблона пути, а не из фактического пути,
+    чтобы количество рядов метрик оставалось ограниченным. Количество и
+    время SQL запросов обработчика также отдаются клиенту в хэдере
+    Server-Timing.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Создание middleware.
+
+        Args:
+            app (ASGIApp): Оборачиваемое приложение.
+        """
+        self.app = app
+        self._route_templates: Optional[Dict[Any, str]] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Обработка запроса со сбором метрик.
+
+        Args:
+            scope (Scope): ASGI scope.
+            receive (Receive): ASGI receive.
+            send (Send): ASGI send.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats_token = instrumentation.start_request_stats()
+        db_stats = instrumentation.get_request_stats()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if db_stats.query_count:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        get_server_timing(db_stats),
+                    )
+            await send(message)
+
+        metrics.HTTP_REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            instrumentation.finish_request_stats(stats_token)
+            metrics.HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = self.get_route_template(scope)
+            label_values = (scope["method"], route, str(status_code))
+            metrics.HTTP_REQUESTS_TOTAL.labels(*label_values).inc()
+            metrics.HTTP_REQUEST_DURATION.labels(*label_values).observe(duration)
+            metrics.HTTP_REQUEST_DB_QUERIES.labels(
+                scope["method"],
+                route,
+            ).observe(db_stats.query_count)
+            metrics.HTTP_REQUEST_DB_DURATION.labels(
+                scope["method"],
+                route,
+            ).observe(db_stats.db_time)
+
+    def get_route_template(self, scope: Scope) -> str:
+        """Получение шаблона пути маршрута, обработавшего запрос.
+
+        Args:
+            scope (Scope): ASGI scope после обработки запроса.
+
+        Returns:
+            str: Шаблон пути маршрута.
+        """
+        if self._route_templates is None:
+            self._route_templates = self._collect_route_templates(scope)
+        return self._route_templates.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+    @classmethod
+    def _collect_route_templates(cls, scope: Scope) -> Dict[Any, str]:
+        templates = {}
+        for route in scope["app"].routes:
+            if isinstance(route, Mount):
+                templates[route.app] = route.name or route.path or "/"
+            else:
+                templates[route.endpoint] = route.path
+        return templates
@@ -0,0 +1,275 @@
+"""Статистический профайлер для работающего процесса.
+
+Профайлер включается на ограниченное время и сэмплирует заданную долю
+HTTP запросов. Фоновый поток периодически снимает стек потока event loop
+и учитывает его, только если в этот момент выполняется задача одного из
+выбранных запросов. Результат отдается в свернутом формате стеков
+(folded stacks), который понимают flamegraph.pl и speedscope.
+
+В асинхронном режиме дополнительно считается разбивка времени выбранных
+запросов: ожидание БД, CPU в обработчиках, в драйвере БД и в сериализации.
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Set
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from not_twitter.app.database import instrumentation
+
+MODE_STACKS = "stacks"
+MODE_ASYNC = "async"
+MAX_STACK_DEPTH = 128
+
+SERIALIZATION_MODULES = ("pydantic", "orjson", "json", "fastapi/encoders")
+DB_DRIVER_MODULES = ("sqlalchemy", "asyncpg")
+FRAMEWORK_MODULES = ("starlette", "fastapi", "anyio", "asyncio", "uvicorn")
+
+
+def _classify_frame(frame) -> str:
+    """Определение категории CPU времени по самому глубокому кадру стека.
+
+    Args:
+        frame: Кадр стека.
+
+    Returns:
+        str: Категория времени.
+    """
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if "serialize_response" == frame.f_code.co_name:
+            return "cpu_serialization"
+        if any(module in filename for module in SERIALIZATION_MODULES):
+            return "cpu_serialization"
+        if any(module in filename for module in DB_DRIVER_MODULES):
+            return "cpu_db_driver"
+        if "not_twitter" in filename:
+            return "cpu_endpoint"
+        if not any(module in filename for module in FRAMEWORK_MODULES):
+            return "cpu_other"
+        frame = frame.f_back
+    return "cpu_framework"
+
+
+def _fold_stack(frame) -> str:
+    """Сворачивание стека в строку формата folded stacks.
+
+    Args:
+        frame: Самый глубокий кадр стека.
+
+    Returns:
+        str: Кадры от внешнего к внутреннему, разделенные ';'.
+    """
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append("{module}:{function}:{line}".format(
+            module=os.path.basename(code.co_filename),
+            function=code.co_name,
+            line=code.co_firstlineno,
+        ))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер потока event loop."""
+
+    def __init__(self) -> None:
+        """Создание выключенного профайлера."""
+        self.mode = MODE_STACKS
+        self.sample_rate = 0.0
+        self.interval = 0.005
+        self.deadline = 0.0
+        self.sampled_requests = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.breakdown: Dict[str, float] = Counter()
+        self._sampled_tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        """Включен ли профайлер.
+
+        Returns:
+            bool: Признак активного окна профилирования.
+        """
+        return time.monotonic() < self.deadline
+
+    def start(
+        self,
+        sample_rate: float,
+        duration: float,
+        interval: float,
+        mode: str = MODE_STACKS,
+    ) -> None:
+        """Включение профайлера на заданное окно времени.
+
+        Результаты предыдущего окна сбрасываются.
+
+        Args:
+            sample_rate (float): Доля профилируемых запросов от 0 до 1.
+            duration (float): Длительность окна в секундах.
+            interval (float): Интервал сэмплирования в секундах.
+            mode (str): Режим профилирования.
+        """
+        self.stop()
+        with self._lock:
+            self.stacks = Counter()
+            self.breakdown = Counter()
+            self.samples = 0
+            self.sampled_requests = 0
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.deadline = time.monotonic() + duration
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(threading.get_ident(), asyncio.get_running_loop()),
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Выключение профайлера с сохранением собранных данных."""
+        self.deadline = 0.0
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sampled_tasks.clear()
+
+    def should_sample(self) -> bool:
+        """Нужно ли профилировать очередной запрос.
+
+        Returns:
+            bool: Признак выбора запроса.
+        """
+        return self.active and random.random() < self.sample_rate
+
+    def track(self, task: asyncio.Task) -> None:
+        """Добавление задачи запроса в число профилируемых.
+
+        Args:
+            task (asyncio.Task): Задача запроса.
+        """
+        self._sampled_tasks.add(task)
+        self.sampled_requests += 1
+
+    def untrack(self, task: asyncio.Task, wall_time: float, db_time: float) -> None:
+        """Исключение задачи запроса из профилируемых.
+
+        Args:
+            task (asyncio.Task): Задача запроса.
+            wall_time (float): Полное время обработки запроса.
+            db_time (float): Время выполнения SQL запросов.
+        """
+        self._sampled_tasks.discard(task)
+        if self.mode == MODE_ASYNC:
+            with self._lock:
+                self.breakdown["wall"] += wall_time
+                self.breakdown["db_wait"] += db_time
+
+    def get_folded_stacks(self) -> str:
+        """Получение собранных стеков в формате folded stacks.
+
+        Returns:
+            str: Строки вида 'кадр;кадр;кадр количество'.
+        """
+        with self._lock:
+            stacks = list(self.stacks.items())
+        return "".join(
+            "{stack} {count}\n".format(stack=stack, count=count)
+            for stack, count in stacks
+        )
+
+    def get_breakdown(self) -> Dict[str, float]:
+        """Получение разбивки времени профилируемых запросов в секундах.
+
+        CPU время оценивается как количество сэмплов, умноженное
+        на интервал сэмплирования.
+
+        Returns:
+            Dict[str, float]: Время по категориям.
+        """
+        with self._lock:
+            breakdown = dict(self.breakdown)
+        cpu_time = sum(
+            seconds
+            for category, seconds in breakdown.items()
+            if category.startswith("cpu_")
+        )
+        if "wall" in breakdown:
+            breakdown["other_wait"] = max(
+                breakdown["wall"] - breakdown.get("db_wait", 0) - cpu_time,
+                0,
+            )
+        return breakdown
+
+    def _run(self, loop_thread_id: int, loop: asyncio.AbstractEventLoop) -> None:
+        while self.active and not self._stop_event.wait(self.interval):
+            task = asyncio.current_task(loop)
+            if task is None or task not in self._sampled_tasks:
+                continue
+            frame = sys._current_frames().get(loop_thread_id)  # noqa: WPS437
+            if frame is None:
+                continue
+            self._record(frame)
+
+    def _record(self, frame) -> None:
+        stack = _fold_stack(frame)
+        with self._lock:
+            self.samples += 1
+            self.stacks[stack] += 1
+            if self.mode == MODE_ASYNC:
+                self.breakdown[_classify_frame(frame)] += self.interval
+
+
+profiler = SamplingProfiler()
+
+
+class ProfilingMiddleware:
+    """Отметка задач выбранных для профилирования запросов."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Создание middleware.
+
+        Args:
+            app (ASGIApp): Оборачиваемое приложение.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Обработка запроса с профилированием выбранной доли запросов.
+
+        Args:
+            scope (Scope): ASGI scope.
+            receive (Receive): ASGI receive.
+            send (Send): ASGI send.
+        """
+        if scope["type"] != "http" or not profiler.should_sample():
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        profiler.track(task)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            db_stats = instrumentation.get_request_stats()
+            profiler.untrack(
+                task,
+                time.perf_counter() - start,
+                db_stats.db_time if db_stats else 0,
+            )
@@ -0,0 +1,375 @@
+"""Ограничение частоты запросов по api-key алгоритмом token bucket.
+
+Лимиты задаются для классов маршрутов и проверяются в middleware по
+хэдеру api-key или параметру api_key до обращения обработчика к БД. По умолчанию корзины
+хранятся в памяти процесса, для нескольких процессов приложения можно
+включить общее хранилище в PostgreSQL переменной RATE_LIMIT_BACKEND.
+
+Проверка выполняется до контроля допуска, поэтому общее хранилище
+выдает токены пачками по RATE_LIMIT_BATCH и обращается к БД не на
+каждый запрос, а при недоступной БД или исчерпанном пуле соединений
+корзины временно хранятся в памяти процесса. Api-key, еще не
+найденные по БД, сначала расходуют общую для них корзину класса
+размером в RATE_LIMIT_UNKNOWN_KEYS_SCALE лимитов одного ключа, поэтому
+перебор выдуманных ключей не обходит ограничение.
+"""
+import hashlib
+import logging
+import math
+import os
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from not_twitter.app.database import crud_operations, database
+from not_twitter.app.utils import (
+    api_key_ckecker,
+    metrics,
+    route_classes,
+    standard_responses,
+)
+
+BACKEND_MEMORY = "memory"
+BACKEND_POSTGRES = "postgres"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", BACKEND_MEMORY)
+# Формат: класс=запросов_в_секунду:размер_корзины через запятую
+DEFAULT_RATE_LIMITS = (
+    "auth=10:20,write=5:20,media_upload=1:5,read=20:40,feed=5:20,"
+    "long_poll=2:10,stream=0.2:5,batch=2:10"
+)
+RATE_LIMITS = os.getenv("RATE_LIMITS", DEFAULT_RATE_LIMITS)
+RATE_LIMIT_BATCH = int(os.getenv("RATE_LIMIT_BATCH", "5"))
+RATE_LIMIT_UNKNOWN_KEYS_SCALE = float(
+    os.getenv("RATE_LIMIT_UNKNOWN_KEYS_SCALE", "10"),
+)
+EVICTION_INTERVAL = 60
+# Время, в течение которого процесс расходует полученные из БД токены
+LEASE_TTL = 1
+# Корзина api-key, еще не найденных по БД; middleware пустые ключи
+# не проверяет, поэтому с настоящим ключом она не совпадает
+UNKNOWN_KEY = ""
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimit(NamedTuple):
+    """Лимит класса маршрутов."""
+
+    rate: float
+    burst: float
+
+
+def parse_limits(limits: str) -> Dict[str, RateLimit]:
+    """Разбор лимитов вида 'feed=5:20,write=5:20'.
+
+    Args:
+        limits (str): Строка с лимитами.
+
+    Returns:
+        Dict[str, RateLimit]: Лимиты по классам маршрутов.
+    """
+    parsed = {}
+    for item in limits.split(","):
+        if not item.strip():
+            continue
+        route_class, limit = item.split("=")
+        rate, burst = limit.split(":")
+        parsed[route_class.strip()] = RateLimit(float(rate), float(burst))
+    return parsed
+
+
+class _Bucket:
+    """Состояние корзины одного ключа."""
+
+    __slots__ = ("tokens", "updated", "full_at")
+
+    def __init__(self) -> None:
+        self.tokens = 0.0
+        self.updated = 0.0
+        self.full_at = 0.0
+
+    def update(self, tokens: float, now: float, limit: RateLimit) -> None:
+        """Сохранение количества токенов.
+
+        Args:
+            tokens (float): Количество токенов.
+            now (float): Текущее время.
+            limit (RateLimit): Лимит класса маршрута.
+        """
+        self.tokens = tokens
+        self.updated = now
+        self.full_at = now + (limit.burst - tokens) / limit.rate
+
+
+class MemoryBackend:
+    """Хранилище корзин в памяти процесса.
+
+    Полные корзины не отличаются от отсутствующих, поэтому периодически
+    удаляются без потери точности.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        """Создание хранилища.
+
+        Args:
+            clock (Callable[[], float]): Источник времени в секундах.
+        """
+        self.clock = clock
+        self.buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._next_eviction = clock() + EVICTION_INTERVAL
+
+    async def consume(
+        self,
+        route_class: str,
+        api_key: str,
+        limit: RateLimit,
+    ) -> float:
+        """Списание одного токена из корзины ключа.
+
+        Args:
+            route_class (str): Класс маршрута.
+            api_key (str): Api-key пользователя.
+            limit (RateLimit): Лимит класса маршрута.
+
+        Returns:
+            float: 0, если запрос разрешен, иначе время до появления токена.
+        """
+        now = self.clock()
+        if now >= self._next_eviction:
+            self.evict(now)
+
+        bucket = self.buckets.get((route_class, api_key))
+        if bucket is None:
+            bucket = _Bucket()
+            self.buckets[(route_class, api_key)] = bucket
+            tokens = limit.burst
+        else:
+            tokens = min(
+                limit.burst,
+                bucket.tokens + (now - bucket.updated) * limit.rate,
+            )
+        if tokens >= 1:
+            bucket.update(tokens - 1, now, limit)
+            return 0
+        bucket.update(tokens, now, limit)
+        return (1 - tokens) / limit.rate
+
+    def evict(self, now: float) -> None:
+        """Удаление заполнившихся корзин.
+
+        Args:
+            now (float): Текущее время.
+        """
+        self.buckets = {
+            key: bucket
+            for key, bucket in self.buckets.items()
+            if bucket.full_at > now
+        }
+        self._next_eviction = now + EVICTION_INTERVAL
+
+
+class PostgresBackend:
+    """Общее для процессов хранилище корзин в таблице PostgreSQL.
+
+    Токены берутся из таблицы пачками и расходуются процессом не дольше
+    LEASE_TTL. При ошибке БД или исчерпанном пуле соединений запрос
+    проверяется по корзинам в памяти процесса.
+    """
+
+    def __init__(
+        self,
+        batch: int = RATE_LIMIT_BATCH,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Создание хранилища.
+
+        Args:
+            batch (int): Количество токенов, получаемых из БД за раз.
+            clock (Callable[[], float]): Источник времени в секундах.
+        """
+        self.batch = batch
+        self.clock = clock
+        self.fallback = MemoryBackend(clock)
+        self.leases: Dict[str, Tuple[int, float]] = {}
+        self._next_eviction = clock() + EVICTION_INTERVAL
+
+    async def consume(
+        self,
+        route_class: str,
+        api_key: str,
+        limit: RateLimit,
+    ) -> float:
+        """Списание одного токена из корзины ключа.
+
+        Args:
+            route_class (str): Класс маршрута.
+            api_key (str): Api-key пользователя.
+            limit (RateLimit): Лимит класса маршрута.
+
+        Returns:
+            float: 0, если запрос разрешен, иначе время до появления токена.
+        """
+        now = self.clock()
+        if now >= self._next_eviction:
+            self.evict(now)
+
+        key = "{route_class}:{digest}".format(
+            route_class=route_class,
+            digest=hashlib.sha256(api_key.encode()).hexdigest()[:32],
+        )
+        tokens, expires_at = self.leases.pop(key, (0, 0.0))
+        if tokens and now < expires_at:
+            if tokens > 1:
+                self.leases[key] = (tokens - 1, expires_at)
+            return 0
+        if database.is_pool_exhausted():
+            return await self.fallback.consume(route_class, api_key, limit)
+        try:
+            tokens = await crud_operations.take_rate_limit_tokens(
+                key,
+                limit.rate,
+                limit.burst,
+                self.batch,
+            )
+        except api_key_ckecker.DB_UNAVAILABLE_ERRORS as exc:
+            logger.warning("Rate limit bucket is unavailable: %s", exc)
+            return await self.fallback.consume(route_class, api_key, limit)
+        if not tokens:
+            return 1 / limit.rate
+        if tokens > 1:
+            self.leases[key] = (tokens - 1, now + LEASE_TTL)
+        return 0
+
+    def evict(self, now: float) -> None:
+        """Удаление истекших пачек токенов.
+
+        Args:
+            now (float): Текущее время.
+        """
+        self.leases = {
+            key: lease
+            for key, lease in self.leases.items()
+            if lease[1] > now
+        }
+        self._next_eviction = now + EVICTION_INTERVAL
+
+
+class RateLimiter:
+    """Проверка лимитов классов маршрутов."""
+
+    def __init__(
+        self,
+        backend,
+        limits: Dict[str, RateLimit],
+        unknown_keys_scale: float = RATE_LIMIT_UNKNOWN_KEYS_SCALE,
+    ) -> None:
+        """Создание ограничителя.
+
+        Args:
+            backend: Хранилище корзин.
+            limits (Dict[str, RateLimit]): Лимиты по классам маршрутов.
+            unknown_keys_scale (float): Размер общей корзины еще не
+                найденных по БД api-key в лимитах одного ключа.
+        """
+        self.backend = backend
+        self.limits = limits
+        self.unknown_limits = {
+            route_class: RateLimit(
+                limit.rate * unknown_keys_scale,
+                limit.burst * unknown_keys_scale,
+            )
+            for route_class, limit in limits.items()
+        }
+
+    async def check(self, route_class: str, api_key: str) -> float:
+        """Проверка и учет запроса.
+
+        Args:
+            route_class (str): Класс маршрута.
+            api_key (str): Api-key пользователя.
+
+        Returns:
+            float: 0, если запрос разрешен, иначе время до появления токена.
+        """
+        limit = self.limits.get(route_class)
+        if limit is None:
+            return 0
+        if not api_key_ckecker.is_known_key(api_key):
+            retry_after = await self.backend.consume(
+                route_class,
+                UNKNOWN_KEY,
+                self.unknown_limits[route_class],
+            )
+            if retry_after:
+                return retry_after
+        return await self.backend.consume(route_class, api_key, limit)
+
+
+def get_backend(name: str):
+    """Создание хранилища корзин по имени.
+
+    Args:
+        name (str): Имя хранилища.
+
+    Returns:
+        Хранилище корзин.
+
+    Raises:
+        ValueError: Неизвестное имя хранилища.
+    """
+    if name == BACKEND_MEMORY:
+        return MemoryBackend()
+    if name == BACKEND_POSTGRES:
+        return PostgresBackend()
+    raise ValueError("Unknown rate limit backend: {name}".format(name=name))
+
+
+limiter = RateLimiter(get_backend(RATE_LIMIT_BACKEND), parse_limits(RATE_LIMITS))
+
+
+class RateLimitMiddleware:
+    """Отказ со статусом 429 при превышении лимита api-key."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Создание middleware.
+
+        Args:
+            app (ASGIApp): Оборачиваемое приложение.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Обработка запроса с проверкой лимита.
+
+        Args:
+            scope (Scope): ASGI scope.
+            receive (Receive): ASGI receive.
+            send (Send): ASGI send.
+        """
+        api_key: Optional[str] = None
+        if scope["type"] == "http":
+            api_key = Headers(scope=scope).get("api-key")
+            # Клиенты без поддержки хэдеров передают ключ потока событий
+            # в параметре запроса
+            if not api_key and b"api_key=" in scope["query_string"]:
+                api_key = QueryParams(scope["query_string"]).get("api_key")
+        if not api_key:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = route_classes.classify_request(
+            scope["method"],
+            scope["path"],
+            scope["query_string"],
+        )
+        retry_after = await limiter.check(route_class, api_key)
+        if retry_after:
+            metrics.RATE_LIMITED_TOTAL.labels(route_class).inc()
+            response = standard_responses.get_too_many_requests_response(
+                math.ceil(retry_after),
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
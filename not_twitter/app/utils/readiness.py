@@ -0,0 +1,61 @@
+"""Проверки готовности процесса принимать трафик.
+
+Модули регистрируют асинхронные проверки в общем реестре, а эндпоинт
+/readyz выполняет их все параллельно. Проверка, завершившаяся ошибкой
+или не уложившаяся в таймаут, считается непройденной.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict
+
+CHECK_TIMEOUT = float(os.getenv("READINESS_CHECK_TIMEOUT_MS", "1000")) / 1000
+
+ReadinessCheck = Callable[[], Awaitable[bool]]
+
+
+async def _run_check(check: ReadinessCheck) -> bool:
+    """Выполнение одной проверки с таймаутом.
+
+    Args:
+        check (ReadinessCheck): Проверка готовности.
+
+    Returns:
+        bool: Пройдена ли проверка.
+    """
+    try:
+        return bool(await asyncio.wait_for(check(), CHECK_TIMEOUT))
+    except Exception:  # noqa: B902
+        return False
+
+
+class ReadinessRegistry:
+    """Реестр проверок готовности."""
+
+    def __init__(self) -> None:
+        """Создание пустого реестра."""
+        self._checks: Dict[str, ReadinessCheck] = {}
+
+    def register(self, name: str, check: ReadinessCheck) -> None:
+        """Регистрация проверки.
+
+        Args:
+            name (str): Имя проверки в ответе /readyz.
+            check (ReadinessCheck): Корутинная функция, возвращающая признак
+                готовности.
+        """
+        self._checks[name] = check
+
+    async def run(self) -> Dict[str, bool]:
+        """Выполнение всех проверок.
+
+        Returns:
+            Dict[str, bool]: Результаты проверок по именам.
+        """
+        names = list(self._checks)
+        results = await asyncio.gather(
+            *(_run_check(self._checks[name]) for name in names),
+        )
+        return dict(zip(names, results))
+
+
+REGISTRY = ReadinessRegistry()
@@ -0,0 +1,85 @@
+"""Классификация HTTP запросов по классам маршрутов.
+
+Класс определяется по методу и пути до маршрутизации, поэтому его могут
+использовать middleware, работающие раньше обработчиков: контроль
+допуска запросов и ограничение частоты запросов. Запрос ленты с
+ожиданием новых твитов выделен в отдельный класс long_poll: он большую
+часть времени ждет без обращения к БД и не должен занимать место
+обычных запросов в контроле допуска. По той же причине отдельный класс
+stream у долгоживущего потока событий. Пакетный запрос относится к
+классу batch, а его подзапросы учитываются по своим классам.
+"""
+from urllib.parse import parse_qsl
+
+AUTH = "auth"
+WRITE = "write"
+READ = "read"
+FEED = "feed"
+MEDIA_UPLOAD = "media_upload"
+SERVICE = "service"
+STATIC = "static"
+LONG_POLL = "long_poll"
+STREAM = "stream"
+BATCH = "batch"
+
+API_PREFIX = "/api/"
+SERVICE_PATHS = ("/healthz", "/readyz", "/metrics")
+ADMIN_PREFIX = "/api/admin/"
+FEED_PATH = "/api/tweets"
+MEDIA_PATH = "/api/medias"
+AUTH_PATH = "/api/users/me"
+STREAM_PATH = "/api/stream"
+BATCH_PATH = "/api/batch"
+
+
+def _is_long_poll(query_string: bytes) -> bool:
+    """Проверка наличия в запросе ленты ожидания новых твитов.
+
+    Args:
+        query_string (bytes): Строка параметров запроса.
+
+    Returns:
+        bool: True, если задано положительное время ожидания.
+    """
+    if b"wait=" not in query_string:
+        return False
+    for name, value in parse_qsl(query_string.decode("latin-1")):
+        if name == "wait":
+            try:
+                return float(value) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def classify_request(method: str, path: str, query_string: bytes = b"") -> str:
+    """Определение класса маршрута запроса.
+
+    Args:
+        method (str): HTTP метод.
+        path (str): Путь запроса.
+        query_string (bytes): Строка параметров запроса.
+
+    Returns:
+        str: Класс маршрута.
+    """
+    path = path.rstrip("/") or "/"
+    if path in SERVICE_PATHS or path.startswith(ADMIN_PREFIX):
+        return SERVICE
+    if not path.startswith(API_PREFIX):
+        return STATIC
+    if method == "GET":
+        if path == FEED_PATH:
+            if _is_long_poll(query_string):
+                return LONG_POLL
+            return FEED
+        if path == AUTH_PATH:
+            return AUTH
+        if path == STREAM_PATH:
+            return STREAM
+        return READ
+    if method == "POST" and path == MEDIA_PATH:
+        return MEDIA_UPLOAD
+    if method == "POST" and path == BATCH_PATH:
+        return BATCH
+    return WRITE
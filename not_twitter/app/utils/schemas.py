@@ -1,8 +1,9 @@
 """Pydantic схемы для верификации данных."""
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class BaseUser(BaseModel):
@@ -35,6 +36,7 @@ class ProfileResponse(Response):
     model_config = ConfigDict(from_attributes=True)
 
     user: UserProfile
+    stale: bool = False
 
 
 class FailResponse(Response):
@@ -69,6 +71,27 @@ class TweetsResponse(Response):
     """Модель ответа со списком твитов."""
 
     tweets: List[Tweet]
+    stale: bool = False
+
+
+class ArchivedMedia(BaseModel):
+    """Модель сведений о медиа архивного твита."""
+
+    id: int
+    size: int
+
+
+class ArchivedTweet(Tweet):
+    """Модель архивного твита."""
+
+    created_at: datetime
+    medias: List[ArchivedMedia]
+
+
+class ArchivedTweetResponse(Response):
+    """Модель ответа с архивным твитом."""
+
+    tweet: ArchivedTweet
 
 
 class TweetCreatedResponse(Response):
@@ -81,3 +104,54 @@ class MediaUploadedResponse(Response):
     """Модель ответа при успешной загрузке медиа."""
 
     media_id: int
+
+
+class ReadinessResponse(Response):
+    """Модель ответа с результатами проверок готовности."""
+
+    checks: Dict[str, bool]
+
+
+class ProfilingSettings(BaseModel):
+    """Модель настроек окна профилирования."""
+
+    sample_rate: float = Field(default=0.1, gt=0, le=1)
+    duration: float = Field(default=30, gt=0, le=3600)
+    interval_ms: float = Field(default=5, ge=1, le=1000)
+    mode: str = Field(default="stacks", pattern="^(stacks|async)$")
+
+
+class ProfilingStatusResponse(Response):
+    """Модель ответа с состоянием профайлера."""
+
+    active: bool
+    mode: str
+    sample_rate: float
+    sampled_requests: int
+    samples: int
+    breakdown: Dict[str, float]
+
+
+class BatchSubRequest(BaseModel):
+    """Модель подзапроса пакетного запроса."""
+
+    path: str = Field(description="Путь GET запроса к API с параметрами")
+
+
+class BatchRequest(BaseModel):
+    """Модель пакетного запроса."""
+
+    requests: List[BatchSubRequest]
+
+
+class BatchSubResponse(BaseModel):
+    """Модель ответа на подзапрос пакетного запроса."""
+
+    status: int
+    body: Any
+
+
+class BatchResponse(Response):
+    """Модель ответа на пакетный запрос."""
+
+    responses: List[BatchSubResponse]
@@ -0,0 +1,170 @@
+"""Отдача устаревших данных чтения при медленной или перегруженной БД.
+
+Кэш хранит последний успешный результат чтения по ключу. Если запрос к
+БД не уложился в срок или пул соединений исчерпан, обработчик получает
+сохраненный результат с признаком устаревания вместо ожидания. Не
+уложившийся в срок запрос продолжает выполняться в фоне и обновляет
+кэш, пока он не завершится, новые запросы по этому ключу к БД не идут.
+Кэш применяется к телам ответов ленты и профилей. Api-key этих
+запросов при деградации БД проверяется по результату прошлой проверки
+в api_key_ckecker.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from not_twitter.app.database import database
+from not_twitter.app.utils import metrics
+
+READ_DEADLINE = float(os.getenv("STALE_READ_DEADLINE_MS", "300")) / 1000
+MAX_ENTRIES = int(os.getenv("STALE_CACHE_MAX_ENTRIES", "10000"))
+STALE_HEADER = "X-Stale"
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry(NamedTuple):
+    value: Any
+    stored_at: float
+
+
+class StaleCache:
+    """Последние успешные результаты чтения с отдачей при деградации БД."""
+
+    def __init__(
+        self,
+        name: str,
+        deadline: float = READ_DEADLINE,
+        max_entries: int = MAX_ENTRIES,
+        overloaded: Callable[[], bool] = database.is_pool_exhausted,
+    ) -> None:
+        """Создание кэша.
+
+        Args:
+            name (str): Имя кэша для метрик.
+            deadline (float): Срок ожидания результата из БД, секунд.
+            max_entries (int): Максимум хранимых ключей.
+            overloaded (Callable[[], bool]): Проверка исчерпания пула.
+        """
+        self.name = name
+        self.deadline = deadline
+        self.max_entries = max_entries
+        self.overloaded = overloaded
+        self.entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.refreshing: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, Optional[float]]:
+        """Получение результата чтения.
+
+        Пустые результаты (None) не кэшируются. Если устаревшего
+        результата нет, запрос ждет БД без ограничения срока.
+
+        Args:
+            key (Hashable): Ключ результата.
+            loader (Callable[[], Awaitable[Any]]): Чтение из БД.
+
+        Returns:
+            Tuple[Any, Optional[float]]: Результат и возраст устаревшего
+            результата в секундах или None для свежего.
+
+        Raises:
+            PoolTimeoutError: Пул исчерпан и устаревшего результата нет.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and (key in self.refreshing or self.overloaded()):
+            return self._serve_stale(key, entry)
+
+        task = self.refreshing.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+        try:
+            value = await asyncio.wait_for(asyncio.shield(task), self.deadline)
+        except asyncio.TimeoutError:
+            entry = self.entries.get(key)
+            if entry is None:
+                return await asyncio.shield(task), None
+            self._refresh_in_background(key, task)
+            return self._serve_stale(key, entry)
+        except PoolTimeoutError:
+            entry = self.entries.get(key)
+            if entry is None:
+                raise
+            return self._serve_stale(key, entry)
+        return value, None
+
+    def clear(self) -> None:
+        """Удаление сохраненных результатов."""
+        self.entries.clear()
+
+    async def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        value = await loader()
+        if value is not None:
+            self.entries[key] = _Entry(value, time.monotonic())
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def _serve_stale(
+        self,
+        key: Hashable,
+        entry: _Entry,
+    ) -> Tuple[Any, float]:
+        metrics.STALE_RESPONSES_TOTAL.labels(self.name).inc()
+        self.entries.move_to_end(key)
+        return entry.value, max(time.monotonic() - entry.stored_at, 0)
+
+    def _refresh_in_background(self, key: Hashable, task: asyncio.Task) -> None:
+        if key in self.refreshing:
+            return
+        self.refreshing[key] = task
+        task.add_done_callback(
+            lambda done: self._finish_refresh(key, done),
+        )
+
+    def _finish_refresh(self, key: Hashable, task: asyncio.Task) -> None:
+        self.refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(
+                "Background refresh of %s cache failed",
+                self.name,
+                exc_info=task.exception(),
+            )
+
+
+def set_stale_headers(headers, age: float) -> None:
+    """Пометка ответа с устаревшими данными.
+
+    Args:
+        headers: Хэдеры ответа.
+        age (float): Возраст данных в секундах.
+    """
+    headers[STALE_HEADER] = "true"
+    headers["Age"] = str(int(age))
+
+
+feed_cache = StaleCache("feed", max_entries=1)
+profile_cache = StaleCache("profile")
+CACHES = (feed_cache, profile_cache)
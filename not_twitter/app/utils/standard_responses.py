@@ -1,9 +1,58 @@
-"""Набор готовых стандартных JSONRespone."""
+"""Набор готовых стандартных JSONRespone.
+
+Постоянные части тел ответов закодированы заранее, чтобы не гонять
+одни и те же словари через JSON кодировщик на каждый запрос.
+"""
 from fastapi import status
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
+
+from not_twitter.app.utils.json_responses import RawJSONResponse, dump_json
+
+SUCCESS_BODY = dump_json({"result": True})
+UNAUTHORIZED_BODY = dump_json({
+    "result": False,
+    "error_type": "Authentication error",
+    "error_message": "Api-key for existing user is required",
+})
+NOT_FOUND_BODY_PREFIX = b'{"result":false,"error_type":"Not found error","error_message":'
+SERVICE_UNAVAILABLE_BODY = dump_json({
+    "result": False,
+    "error_type": "Service unavailable error",
+    "error_message": "Server is overloaded, retry later",
+})
+TOO_MANY_REQUESTS_BODY = dump_json({
+    "result": False,
+    "error_type": "Rate limit error",
+    "error_message": "Too many requests for this api-key, retry later",
+})
+INTERNAL_ERROR_BODY = dump_json({
+    "result": False,
+    "error_type": "Internal server error",
+    "error_message": "Request failed unexpectedly",
+})
+EMPTY_FEED_BODY = dump_json({"result": True, "tweets": [], "stale": False})
+FORBIDDEN_BODY_PREFIX = (
+    b'{"result":false,"error_type":"Forbidden operation error","error_message":'
+)
+BAD_REQUEST_BODY_PREFIX = (
+    b'{"result":false,"error_type":"Bad request error","error_message":'
+)
+
 
+def _get_error_body(prefix: bytes, message: str) -> bytes:
+    """Сборка тела ответа об ошибке из готового префикса и сообщения.
 
-def get_not_found_response(message: str) -> JSONResponse:
+    Args:
+        prefix (bytes): Закодированное начало тела ответа.
+        message (str): Сообщение об ошибке.
+
+    Returns:
+        bytes: Тело ответа.
+    """
+    return b"".join((prefix, dump_json(message), b"}"))
+
+
+def get_not_found_response(message: str) -> Response:
     """Получить готовый ответ для статуса 404.
 
     Args:
@@ -12,17 +61,13 @@ def get_not_found_response(message: str) -> JSONResponse:
     Returns:
         Готовый JSONResponse
     """
-    return JSONResponse(
+    return RawJSONResponse(
+        _get_error_body(NOT_FOUND_BODY_PREFIX, message),
         status_code=status.HTTP_404_NOT_FOUND,
-        content={
-            "result": False,
-            "error_type": "Not found error",
-            "error_message": message,
-        },
     )
 
 
-def get_forbidden_response(message: str) -> JSONResponse:
+def get_forbidden_response(message: str) -> Response:
     """Получить готовый ответ для статуса 403.
 
     Args:
@@ -31,23 +76,96 @@ def get_forbidden_response(message: str) -> JSONResponse:
     Returns:
         Готовый JSONResponse
     """
-    return JSONResponse(
+    return RawJSONResponse(
+        _get_error_body(FORBIDDEN_BODY_PREFIX, message),
         status_code=status.HTTP_403_FORBIDDEN,
-        content={
-            "result": False,
-            "error_type": "Forbidden operation error",
-            "error_message": message,
-        },
     )
 
 
-def get_success_response() -> JSONResponse:
-    """Получить готовый простой ответ для статуса 200.
+def get_bad_request_response(message: str) -> Response:
+    """Получить готовый ответ для статуса 400.
+
+    Args:
+        message (str): Желаемое сообщение об ошибке.
+
+    Returns:
+        Готовый JSONResponse
+    """
+    return RawJSONResponse(
+        _get_error_body(BAD_REQUEST_BODY_PREFIX, message),
+        status_code=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def get_unauthorized_response() -> Response:
+    """Получить готовый ответ для статуса 401.
+
+    Returns:
+        Готовый JSONResponse
+    """
+    return RawJSONResponse(
+        UNAUTHORIZED_BODY,
+        status_code=status.HTTP_401_UNAUTHORIZED,
+    )
+
+
+def get_service_unavailable_response(retry_after: int) -> Response:
+    """Получить готовый ответ для статуса 503.
+
+    Args:
+        retry_after (int): Через сколько секунд клиенту повторить запрос.
 
     Returns:
         Готовый JSONResponse
     """
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content={"result": True},
+    return RawJSONResponse(
+        SERVICE_UNAVAILABLE_BODY,
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(retry_after)},
     )
+
+
+def get_too_many_requests_response(retry_after: int) -> Response:
+    """Получить готовый ответ для статуса 429.
+
+    Args:
+        retry_after (int): Через сколько секунд клиенту повторить запрос.
+
+    Returns:
+        Готовый JSONResponse
+    """
+    return RawJSONResponse(
+        TOO_MANY_REQUESTS_BODY,
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def get_internal_error_response() -> Response:
+    """Получить готовый ответ для статуса 500.
+
+    Returns:
+        Готовый JSONResponse
+    """
+    return RawJSONResponse(
+        INTERNAL_ERROR_BODY,
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    )
+
+
+def get_success_response() -> Response:
+    """Получить готовый простой ответ для статуса 200.
+
+    Returns:
+        Готовый JSONResponse
+    """
+    return RawJSONResponse(SUCCESS_BODY, status_code=status.HTTP_200_OK)
+
+
+def get_empty_feed_response() -> Response:
+    """Получить готовый ответ с пустой лентой для статуса 200.
+
+    Returns:
+        Готовый JSONResponse
+    """
+    return RawJSONResponse(EMPTY_FEED_BODY, status_code=status.HTTP_200_OK)
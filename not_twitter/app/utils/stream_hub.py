@@ -0,0 +1,397 @@
+"""Публикация событий ленты подписчикам потока /api/stream.
+
+CRUD операции публикуют события о новых твитах, лайках и удалениях в
+хаб процесса. Хаб кодирует событие в кадр Server-Sent Events один раз
+и раскладывает его по ограниченным очередям подписчиков. Подписчик, не
+успевающий забирать события, отключается, клиент переподключается и
+догружает ленту по since_id. Одновременно у одного api-key может быть
+не больше STREAM_MAX_PER_KEY потоков процесса.
+
+Между процессами приложения события передаются через PostgreSQL
+NOTIFY: уведомление отправляется в транзакции записи и доставляется
+только после ее коммита. Каждый процесс слушает канал отдельным
+соединением и пропускает собственные уведомления. Массовый импорт
+отправляет в канал событие import, по которому процессы сбрасывают
+границу ID твитов ленты, подписчикам потока оно не передается.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from not_twitter.app.database import shards
+from not_twitter.app.utils import metrics
+from not_twitter.app.utils.feed_notifier import FeedNotifier, feed_notifier
+from not_twitter.app.utils.json_responses import dump_json
+
+QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "100"))
+HEARTBEAT_INTERVAL = float(os.getenv("STREAM_HEARTBEAT_SEC", "15"))
+MAX_STREAMS_PER_KEY = int(os.getenv("STREAM_MAX_PER_KEY", "3"))
+PG_NOTIFY = os.getenv("STREAM_PG_NOTIFY", "1") == "1"
+RECONNECT_DELAY = 1
+CHANNEL = "not_twitter_events"
+# Лимит PostgreSQL на размер уведомления 8000 байт
+MAX_NOTIFY_PAYLOAD = 7900
+ORIGIN = uuid.uuid4().hex
+
+EVENT_TWEET = "tweet"
+EVENT_DELETE = "delete"
+EVENT_LIKE = "like"
+EVENT_UNLIKE = "unlike"
+EVENT_IMPORT = "import"
+
+NOTIFY_QUERY = text("SELECT pg_notify(:channel, :payload)")
+HEARTBEAT_FRAME = b": ping\n\n"
+RETRY_FRAME = b"retry: 3000\n\n"
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+
+logger = logging.getLogger(__name__)
+
+
+def tweet_created_event(
+    tweet_id: int,
+    content: str,
+    attachments: Optional[List[str]],
+    author_id: int,
+    author_name: str,
+) -> Dict[str, Any]:
+    """Событие создания твита в формате твита ленты.
+
+    Args:
+        tweet_id (int): ID твита.
+        content (str): Содержимое твита.
+        attachments (Optional[List[str]]): Ссылки на медиа твита.
+        author_id (int): ID автора.
+        author_name (str): Имя автора.
+
+    Returns:
+        Dict[str, Any]: Событие.
+    """
+    return {
+        "type": EVENT_TWEET,
+        "tweet_id": tweet_id,
+        "tweet": {
+            "id": tweet_id,
+            "content": content,
+            "attachments": attachments,
+            "author": {"id": author_id, "name": author_name},
+            "likes": [],
+        },
+    }
+
+
+def tweet_deleted_event(tweet_id: int) -> Dict[str, Any]:
+    """Событие удаления твита.
+
+    Args:
+        tweet_id (int): ID твита.
+
+    Returns:
+        Dict[str, Any]: Событие.
+    """
+    return {"type": EVENT_DELETE, "tweet_id": tweet_id}
+
+
+def like_event(tweet_id: int, user_id: int, name: str) -> Dict[str, Any]:
+    """Событие лайка твита.
+
+    Args:
+        tweet_id (int): ID твита.
+        user_id (int): ID поставившего лайк пользователя.
+        name (str): Имя поставившего лайк пользователя.
+
+    Returns:
+        Dict[str, Any]: Событие.
+    """
+    return {
+        "type": EVENT_LIKE,
+        "tweet_id": tweet_id,
+        "user_id": user_id,
+        "name": name,
+        "delta": 1,
+    }
+
+
+def unlike_event(tweet_id: int, user_id: int) -> Dict[str, Any]:
+    """Событие снятия лайка с твита.
+
+    Args:
+        tweet_id (int): ID твита.
+        user_id (int): ID снявшего лайк пользователя.
+
+    Returns:
+        Dict[str, Any]: Событие.
+    """
+    return {
+        "type": EVENT_UNLIKE,
+        "tweet_id": tweet_id,
+        "user_id": user_id,
+        "delta": -1,
+    }
+
+
+def get_notify_payload(event: Dict[str, Any]) -> str:
+    """Уведомление PostgreSQL NOTIFY с событием этого процесса.
+
+    Твит, не помещающийся в уведомление, передается только по ID.
+
+    Args:
+        event (Dict[str, Any]): Событие.
+
+    Returns:
+        str: Текст уведомления.
+    """
+    payload = json.dumps({"origin": ORIGIN, "event": event})
+    if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+        event = {"type": event["type"], "tweet_id": event["tweet_id"]}
+        payload = json.dumps({"origin": ORIGIN, "event": event})
+    return payload
+
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    """Кодирование события в кадр Server-Sent Events.
+
+    Args:
+        event (Dict[str, Any]): Событие.
+
+    Returns:
+        bytes: Кадр события.
+    """
+    return b"".join((
+        b"event: ",
+        event["type"].encode(),
+        b"\ndata: ",
+        dump_json(event),
+        b"\n\n",
+    ))
+
+
+class Subscriber:
+    """Подписчик потока событий с ограниченной очередью кадров."""
+
+    def __init__(self, queue_size: int, api_key: str = "") -> None:
+        """Создание подписчика.
+
+        Args:
+            queue_size (int): Максимум неотправленных кадров.
+            api_key (str): Api-key подписчика.
+        """
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.api_key = api_key
+        self.overflowed = False
+
+
+class StreamHub:
+    """Раздача событий подписчикам процесса."""
+
+    def __init__(
+        self,
+        queue_size: int = QUEUE_SIZE,
+        max_streams_per_key: int = MAX_STREAMS_PER_KEY,
+    ) -> None:
+        """Создание хаба.
+
+        Args:
+            queue_size (int): Максимум неотправленных кадров подписчика.
+            max_streams_per_key (int): Максимум подписчиков одного api-key.
+        """
+        self.queue_size = queue_size
+        self.max_streams_per_key = max_streams_per_key
+        self.subscribers: Set[Subscriber] = set()
+        self.streams_per_key: Counter = Counter()
+
+    def subscribe(self, api_key: str = "") -> Optional[Subscriber]:
+        """Добавление подписчика.
+
+        Args:
+            api_key (str): Api-key подписчика, пустой не ограничивается.
+
+        Returns:
+            Optional[Subscriber]: Подписчик или None, если у api-key уже
+                максимум подписчиков.
+        """
+        if api_key:
+            if self.streams_per_key[api_key] >= self.max_streams_per_key:
+                return None
+            self.streams_per_key[api_key] += 1
+        subscriber = Subscriber(self.queue_size, api_key)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Удаление подписчика.
+
+        Args:
+            subscriber (Subscriber): Подписчик.
+        """
+        if subscriber not in self.subscribers:
+            return
+        self.subscribers.remove(subscriber)
+        if subscriber.api_key:
+            self.streams_per_key[subscriber.api_key] -= 1
+            if not self.streams_per_key[subscriber.api_key]:
+                del self.streams_per_key[subscriber.api_key]
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Раздача события подписчикам процесса.
+
+        Args:
+            event (Dict[str, Any]): Событие.
+        """
+        if event["type"] == EVENT_IMPORT:
+            feed_notifier.invalidate()
+            return
+        if event["type"] == EVENT_TWEET:
+            feed_notifier.publish(event["tweet_id"])
+        if not self.subscribers:
+            return
+        frame = encode_event(event)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+                self.unsubscribe(subscriber)
+                metrics.STREAM_DROPPED_SUBSCRIBERS_TOTAL.inc()
+
+    async def notify_workers(
+        self,
+        session: AsyncSession,
+        event: Dict[str, Any],
+    ) -> None:
+        """Отправка события другим процессам в транзакции записи.
+
+        Args:
+            session (AsyncSession): Сессия с открытой транзакцией.
+            event (Dict[str, Any]): Событие.
+        """
+        if not PG_NOTIFY:
+            return
+        await session.execute(
+            NOTIFY_QUERY,
+            {"channel": CHANNEL, "payload": get_notify_payload(event)},
+        )
+
+    async def stream(self, subscriber: Subscriber):
+        """Кадры событий подписчика с периодическими heartbeat.
+
+        Args:
+            subscriber (Subscriber): Подписчик.
+
+        Yields:
+            bytes: Кадр Server-Sent Events.
+        """
+        try:
+            yield RETRY_FRAME
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        HEARTBEAT_INTERVAL,
+                    )
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT_FRAME
+                    continue
+                yield frame
+                if subscriber.overflowed:
+                    yield RESET_FRAME
+                    return
+        finally:
+            self.unsubscribe(subscriber)
+
+
+hub = StreamHub()
+
+
+def collect_stream_metrics() -> None:
+    """Обновление метрики числа подписчиков."""
+    metrics.STREAM_SUBSCRIBERS.set(len(hub.subscribers))
+
+
+metrics.REGISTRY.add_collector(collect_stream_metrics)
+
+
+class WorkerListener:
+    """Прием событий других процессов через PostgreSQL LISTEN.
+
+    Уведомления отправляются в транзакциях записи на шардах твитов,
+    поэтому канал слушается на каждом шарде отдельным соединением.
+    Пока слушатель подключен ко всем шардам, уведомитель ленты считает
+    известными все новые твиты.
+    """
+
+    def __init__(self, notifier: Optional[FeedNotifier] = None) -> None:
+        """Создание неподключенного слушателя.
+
+        Args:
+            notifier (Optional[FeedNotifier]): Уведомитель ленты,
+                которому сообщается о подключении ко всем шардам.
+        """
+        self.notifier = notifier
+        self.connected = False
+        self._tasks: List[asyncio.Task] = []
+        self._connections: Set[int] = set()
+
+    def start(self) -> None:
+        """Запуск прослушивания канала в фоне."""
+        if PG_NOTIFY and not self._tasks:
+            self._tasks = [
+                asyncio.ensure_future(self._listen(shard, dsn))
+                for shard, dsn in enumerate(shards.get_driver_dsns())
+            ]
+
+    async def stop(self) -> None:
+        """Остановка прослушивания канала."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _listen(self, shard: int, dsn: str) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.get_running_loop().create_future()
+                connection.add_termination_listener(
+                    lambda _: closed.done() or closed.set_result(None),
+                )
+                await connection.add_listener(CHANNEL, self._on_notify)
+                self._set_connected(shard, True)
+                await closed
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("Event listener connection failed: %s", exc)
+            finally:
+                self._set_connected(shard, False)
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _set_connected(self, shard: int, connected: bool) -> None:
+        if connected:
+            self._connections.add(shard)
+        else:
+            self._connections.discard(shard)
+        was_connected = self.connected
+        self.connected = len(self._connections) == len(self._tasks)
+        if self.notifier is not None and self.connected != was_connected:
+            self.notifier.set_complete(self.connected)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str):
+        message = json.loads(payload)
+        if message["origin"] != ORIGIN:
+            hub.publish(message["event"])
+
+
+listener = WorkerListener(feed_notifier)